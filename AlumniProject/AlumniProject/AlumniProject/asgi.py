@@ -2,6 +2,8 @@
 ASGI config for AlumniProject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serving the project through it lets the async sync progress stream
+(/api/sync-jobs/<id>/events/) wait on a job without holding a thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,8 +11,14 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AlumniProject.settings")
 
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # serve static files in development, as runserver did
+    application = ASGIStaticFilesHandler(application)
@@ -92,6 +92,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        # Syncs of several accounts write at the same time: take the write lock
+        # when a transaction starts and wait up to 30 seconds for it, instead of
+        # failing with "database is locked". transaction_mode needs Django 5.1+.
+        "OPTIONS": {"timeout": 30, "transaction_mode": "IMMEDIATE"},
     }
 }
 
@@ -140,3 +144,65 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 LOGIN_URL = "/login"
+
+# Instagram Graph API ingestion
+# Maximum number of Graph API requests a sync keeps in flight at once.
+INSTAGRAM_MAX_WORKERS = 8
+# Insights of stored posts are refreshed by age: each (max_age, interval) tier,
+# in seconds, covers posts younger than max_age (None for any age) that were
+# not refreshed in the last interval seconds. 0 refreshes on every sync.
+INSTAGRAM_REFRESH_TIERS = [
+    (48 * 60 * 60, 0),
+    (30 * 24 * 60 * 60, 24 * 60 * 60),
+    (None, 7 * 24 * 60 * 60),
+]
+# Comments of a post whose comment count has not changed are still re-synced
+# once they are older than this many seconds.
+INSTAGRAM_COMMENT_STALE_SECONDS = 24 * 60 * 60
+# An interrupted sync resumes from its saved paging cursor for this many
+# seconds. Older checkpoints are dropped and the listing is read from the top.
+SYNC_CHECKPOINT_MAX_AGE_SECONDS = 24 * 60 * 60
+# Pages of a listing a sync may fetch ahead of the pages it is still writing.
+INSTAGRAM_PREFETCH_PAGES = 2
+# `manage.py capture_stories` polls each account's stories this often, and
+# every STORY_CAPTURE_FAST_INTERVAL_SECONDS after a poll that found new ones.
+STORY_CAPTURE_INTERVAL_SECONDS = 60 * 60
+STORY_CAPTURE_FAST_INTERVAL_SECONDS = 10 * 60
+# A final snapshot of each story is taken this many seconds before it expires.
+STORY_FINAL_SNAPSHOT_SECONDS = 10 * 60
+# Every Graph API URL is built on this base. Point it at a fake server (see
+# `manage.py fake_graph_server`) to run ingestion offline.
+GRAPH_API_BASE_URL = os.environ.get("GRAPH_API_BASE_URL", "https://graph.instagram.com")
+# Timeouts (in seconds) and retry policy of the shared Graph API client.
+GRAPH_CONNECT_TIMEOUT = 5
+GRAPH_READ_TIMEOUT = 30
+GRAPH_MAX_RETRIES = 3
+GRAPH_RETRY_BACKOFF = 0.5
+# Per-token pacing of Graph API requests. Requests are slowed down once the
+# usage reported by Instagram passes GRAPH_USAGE_SLOWDOWN percent, and paused
+# for GRAPH_THROTTLE_PAUSE seconds when throttled without a regain estimate.
+GRAPH_MAX_REQUESTS_PER_SECOND = 20
+GRAPH_BURST = 20
+GRAPH_USAGE_SLOWDOWN = 75
+GRAPH_THROTTLE_PAUSE = 60
+# Stored demographics are served as-is and refreshed in the background once
+# they are older than this many seconds. A refresh that has not finished after
+# DEMOGRAPHICS_REFRESH_TIMEOUT_SECONDS may be claimed again.
+DEMOGRAPHICS_TTL_SECONDS = 6 * 60 * 60
+DEMOGRAPHICS_REFRESH_TIMEOUT_SECONDS = 5 * 60
+# Post syncs are queued as SyncJob rows and run by `manage.py run_sync_worker`.
+# A job still running after SYNC_JOB_TIMEOUT_SECONDS is picked up again, and a
+# SyncLock not refreshed for as long is taken over.
+SYNC_JOB_TIMEOUT_SECONDS = 60 * 60
+# /get-stories/ waits this long for a stories sync that is already running.
+SYNC_LOCK_WAIT_SECONDS = 30
+SYNC_WORKER_POLL_SECONDS = 2
+# How many accounts `manage.py sync_accounts` syncs at once.
+SYNC_ACCOUNT_WORKERS = 4
+# /api/sync-jobs/<id>/events/ re-reads the job this often while streaming, and
+# sends a keep-alive comment when nothing changed for this many seconds.
+SYNC_EVENTS_POLL_SECONDS = 0.5
+SYNC_EVENTS_KEEPALIVE_SECONDS = 15
+# Every fetched Graph payload is kept, compressed, in the GraphPayload table so
+# `manage.py reprocess_payloads` can rebuild the parsed tables offline.
+STAGE_GRAPH_PAYLOADS = True
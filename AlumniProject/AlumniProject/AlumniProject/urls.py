@@ -25,14 +25,21 @@ from django.urls import path
 from social_tracker.views import user_login
 from social_tracker import views
 
-
 urlpatterns = [
     path("", views.token_landing, name="token_landing"),
     path("posts/", views.home, name="home"),
     path("login", user_login, name="login"),
     path("admin/", admin.site.urls),
     path("get-posts/", views.get_posts_view, name="get-posts"),
+    path("api/sync-jobs/<int:job_id>/", views.sync_job_status, name="sync-job-status"),
+    path(
+        "api/sync-jobs/<int:job_id>/events/",
+        views.sync_job_events,
+        name="sync-job-events",
+    ),
     path("get-stories/", views.get_stories_view, name="get-stories"),
+    path("sync-stories/", views.sync_stories_view, name="sync-stories"),
+    path("api/stories/list/", views.list_stored_stories, name="list-stories"),
     path("api/posts/list/", views.list_stored_posts, name="list-posts"),
     path("api/demographics/", views.demographics_view, name="api-demographics"),
     path("demographics/", views.demographics_page, name="demographics_page"),
@@ -0,0 +1,109 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from social_tracker.management.commands.fake_graph_server import (
+    add_fake_graph_arguments,
+    fake_graph_server,
+)
+from social_tracker.models import Comment, InstagramAccount, Post
+from social_tracker.utils.delete_account_data import delete_account_data
+from social_tracker.utils.get_instagram_data import (
+    get_all_demographics,
+    get_instagram_posts,
+    get_instagram_stories,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks post, story and demographics syncs against an in-process "
+        "fake Graph API and prints their throughput."
+    )
+
+    def add_arguments(self, parser):
+        add_fake_graph_arguments(parser)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "INSTAGRAM_MAX_WORKERS", 8),
+            help="Requests kept in flight (INSTAGRAM_MAX_WORKERS).",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=getattr(settings, "GRAPH_MAX_REQUESTS_PER_SECOND", 20),
+            help="Requests per second allowed per token.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the benchmark account and its data afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        with fake_graph_server(options) as server:
+            data = server.graph.data
+            account, created = InstagramAccount.objects.get_or_create(
+                account_API_ID=data.account_id, defaults={"username": data.username}
+            )
+            # a fresh token gets a fresh rate-limit bucket with this run's rate
+            token = f"benchmark-{time.time()}"
+            try:
+                with override_settings(
+                    GRAPH_API_BASE_URL=server.base_url,
+                    GRAPH_MAX_REQUESTS_PER_SECOND=options["rate"],
+                    GRAPH_BURST=max(int(options["rate"]), 1),
+                ):
+                    self.run(server, token, data, options["workers"])
+            finally:
+                if created and not options["keep"]:
+                    delete_account_data(data.account_id)
+                    account.delete()
+
+    def run(self, server, token, data, workers):
+        stats = {}
+        started = time.perf_counter()
+        message = get_instagram_posts(
+            token, data.account_id, len(data.media), workers, stats=stats
+        )
+        posts_seconds = time.perf_counter() - started
+        self.stdout.write(f"Posts: {message}")
+        self.report(
+            "posts",
+            posts_seconds,
+            Post.objects.filter(instagram_account__account_API_ID=data.account_id),
+        )
+        self.report(
+            "comments",
+            posts_seconds,
+            Comment.objects.filter(instagram_account__account_API_ID=data.account_id),
+        )
+
+        started = time.perf_counter()
+        stories = get_instagram_stories(token, data.account_id)
+        saved = len(stories) if isinstance(stories, list) else 0
+        self.stdout.write(
+            f"Stories: {saved} saved in {time.perf_counter() - started:.2f}s"
+        )
+
+        started = time.perf_counter()
+        error = get_all_demographics(token, data.account_id, max_workers=workers)
+        self.stdout.write(
+            f"Demographics: {error or 'saved'} in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+        graph = server.graph
+        self.stdout.write(
+            f"Server: {graph.requests} request(s), {graph.batch_items} batch "
+            f"item(s), {graph.throttled} throttled"
+        )
+        self.stdout.write(f"Sync stats: {stats}")
+
+    def report(self, label, seconds, queryset):
+        count = queryset.count()
+        rate = count / seconds if seconds else 0
+        self.stdout.write(f"{count} {label} in {seconds:.2f}s ({rate:.1f}/s)")
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from social_tracker.models import AccessToken
+from social_tracker.utils.story_capture import capture_stories
+
+# longest sleep between checks, so newly connected accounts are picked up
+MAX_SLEEP_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Keeps snapshots of the insights of every account's active stories, "
+        "polling each account more often after new stories appear and once "
+        "more just before each story expires."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account",
+            action="append",
+            help="Account_API_ID to capture. Can be given more than once. Defaults to every account.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Poll every account once, print when each is due next and exit.",
+        )
+
+    def handle(self, *args, **options):
+        next_due = {}
+        while True:
+            tokens = AccessToken.objects.order_by("account_id")
+            if options["account"]:
+                tokens = tokens.filter(account_id__in=options["account"])
+            tokens = list(tokens)
+            if not tokens and options["once"]:
+                raise CommandError("No account with a stored access token to capture.")
+
+            now = timezone.now()
+            for token in tokens:
+                if next_due.get(token.account_id, now) > now:
+                    continue
+                result, new_count, next_at = capture_stories(
+                    token.token, token.account_id
+                )
+                next_due[token.account_id] = next_at
+                if isinstance(result, str):
+                    outcome = f"failed: {result}"
+                else:
+                    outcome = f"{len(result)} active, {new_count} new"
+                self.stdout.write(
+                    f"{token.account_id}: {outcome}, next capture at "
+                    f"{next_at:%Y-%m-%d %H:%M:%S}"
+                )
+
+            if options["once"]:
+                return
+            delay = MAX_SLEEP_SECONDS
+            if next_due:
+                delay = (min(next_due.values()) - timezone.now()).total_seconds()
+            time.sleep(min(max(delay, 0), MAX_SLEEP_SECONDS))
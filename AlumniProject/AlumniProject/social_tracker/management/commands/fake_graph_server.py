@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+
+from social_tracker.utils.fake_graph import FakeGraphData, FakeGraphServer
+
+
+def add_fake_graph_arguments(parser):
+    """Adds the options describing the fake account and server behaviour."""
+    parser.add_argument("--media", type=int, default=100, help="Number of posts.")
+    parser.add_argument(
+        "--comments", type=int, default=5, help="Top-level comments per post."
+    )
+    parser.add_argument("--replies", type=int, default=1, help="Replies per comment.")
+    parser.add_argument("--stories", type=int, default=5, help="Number of stories.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the fake data.")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="Seconds added to every HTTP exchange.",
+    )
+    parser.add_argument(
+        "--throttle-every",
+        type=int,
+        default=0,
+        help="Answer every Nth request with a 429 (0 disables throttling).",
+    )
+    parser.add_argument(
+        "--page-size", type=int, default=100, help="Largest page the server returns."
+    )
+
+
+def fake_graph_server(options, port=0):
+    """Builds a FakeGraphServer from the parsed command options."""
+    data = FakeGraphData(
+        media=options["media"],
+        comments=options["comments"],
+        replies=options["replies"],
+        stories=options["stories"],
+        seed=options["seed"],
+    )
+    return FakeGraphServer(
+        data,
+        port=port,
+        latency=options["latency"],
+        throttle_every=options["throttle_every"],
+        max_page_size=options["page_size"],
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves a fake, deterministic Instagram Graph API on localhost. "
+        "Set GRAPH_API_BASE_URL to the printed URL to sync against it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        add_fake_graph_arguments(parser)
+
+    def handle(self, *args, **options):
+        server = fake_graph_server(options, options["port"])
+        self.stdout.write(f"Fake Graph API listening on {server.base_url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
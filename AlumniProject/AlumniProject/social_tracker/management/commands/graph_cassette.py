@@ -0,0 +1,126 @@
+import cProfile
+import io
+import pstats
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from social_tracker.models import AccessToken, InstagramAccount, Post
+from social_tracker.utils.cassette import RECORD, REPLAY, use_cassette
+from social_tracker.utils.get_instagram_data import (
+    get_comment_data,
+    get_instagram_posts,
+)
+from social_tracker.utils.graph_client import GraphClient
+
+
+class Rollback(Exception):
+    """Raised to roll back the sync's writes once it has been measured."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Records a post sync's Graph API traffic to a cassette, or replays a "
+        "cassette through the same sync, optionally under cProfile. The "
+        "sync's database writes are always rolled back, so recordings and "
+        "replays start from the same database state."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("mode", choices=[RECORD, REPLAY])
+        parser.add_argument("path", help="Cassette file, e.g. sync.json.gz")
+        parser.add_argument(
+            "--account",
+            help="Account_API_ID to sync. Defaults to the most recently connected account.",
+        )
+        parser.add_argument(
+            "--comments",
+            metavar="POST_ID",
+            help="Sync the comments of one post with get_comment_data instead.",
+        )
+        parser.add_argument(
+            "--realtime",
+            action="store_true",
+            help="Replay each exchange with its recorded duration.",
+        )
+        parser.add_argument(
+            "--profile",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Profile the sync and print the N most expensive functions.",
+        )
+
+    def handle(self, *args, **options):
+        tokens = AccessToken.objects.order_by("-id")
+        if options["account"]:
+            tokens = tokens.filter(account_id=options["account"])
+        access_token = tokens.first()
+        account_id = options["account"] or (access_token and access_token.account_id)
+        if not account_id:
+            raise CommandError("No account given and no access token stored.")
+        # the fake Graph server accepts any token
+        token = access_token.token if access_token else "cassette"
+
+        # the sync gets a client of its own, so the shared graph client and
+        # anything else using it in this process are left untouched
+        client = GraphClient()
+        if options["mode"] == REPLAY and not options["realtime"]:
+            # zero-latency replay: no pacing and no backoff before recorded retries
+            token = f"replay-{time.time()}"
+            client = GraphClient(backoff=0, max_rate=10**6, burst=10**6)
+
+        profiler = cProfile.Profile() if options["profile"] else None
+        with use_cassette(
+            options["path"], options["mode"], options["realtime"], client=client
+        ) as cassette:
+            result, seconds = self.run(token, account_id, options, profiler, client)
+
+        exchanges = len(cassette.interactions)
+        if options["mode"] == REPLAY:
+            exchanges = cassette.played
+        self.stdout.write(f"Result: {result}")
+        self.stdout.write(
+            f"{options['mode'].capitalize()}ed {exchanges} exchange(s) in "
+            f"{seconds:.2f}s (recorded network time {cassette.recorded_seconds:.2f}s)"
+        )
+        if profiler:
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out).sort_stats("cumulative")
+            stats.print_stats(options["profile"])
+            self.stdout.write(out.getvalue())
+
+    def run(self, token, account_id, options, profiler, client):
+        """
+        Runs the sync through client inside a transaction that is rolled back
+        afterwards. Returns (result, seconds).
+        """
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                account, _ = InstagramAccount.objects.get_or_create(
+                    account_API_ID=account_id, defaults={"username": account_id}
+                )
+                if options["comments"]:
+                    Post.objects.get_or_create(
+                        post_API_ID=options["comments"],
+                        defaults={"instagram_account": account},
+                    )
+                if profiler:
+                    profiler.enable()
+                try:
+                    result = self.sync(token, account_id, options["comments"], client)
+                finally:
+                    if profiler:
+                        profiler.disable()
+                raise Rollback
+        except Rollback:
+            pass
+        return result, time.perf_counter() - started
+
+    def sync(self, token, account_id, post_id, client):
+        if post_id:
+            users = get_comment_data(token, post_id, account_id, client=client)
+            return f"{len(users)} commenter(s) written."
+        return get_instagram_posts(token, account_id, client=client)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from social_tracker.utils.comment_counts import refresh_comment_counts
+
+
+class Command(BaseCommand):
+    help = "Rebuilds every InstagramUser.num_comments counter from the Comment table."
+
+    def handle(self, *args, **options):
+        changed = refresh_comment_counts()
+        self.stdout.write(f"Rebuilt comment counts, {changed} user(s) corrected.")
@@ -0,0 +1,73 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from social_tracker.models import AccessToken, InstagramAccount, Post, SyncJob
+from social_tracker.utils.comment_counts import refresh_comment_counts
+from social_tracker.utils.get_instagram_data import refresh_due_posts
+from social_tracker.utils.refresh_tiers import describe_tier, due_counts
+from social_tracker.utils.sync_locks import sync_lock
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the insights of the posts that are due under "
+        "INSTAGRAM_REFRESH_TIERS, for every account with a stored access "
+        "token, without listing media again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account",
+            action="append",
+            help="Account_API_ID to refresh. Can be given more than once. Defaults to every account.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print how many posts are due in each tier.",
+        )
+
+    def handle(self, *args, **options):
+        tokens = AccessToken.objects.order_by("account_id")
+        if options["account"]:
+            tokens = tokens.filter(account_id__in=options["account"])
+        tokens = list(tokens)
+        if not tokens:
+            raise CommandError("No account with a stored access token to refresh.")
+
+        accounts = InstagramAccount.objects.in_bulk(
+            [token.account_id for token in tokens]
+        )
+        failed = 0
+        for token in tokens:
+            account = accounts.get(token.account_id)
+            if account is None:
+                self.stdout.write(f"{token.account_id}: no posts synced yet, skipped.")
+                continue
+
+            counts = due_counts(Post.objects.filter(instagram_account=account))
+            due = ", ".join(
+                f"{describe_tier(max_age, interval)}: {count}"
+                for max_age, interval, count in counts
+            )
+            self.stdout.write(f"{account.username} ({account.account_API_ID}): {due}")
+            if options["dry_run"]:
+                continue
+
+            stats = {}
+            with sync_lock(account.pk, SyncJob.POSTS) as acquired:
+                if not acquired:
+                    self.stdout.write("  skipped: a posts sync is already running")
+                    continue
+                try:
+                    user_ids = refresh_due_posts(token.token, account, stats=stats)
+                    refresh_comment_counts(user_ids)
+                except requests.exceptions.RequestException as e:
+                    failed += 1
+                    self.stdout.write(f"  failed: {e}")
+                    continue
+            summary = ", ".join(f"{key}={value}" for key, value in stats.items())
+            self.stdout.write(f"  {summary or 'nothing due'}")
+
+        if not options["dry_run"]:
+            self.stdout.write(f"Refreshed {len(tokens)} account(s), {failed} failed.")
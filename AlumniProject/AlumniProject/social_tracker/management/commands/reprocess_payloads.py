@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from social_tracker.models import GraphPayload, InstagramAccount
+from social_tracker.utils.reprocess_payloads import REPROCESS_PARTS, reprocess_account
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds posts, comments, users and stories from the staged Graph "
+        "API payloads, without calling Instagram."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account",
+            help="Account_API_ID to reprocess. Defaults to every account with staged payloads.",
+        )
+        parser.add_argument(
+            "--only",
+            action="append",
+            choices=REPROCESS_PARTS,
+            help="Only rebuild this part. Can be given more than once.",
+        )
+
+    def handle(self, *args, **options):
+        accounts = InstagramAccount.objects.filter(
+            account_API_ID__in=GraphPayload.objects.values("instagram_account")
+        )
+        if options["account"]:
+            accounts = accounts.filter(account_API_ID=options["account"])
+            if not accounts.exists():
+                raise CommandError(
+                    f"No staged payloads for account {options['account']}."
+                )
+
+        for account in accounts:
+            stats = reprocess_account(account, options["only"])
+            counts = ", ".join(f"{key}={value}" for key, value in stats.items())
+            self.stdout.write(f"Reprocessed {account.username}: {counts}")
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social_tracker.utils.sync_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued SyncJob rows of every kind (post and story syncs) one "
+        "after another."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=getattr(settings, "SYNC_WORKER_POLL_SECONDS", 2),
+            help="Seconds to wait between checks of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            self.stdout.write(f"Running {job.kind} sync job {job.id}...")
+            run_job(job)
+            self.stdout.write(f"Sync job {job.id} {job.status}: {job.message}")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from social_tracker.models import SyncJob
+from social_tracker.utils.sync_jobs import STAGE_STATS, sync_accounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Syncs every account with a stored access token in parallel and "
+        "prints a summary per account."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--account",
+            action="append",
+            help="Account_API_ID to sync. Can be given more than once. Defaults to every account.",
+        )
+        parser.add_argument(
+            "--stories",
+            action="store_true",
+            help="Sync active stories instead of posts.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="How many accounts to sync at once. Defaults to SYNC_ACCOUNT_WORKERS.",
+        )
+
+    def handle(self, *args, **options):
+        kind = SyncJob.STORIES if options["stories"] else SyncJob.POSTS
+        summaries = sync_accounts(kind, options["account"], options["workers"])
+        if not summaries:
+            raise CommandError("No account with a stored access token to sync.")
+
+        for summary in summaries:
+            counts = ", ".join(
+                f"{key}={value}"
+                for stage in STAGE_STATS
+                for key, value in summary["stages"][stage].items()
+                if value
+            )
+            took = ""
+            if summary["seconds"] is not None:
+                took = f" in {summary['seconds']:.1f}s"
+            self.stdout.write(
+                f"{summary['username']} ({summary['account_id']}): "
+                f"{summary['status']}{took}, {summary['message']}"
+            )
+            if counts:
+                self.stdout.write(f"  {counts}")
+            self.stdout.write(f"  rate_limit_waits={summary['rate_limit_waits']}")
+
+        failed = sum(1 for summary in summaries if summary["status"] == SyncJob.FAILED)
+        self.stdout.write(f"Synced {len(summaries)} account(s), {failed} failed.")
@@ -10,6 +10,10 @@ class InstagramAccount(models.Model):
     account_API_ID = models.CharField(max_length=100, primary_key=True)
     username = models.CharField(max_length=100)
     date_added = models.DateTimeField(auto_now_add=True)
+    # when the demographics were last refreshed, and when a refresh in
+    # progress was claimed (null when none is running)
+    demographics_refreshed_at = models.DateTimeField(null=True, blank=True)
+    demographics_refresh_started = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         app_label = "social_tracker"
@@ -28,6 +32,10 @@ class Post(models.Model):
         num_shares (IntegerField): The number of times the post has been shared.
         num_saves (IntegerField): The number of times the post has been saved.
         post_API_ID (CharField): A unique identifier for the post in an external API.
+        caption (TextField): The caption of the post.
+        comments_synced_at (DateTimeField): When the comments of the post were last fully synced.
+        metrics_refreshed_at (DateTimeField): When the insights of the post were last refreshed.
+        content_hash (CharField): Digest of the synced fields, so unchanged posts are not rewritten.
     """
 
     instagram_account = models.ForeignKey(
@@ -46,6 +54,9 @@ class Post(models.Model):
     num_saves = models.IntegerField(default=0)
     post_API_ID = models.CharField(max_length=100, default="", unique=True)
     caption = models.TextField(null=True)
+    comments_synced_at = models.DateTimeField(null=True, blank=True)
+    metrics_refreshed_at = models.DateTimeField(null=True, blank=True)
+    content_hash = models.CharField(max_length=16, default="", blank=True)
 
     class Meta:
         ordering = ["-date_posted"]
@@ -60,6 +71,7 @@ class InstagramUser(models.Model):
         id (IntegerField): The unique identifier for the user.
         username (CharField): The username of the user.
         num_comments (IntegerField): The total number of comments made by the user.
+        content_hash (CharField): Digest of the synced fields, so unchanged users are not rewritten.
     """
 
     instagram_account = models.ForeignKey(
@@ -73,6 +85,7 @@ class InstagramUser(models.Model):
     username = models.TextField(default="")
     num_comments = models.IntegerField(default=0)
     name = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=16, default="", blank=True)
 
     class Meta:
         ordering = ["num_comments"]
@@ -93,6 +106,7 @@ class Comment(models.Model):
         username (CharField): The username of the commenter.
         parent_ID (TextField): The ID of the parent comment if this is a reply, otherwise empty.
         replies (JSONField): A list of replies associated with this comment.
+        content_hash (CharField): Digest of the synced fields, so unchanged comments are not rewritten.
     """
 
     instagram_account = models.ForeignKey(
@@ -117,6 +131,7 @@ class Comment(models.Model):
     username = models.TextField(default="")
     parent_ID = models.TextField(default="", null=True)
     replies = models.JSONField(default=list)
+    content_hash = models.CharField(max_length=16, default="", blank=True)
 
     class Meta:
         ordering = ["-date_posted"]
@@ -132,16 +147,16 @@ class AccessToken(models.Model):
         account_id (TextField): The account ID associated with the token.
 
     Methods:
-        save: Ensures there is only one active access token at a time.
+        save: Ensures each account has only one active access token at a time.
     """
 
     token = models.TextField()
     account_id = models.TextField(default="None")
 
     def save(self, *args, **kwargs):
-        # There can only be one access token at a time
-        if AccessToken.objects.exists() and not self.pk:
-            AccessToken.objects.all().delete()
+        # Each account keeps only its newest access token
+        if not self.pk:
+            AccessToken.objects.filter(account_id=self.account_id).delete()
         super().save(*args, **kwargs)
 
     class Meta:
@@ -230,6 +245,8 @@ class InstagramStory(models.Model):
         num_replies (IntegerField): The number of replies to the story.
         num_swipes_up (IntegerField): The number of swipe-ups on the story.
         story_API_ID (CharField): A unique identifier for the story in an external API.
+        captured_at (DateTimeField): When the story's insights were last read, or None
+            if they never were.
     """
 
     instagram_account = models.ForeignKey(
@@ -247,7 +264,167 @@ class InstagramStory(models.Model):
     num_replies = models.IntegerField(default=0)
     num_swipes_up = models.IntegerField(default=0)
     story_API_ID = models.CharField(max_length=100, default="", unique=True)
+    captured_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-date_posted"]
         app_label = "social_tracker"
+
+
+class SyncState(models.Model):
+    """
+    Model holding the incremental post sync state of one Instagram account.
+
+    Attributes:
+        instagram_account (OneToOneField): The account this state belongs to.
+        newest_post_date (DateTimeField): The date_posted of the newest post ingested so far.
+            Later syncs only fetch media down to this high-water mark.
+    """
+
+    instagram_account = models.OneToOneField(
+        InstagramAccount,
+        on_delete=models.CASCADE,
+        related_name="sync_state",
+    )
+    newest_post_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        app_label = "social_tracker"
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Model holding how far an interrupted paging loop got, so the next sync
+    resumes there instead of refetching pages that are already stored.
+
+    Attributes:
+        instagram_account (ForeignKey): The account being synced.
+        scope (CharField): Which listing: "media", or "comments:<post_API_ID>".
+        cursor (TextField): The paging cursor after the last page written.
+        last_object_id (CharField): The Graph ID of the last object written.
+        newest_date (DateTimeField): For "media", the newest date_posted written so far.
+        updated_at (DateTimeField): When the checkpoint was last saved.
+    """
+
+    instagram_account = models.ForeignKey(
+        InstagramAccount,
+        on_delete=models.CASCADE,
+        related_name="sync_checkpoints",
+    )
+    scope = models.CharField(max_length=120)
+    cursor = models.TextField()
+    last_object_id = models.CharField(max_length=100, default="", blank=True)
+    newest_date = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("instagram_account", "scope")
+        app_label = "social_tracker"
+
+
+class SyncLock(models.Model):
+    """
+    Model marking that a sync of one account is running, so a second sync of
+    the same account and kind waits or joins it instead of crawling the same
+    data again.
+
+    Attributes:
+        instagram_account (ForeignKey): The account being synced.
+        scope (CharField): The kind of sync holding the lock: "posts" or "stories".
+        holder (CharField): Who holds the lock, e.g. "job:12".
+        heartbeat_at (DateTimeField): When the holder last reported progress.
+    """
+
+    instagram_account = models.ForeignKey(
+        InstagramAccount,
+        on_delete=models.CASCADE,
+        related_name="sync_locks",
+    )
+    scope = models.CharField(max_length=20)
+    holder = models.CharField(max_length=100)
+    heartbeat_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("instagram_account", "scope")
+        app_label = "social_tracker"
+
+
+class SyncJob(models.Model):
+    """
+    Model representing one queued post or story sync, run by the run_sync_worker command.
+
+    Attributes:
+        instagram_account (ForeignKey): The account to sync.
+        kind (CharField): "posts" or "stories".
+        status (CharField): "queued", "running", "done" or "failed".
+        stage (CharField): The stage a running sync is in: "media", "stories", "insights" or "comments".
+        stats (JSONField): The counts reported by the sync so far.
+        message (TextField): The message the sync finished with.
+        created_at (DateTimeField): When the job was queued.
+        started_at (DateTimeField): When a worker picked the job up.
+        finished_at (DateTimeField): When the job finished.
+    """
+
+    POSTS = "posts"
+    STORIES = "stories"
+    KIND_CHOICES = [(POSTS, "Posts"), (STORIES, "Stories")]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    instagram_account = models.ForeignKey(
+        InstagramAccount,
+        on_delete=models.CASCADE,
+        related_name="sync_jobs",
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=POSTS)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    stage = models.CharField(max_length=20, default="", blank=True)
+    stats = models.JSONField(default=dict)
+    message = models.TextField(default="", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        app_label = "social_tracker"
+
+
+class GraphPayload(models.Model):
+    """
+    Model staging the raw Graph API payload of one fetched object, so the
+    parsed tables can be rebuilt with the reprocess_payloads command without
+    calling Instagram again.
+
+    Attributes:
+        instagram_account (ForeignKey): The account the object belongs to.
+        endpoint (CharField): What kind of payload it is: "media", "insights", "comment" or "story".
+        object_id (CharField): The Graph ID of the object.
+        parent_id (CharField): The Graph ID of the object's parent, e.g. the post of a comment.
+        payload (BinaryField): The zlib-compressed JSON payload.
+        fetched_at (DateTimeField): When the payload was last fetched.
+    """
+
+    instagram_account = models.ForeignKey(
+        InstagramAccount,
+        on_delete=models.CASCADE,
+        related_name="graph_payloads",
+    )
+    endpoint = models.CharField(max_length=20)
+    object_id = models.CharField(max_length=100)
+    parent_id = models.CharField(max_length=100, default="", blank=True)
+    payload = models.BinaryField()
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("endpoint", "object_id")
+        app_label = "social_tracker"
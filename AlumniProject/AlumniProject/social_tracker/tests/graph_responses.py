@@ -0,0 +1,25 @@
+"""Canned Graph API responses shared by the sync tests."""
+
+import json
+from unittest.mock import Mock
+
+
+def insights(likes):
+    """A post insights body with the given like count."""
+    return {
+        "data": [
+            {"name": "likes", "values": [{"value": likes}]},
+            {"name": "comments", "values": [{"value": 0}]},
+            {"name": "saved", "values": [{"value": 1}]},
+            {"name": "shares", "values": [{"value": 1}]},
+        ]
+    }
+
+
+def batch_response(bodies, code=200):
+    """Builds a mocked Graph batch POST response holding the given bodies."""
+    resp = Mock(status_code=200)
+    resp.json.return_value = [
+        {"code": code, "body": json.dumps(body)} for body in bodies
+    ]
+    return resp
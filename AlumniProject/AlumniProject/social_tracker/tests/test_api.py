@@ -1,10 +1,17 @@
 import json
+import threading
+import time
 from unittest.mock import patch, Mock
 import requests
 from django.test import TestCase, override_settings
-from social_tracker.models import Post, InstagramAccount
-from social_tracker.utils.get_instagram_data import get_instagram_posts
+from social_tracker.models import Post, InstagramAccount, SyncState
+from social_tracker.utils.get_instagram_data import (
+    get_instagram_posts,
+    graph_batch,
+    run_concurrently,
+)
 from social_tracker.views import instagram_link
+from social_tracker.tests.graph_responses import batch_response
 
 
 class GetInstagramPostsTest(TestCase):
@@ -17,8 +24,9 @@ class GetInstagramPostsTest(TestCase):
             username="FakeAccount",
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
-    def test_get_instagram_posts_success(self, mock_get):
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_instagram_posts_success(self, mock_get, mock_post):
         # 1st call → media list
         posts_payload = {
             "data": [
@@ -34,7 +42,7 @@ class GetInstagramPostsTest(TestCase):
                 },
             ]
         }
-        # 2nd call (insights) → metrics
+        # batch call → insights and caption for each post
         insights_payload = {
             "data": [
                 {"name": "likes", "values": [{"value": 10}]},
@@ -46,13 +54,58 @@ class GetInstagramPostsTest(TestCase):
 
         mock_media = Mock(status_code=200)
         mock_media.json.return_value = posts_payload
-        mock_insights = Mock(status_code=200)
-        mock_insights.json.return_value = insights_payload
+        mock_get.return_value = mock_media
+        mock_post.return_value = batch_response(
+            [insights_payload, {"caption": "one"}, insights_payload, {}]
+        )
 
-        def side_effect(url, params):
-            return mock_insights if "insights" in url else mock_media
+        with patch(
+            "social_tracker.utils.get_instagram_data.get_comment_data",
+            return_value=set(),
+        ) as mock_comments:
+            res = get_instagram_posts(
+                "fake_access_token",
+                self.account.account_API_ID,
+                num_posts=2,
+            )
+        self.assertEqual(res, "Posts processed successfully.")
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Post.objects.get(post_API_ID="1").caption, "one")
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_comments.call_count, 2)
 
-        mock_get.side_effect = side_effect
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_instagram_posts_nested_insights(self, mock_get):
+        def nested(likes):
+            return {
+                "data": [
+                    {"name": "likes", "values": [{"value": likes}]},
+                    {"name": "comments", "values": [{"value": 0}]},
+                    {"name": "saved", "values": [{"value": 3}]},
+                    {"name": "shares", "values": [{"value": 1}]},
+                ]
+            }
+
+        mock_media = Mock(status_code=200)
+        mock_media.json.return_value = {
+            "data": [
+                {
+                    "id": "1",
+                    "timestamp": "2023-01-01T12:00:00+0000",
+                    "permalink": "http://example.com/post1",
+                    "caption": "first",
+                    "insights": nested(10),
+                },
+                {
+                    "id": "2",
+                    "timestamp": "2023-01-02T12:00:00+0000",
+                    "permalink": "http://example.com/post2",
+                    "caption": "second",
+                    "insights": nested(20),
+                },
+            ]
+        }
+        mock_get.return_value = mock_media
 
         res = get_instagram_posts(
             "fake_access_token",
@@ -60,9 +113,58 @@ class GetInstagramPostsTest(TestCase):
             num_posts=2,
         )
         self.assertEqual(res, "Posts processed successfully.")
-        self.assertEqual(Post.objects.count(), 2)
+        # everything came from the listing, so no per-post calls were made
+        mock_get.assert_called_once()
+        self.assertIn("insights.metric(", mock_get.call_args[1]["params"]["fields"])
+        post = Post.objects.get(post_API_ID="2")
+        self.assertEqual(post.num_likes, 20)
+        self.assertEqual(post.caption, "second")
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_instagram_posts_reports_inserted_and_updated(self, mock_get):
+        Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="1",
+            post_link="http://example.com/old",
+            num_likes=1,
+        )
+        insights = {
+            "data": [
+                {"name": "likes", "values": [{"value": 50}]},
+                {"name": "comments", "values": [{"value": 0}]},
+                {"name": "saved", "values": [{"value": 3}]},
+                {"name": "shares", "values": [{"value": 1}]},
+            ]
+        }
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {
+                "data": [
+                    {
+                        "id": str(i),
+                        "timestamp": "2023-01-01T12:00:00+0000",
+                        "permalink": f"http://example.com/post{i}",
+                        "insights": insights,
+                    }
+                    for i in (1, 2, 3)
+                ]
+            },
+        )
+
+        stats = {}
+        res = get_instagram_posts(
+            "fake_access_token", self.account.account_API_ID, stats=stats
+        )
+
+        self.assertEqual(res, "Posts processed successfully.")
+        self.assertEqual(stats["posts_inserted"], 2)
+        self.assertEqual(stats["posts_updated"], 1)
+        self.assertEqual(Post.objects.count(), 3)
+        updated = Post.objects.get(post_API_ID="1")
+        self.assertEqual(updated.num_likes, 50)
+        self.assertEqual(updated.post_link, "http://example.com/post1")
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_instagram_posts_no_posts(self, mock_get):
         mock_resp = Mock(status_code=200)
         mock_resp.json.return_value = {"data": []}
@@ -76,7 +178,7 @@ class GetInstagramPostsTest(TestCase):
         self.assertEqual(res, "No posts found.")
         self.assertEqual(Post.objects.count(), 0)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_instagram_posts_api_failure(self, mock_get):
         mock_get.side_effect = requests.exceptions.RequestException("boom")
         res = get_instagram_posts(
@@ -88,6 +190,125 @@ class GetInstagramPostsTest(TestCase):
         self.assertEqual(Post.objects.count(), 0)
 
 
+class ConcurrentPostFetchTest(TestCase):
+    """Checks the batched, concurrent insights/caption fallback."""
+
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account",
+            username="FakeAccount",
+        )
+        self.media = {
+            "data": [
+                {
+                    "id": str(i),
+                    "timestamp": f"2023-01-{i % 28 + 1:02d}T12:00:00+0000",
+                    "permalink": f"http://example.com/post{i}",
+                }
+                for i in range(1, 61)
+            ]
+        }
+
+    def _fake_post(self, url, data):
+        bodies = []
+        for item in json.loads(data["batch"]):
+            relative_url = item["relative_url"]
+            post_id = relative_url.split("?")[0].split("/")[1]
+            n = int(post_id)
+            if "/insights" in relative_url:
+                bodies.append(
+                    {
+                        "data": [
+                            {"name": "likes", "values": [{"value": n * 10}]},
+                            {"name": "comments", "values": [{"value": 0}]},
+                            {"name": "saved", "values": [{"value": n}]},
+                            {"name": "shares", "values": [{"value": n + 1}]},
+                        ]
+                    }
+                )
+            else:
+                bodies.append({"caption": f"caption {post_id}"})
+        return batch_response(bodies)
+
+    def _snapshot(self):
+        return list(
+            Post.objects.order_by("post_API_ID").values(
+                "post_API_ID",
+                "date_posted",
+                "post_link",
+                "num_likes",
+                "num_comments",
+                "num_shares",
+                "num_saves",
+                "caption",
+            )
+        )
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_concurrent_matches_sequential(self, mock_get, mock_post):
+        mock_get.return_value = Mock(status_code=200, json=lambda: self.media)
+        mock_post.side_effect = self._fake_post
+
+        get_instagram_posts("tok", "fake_account", num_posts=60, max_workers=1)
+        sequential = self._snapshot()
+        Post.objects.all().delete()
+        SyncState.objects.all().delete()
+
+        res = get_instagram_posts("tok", "fake_account", num_posts=60, max_workers=4)
+        self.assertEqual(res, "Posts processed successfully.")
+        self.assertEqual(self._snapshot(), sequential)
+        self.assertEqual(len(sequential), 60)
+        self.assertEqual(
+            Post.objects.get(post_API_ID="7").caption,
+            "caption 7",
+        )
+        # 120 lookups per run, at most 50 per batch POST
+        self.assertEqual(mock_post.call_count, 6)
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    def test_graph_batch_per_item_errors(self, mock_post):
+        resp = Mock(status_code=200)
+        resp.json.return_value = [
+            {"code": 200, "body": json.dumps({"id": "1"})},
+            {"code": 400, "body": json.dumps({"error": {"message": "bad id"}})},
+            None,
+        ]
+        mock_post.return_value = resp
+
+        bodies = graph_batch("tok", ["1", "2", "3"])
+
+        self.assertEqual(bodies[0], {"id": "1"})
+        self.assertEqual(bodies[1]["error"]["message"], "bad id")
+        self.assertIn("error", bodies[2])
+        sent = json.loads(mock_post.call_args[1]["data"]["batch"])
+        self.assertEqual(sent[1], {"method": "GET", "relative_url": "2"})
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    def test_graph_batch_request_failure(self, mock_post):
+        mock_post.side_effect = requests.exceptions.RequestException("boom")
+        bodies = graph_batch("tok", ["1", "2"])
+        self.assertEqual(bodies, [{"error": {"message": "boom"}}] * 2)
+
+    def test_run_concurrently_keeps_order_and_bound(self):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def work(n):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return n * 2
+
+        self.assertEqual(
+            run_concurrently(work, range(12), 3), [n * 2 for n in range(12)]
+        )
+        self.assertLessEqual(state["peak"], 3)
+
+
 @override_settings(LOGIN_URL="/")  # bypass @login_required in view
 class InstagramLinkTests(TestCase):
     """Unit‑tests for instagram_link view helper."""
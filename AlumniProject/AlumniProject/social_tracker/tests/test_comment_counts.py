@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from social_tracker.models import Comment, InstagramAccount, InstagramUser
+from social_tracker.utils.comment_counts import refresh_comment_counts
+
+
+class CommentCountTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="CountAcct"
+        )
+        self.busy = InstagramUser.objects.create(id=1, username="busy", num_comments=9)
+        self.quiet = InstagramUser.objects.create(
+            id=2, username="quiet", num_comments=4
+        )
+        self.correct = InstagramUser.objects.create(
+            id=3, username="correct", num_comments=1
+        )
+        for cid in (10, 11, 12):
+            Comment.objects.create(id=cid, user_ID=self.busy, text="hi")
+        Comment.objects.create(id=13, user_ID=self.correct, text="hi")
+
+    def test_refresh_only_given_users(self):
+        changed = refresh_comment_counts([self.busy.id])
+
+        self.assertEqual(changed, 1)
+        self.busy.refresh_from_db()
+        self.quiet.refresh_from_db()
+        self.assertEqual(self.busy.num_comments, 3)
+        # not part of the refresh, so left alone
+        self.assertEqual(self.quiet.num_comments, 4)
+
+    def test_refresh_empty_list_does_nothing(self):
+        self.assertEqual(refresh_comment_counts([]), 0)
+        self.busy.refresh_from_db()
+        self.assertEqual(self.busy.num_comments, 9)
+
+    def test_rebuild_command_fixes_every_counter(self):
+        out = StringIO()
+        call_command("rebuild_comment_counts", stdout=out)
+
+        counts = dict(InstagramUser.objects.values_list("id", "num_comments"))
+        self.assertEqual(counts, {1: 3, 2: 0, 3: 1})
+        self.assertIn("2 user(s) corrected", out.getvalue())
@@ -0,0 +1,122 @@
+from datetime import timedelta
+from unittest.mock import patch, Mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from social_tracker.models import Comment, InstagramAccount, Post
+from social_tracker.utils.get_instagram_data import (
+    get_comment_data,
+    get_instagram_posts,
+    graph,
+)
+
+
+def media_listing(num_comments):
+    return {
+        "data": [
+            {
+                "id": "42",
+                "timestamp": "2024-03-01T12:00:00+0000",
+                "permalink": "http://example.com/42",
+                "insights": {
+                    "data": [
+                        {"name": "likes", "values": [{"value": 3}]},
+                        {"name": "comments", "values": [{"value": num_comments}]},
+                        {"name": "saved", "values": [{"value": 0}]},
+                        {"name": "shares", "values": [{"value": 0}]},
+                    ]
+                },
+            }
+        ]
+    }
+
+
+@override_settings(INSTAGRAM_COMMENT_STALE_SECONDS=3600)
+class CommentResyncTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="ResyncAcct"
+        )
+        self.post = Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="42",
+            post_link="http://example.com/42",
+            num_comments=2,
+            comments_synced_at=timezone.now() - timedelta(minutes=5),
+        )
+        Comment.objects.create(id=1, post_API_ID=self.post, text="a")
+        Comment.objects.create(id=2, post_API_ID=self.post, text="b")
+
+    def _sync(self, num_comments):
+        stats = {}
+        with patch(
+            "social_tracker.utils.get_instagram_data.graph.get",
+            return_value=Mock(
+                status_code=200, json=lambda: media_listing(num_comments)
+            ),
+        ), patch(
+            "social_tracker.utils.get_instagram_data.get_comment_data",
+            return_value=set(),
+        ) as mock_comments:
+            get_instagram_posts("tok", "fake_account", stats=stats)
+        return mock_comments, stats
+
+    def test_unchanged_count_is_skipped(self):
+        mock_comments, stats = self._sync(2)
+        mock_comments.assert_not_called()
+        self.assertEqual(stats["comment_syncs_skipped"], 1)
+
+    def test_changed_count_is_synced(self):
+        mock_comments, stats = self._sync(3)
+        mock_comments.assert_called_once_with(
+            "tok", "42", "fake_account", False, stats, client=graph
+        )
+        self.assertEqual(stats["comment_syncs"], 1)
+
+    def test_stale_comments_are_synced(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            comments_synced_at=timezone.now() - timedelta(hours=2)
+        )
+        mock_comments, _ = self._sync(2)
+        mock_comments.assert_called_once()
+
+    def test_missing_comment_rows_are_synced(self):
+        Comment.objects.all().delete()
+        mock_comments, _ = self._sync(2)
+        mock_comments.assert_called_once()
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_only_complete_sync_is_recorded(self, mock_get):
+        Post.objects.filter(pk=self.post.pk).update(comments_synced_at=None)
+        mock_get.return_value = Mock(
+            status_code=200, json=lambda: {"error": {"message": "rate limited"}}
+        )
+        get_comment_data("tok", "42", "fake_account")
+        self.assertIsNone(Post.objects.get(pk=self.post.pk).comments_synced_at)
+
+        mock_get.return_value = Mock(status_code=200, json=lambda: {"data": []})
+        get_comment_data("tok", "42", "fake_account")
+        self.assertIsNotNone(Post.objects.get(pk=self.post.pk).comments_synced_at)
+
+    def test_failed_comment_sync_is_retried(self):
+        def fake_get(url, params=None):
+            if url.endswith("/comments"):
+                body = {"error": {"message": "rate limited"}}
+            else:
+                body = media_listing(3)
+            return Mock(status_code=200, json=lambda: body)
+
+        stats = {}
+        with patch(
+            "social_tracker.utils.get_instagram_data.graph.get", side_effect=fake_get
+        ):
+            result = get_instagram_posts("tok", "fake_account", stats=stats)
+        self.assertEqual(result, "Posts processed, but 1 comment sync(s) failed.")
+        self.assertEqual(stats["comment_syncs_failed"], 1)
+        self.assertIsNone(Post.objects.get(pk=self.post.pk).comments_synced_at)
+
+        # the fresh count is stored, but the post is still picked up again
+        mock_comments, stats = self._sync(3)
+        mock_comments.assert_called_once()
+        self.assertEqual(stats["comment_syncs"], 1)
@@ -1,5 +1,7 @@
 from unittest.mock import patch, Mock
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from social_tracker.models import (
@@ -8,11 +10,13 @@ from social_tracker.models import (
     Post,
     InstagramAccount,
 )
+from social_tracker.utils.content_hash import USER_HASH_FIELDS, content_hash
 from social_tracker.utils.get_instagram_data import (
     get_comment_data,
     get_comments_helper,
     get_instagram_posts,
 )
+from social_tracker.tests.graph_responses import batch_response
 
 
 class CommentDataTests(TestCase):
@@ -22,24 +26,27 @@ class CommentDataTests(TestCase):
             username="TestAccount",
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_comment_data_single_comment(self, mock_get):
         mock_comment_id = 12345  # int PK
         mock_post_id = "999"
 
+        # the listing carries every field, so one request is enough
         mock_get.side_effect = [
-            Mock(status_code=200, json=lambda: {"data": [{"id": mock_comment_id}]}),
             Mock(
                 status_code=200,
                 json=lambda: {
-                    "id": mock_comment_id,
-                    "from": {"id": 111, "username": "test_user"},
-                    "like_count": 2,
-                    "text": "This is a comment!",
-                    "timestamp": "2023-01-01T12:00:00+0000",
-                    "replies": {"data": []},
-                    "username": "test_user",
-                    "parent_id": "",
+                    "data": [
+                        {
+                            "id": mock_comment_id,
+                            "from": {"id": 111, "username": "test_user"},
+                            "like_count": 2,
+                            "text": "This is a comment!",
+                            "timestamp": "2023-01-01T12:00:00+0000",
+                            "replies": {"data": []},
+                            "parent_id": "",
+                        }
+                    ]
                 },
             ),
         ]
@@ -55,8 +62,10 @@ class CommentDataTests(TestCase):
 
         self.assertTrue(Comment.objects.filter(id=mock_comment_id).exists())
         self.assertTrue(InstagramUser.objects.filter(id=111).exists())
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn("replies{", mock_get.call_args[1]["params"]["fields"])
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_comments_helper_reply_ids(self, mock_get):
         comment_id = 333
         user_id = 111
@@ -94,8 +103,9 @@ class CommentDataTests(TestCase):
         self.assertEqual(comment_obj.id, comment_id)
         self.assertEqual(reply_ids, [666])
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
-    def test_get_instagram_posts_updates_existing_post(self, mock_get):
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_instagram_posts_updates_existing_post(self, mock_get, mock_post):
         media_resp = Mock(
             status_code=200,
             json=lambda: {
@@ -109,27 +119,23 @@ class CommentDataTests(TestCase):
             },
         )
 
-        insights_resp = Mock(
-            status_code=200,
-            json=lambda: {
-                "data": [
-                    {"name": "likes", "values": [{"value": 99}]},
-                    {"name": "comments", "values": [{"value": 9}]},
-                    {"name": "saved", "values": [{"value": 5}]},
-                    {"name": "shares", "values": [{"value": 2}]},
-                ]
-            },
-        )
+        insights_body = {
+            "data": [
+                {"name": "likes", "values": [{"value": 99}]},
+                {"name": "comments", "values": [{"value": 9}]},
+                {"name": "saved", "values": [{"value": 5}]},
+                {"name": "shares", "values": [{"value": 2}]},
+            ]
+        }
 
-        caption_resp = Mock(status_code=200, json=lambda: {"caption": ""})
         comments_resp = Mock(status_code=200, json=lambda: {"data": []})
 
         mock_get.side_effect = [
             media_resp,  # /me/media
-            insights_resp,  # insights
-            caption_resp,  # caption
             comments_resp,  # first comments page (empty)
         ]
+        # insights and caption fallback in one batch
+        mock_post.return_value = batch_response([insights_body, {"caption": ""}])
 
         res = get_instagram_posts("fake_token", "fake_account", num_posts=1)
         post = Post.objects.get(post_link="http://example.com/post1")
@@ -137,7 +143,7 @@ class CommentDataTests(TestCase):
         self.assertEqual(post.num_likes, 99)
         self.assertEqual(res, "Posts processed successfully.")
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_comment_data_no_comments(self, mock_get):
         mock_post_id = "abcde"
         mock_get.return_value = Mock(status_code=200, json=lambda: {"data": []})
@@ -153,7 +159,7 @@ class CommentDataTests(TestCase):
         self.assertFalse(Comment.objects.exists())
         self.assertFalse(InstagramUser.objects.exists())
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_comment_data_api_error(self, mock_get):
         mock_post_id = "abcde"
         mock_get.return_value = Mock(
@@ -171,3 +177,139 @@ class CommentDataTests(TestCase):
         get_comment_data("fake_token", mock_post_id, self.account.account_API_ID)
         self.assertFalse(Comment.objects.exists())
         self.assertFalse(InstagramUser.objects.exists())
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_comment_data_nested_replies_and_paging(self, mock_get):
+        mock_post_id = "777"
+        Post.objects.create(
+            instagram_account=self.account,
+            post_link="https://example.com/post",
+            post_API_ID=mock_post_id,
+            date_posted=timezone.now(),
+        )
+        first_page = {
+            "data": [
+                {
+                    "id": "1",
+                    "from": {"id": 111, "username": "parent_user"},
+                    "like_count": 3,
+                    "text": "parent",
+                    "timestamp": "2023-01-01T12:00:00+0000",
+                    "replies": {
+                        "data": [
+                            {
+                                "id": "2",
+                                "from": {"id": 222, "username": "reply_user"},
+                                "like_count": 0,
+                                "text": "reply",
+                                "timestamp": "2023-01-01T13:00:00+0000",
+                            }
+                        ]
+                    },
+                },
+                # missing user info is skipped like before
+                {"id": "3", "text": "no author"},
+            ],
+            "paging": {"next": "https://graph.instagram.com/777/comments?after=x"},
+        }
+        second_page = {
+            "data": [
+                {
+                    "id": "4",
+                    "from": {"id": 111, "username": "parent_user"},
+                    "text": "second page",
+                    "timestamp": "2023-01-02T12:00:00+0000",
+                }
+            ]
+        }
+        mock_get.side_effect = [
+            Mock(status_code=200, json=lambda: first_page),
+            Mock(status_code=200, json=lambda: second_page),
+        ]
+
+        get_comment_data("fake_token", mock_post_id, self.account.account_API_ID)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(Comment.objects.get(id=2).parent_ID, "1")
+        self.assertEqual(Comment.objects.get(id=1).replies, ["2"])
+        self.assertFalse(Comment.objects.filter(id=3).exists())
+        self.assertEqual(Comment.objects.get(id=4).text, "second page")
+        self.assertEqual(InstagramUser.objects.get(id=111).num_comments, 2)
+
+    def _listing(self, start, count):
+        return {
+            "data": [
+                {
+                    "id": str(i),
+                    "from": {"id": 900, "username": "busy_user"},
+                    "like_count": 1,
+                    "text": f"comment {i}",
+                    "timestamp": "2023-01-01T12:00:00+0000",
+                    "replies": {
+                        "data": [
+                            {
+                                "id": str(i + 100000),
+                                "from": {"id": 901, "username": "replier"},
+                                "text": "reply",
+                                "timestamp": "2023-01-01T12:30:00+0000",
+                            }
+                        ]
+                    },
+                }
+                for i in range(start, start + count)
+            ]
+        }
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_comment_data_query_count_is_per_page(self, mock_get):
+        for post_id in ("small", "large"):
+            Post.objects.create(
+                instagram_account=self.account,
+                post_link=f"https://example.com/{post_id}",
+                post_API_ID=post_id,
+                date_posted=timezone.now(),
+            )
+        # both listings come from the same two commenters; store them up front
+        # so neither sync has to write them
+        for user_id, username in ((900, "busy_user"), (901, "replier")):
+            user = InstagramUser(
+                id=user_id, instagram_account=self.account, username=username
+            )
+            user.content_hash = content_hash(user, USER_HASH_FIELDS)
+            user.save()
+
+        mock_get.return_value = Mock(status_code=200, json=lambda: self._listing(1, 2))
+        with CaptureQueriesContext(connection) as small:
+            get_comment_data("fake_token", "small", self.account.account_API_ID)
+
+        mock_get.return_value = Mock(
+            status_code=200, json=lambda: self._listing(1000, 40)
+        )
+        with CaptureQueriesContext(connection) as large:
+            get_comment_data("fake_token", "large", self.account.account_API_ID)
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Comment.objects.count(), 84)
+        self.assertEqual(InstagramUser.objects.get(id=900).num_comments, 42)
+        self.assertEqual(InstagramUser.objects.get(id=901).num_comments, 42)
+        self.assertEqual(Comment.objects.get(id=101039).parent_ID, "1039")
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_comment_data_resync_keeps_counts_and_links_parent(self, mock_get):
+        Post.objects.create(
+            instagram_account=self.account,
+            post_link="https://example.com/post",
+            post_API_ID="p1",
+            date_posted=timezone.now(),
+        )
+        # a reply stored earlier without its parent
+        InstagramUser.objects.create(id=901, username="replier", num_comments=1)
+        Comment.objects.create(id=100001, text="reply", parent_ID="")
+
+        mock_get.return_value = Mock(status_code=200, json=lambda: self._listing(1, 1))
+        get_comment_data("fake_token", "p1", self.account.account_API_ID)
+        get_comment_data("fake_token", "p1", self.account.account_API_ID)
+
+        self.assertEqual(Comment.objects.get(id=100001).parent_ID, "1")
+        self.assertEqual(InstagramUser.objects.get(id=900).num_comments, 1)
+        self.assertEqual(InstagramUser.objects.get(id=901).num_comments, 1)
@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from social_tracker.models import Comment, InstagramAccount, Post, SyncJob
+from social_tracker.utils.content_hash import POST_HASH_FIELDS, content_hash
+from social_tracker.utils.fake_graph import FakeGraphData, FakeGraphServer
+from social_tracker.utils.get_instagram_data import (
+    get_comment_data,
+    get_instagram_posts,
+)
+from social_tracker.utils.sync_jobs import job_status
+
+
+class ContentHashTests(TestCase):
+    def test_hash_ignores_time_zone_of_dates(self):
+        utc = datetime(2024, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        local = utc.astimezone(dt_timezone(timedelta(hours=-8)))
+
+        self.assertEqual(
+            content_hash(Post(date_posted=utc, caption="a"), POST_HASH_FIELDS),
+            content_hash(Post(date_posted=local, caption="a"), POST_HASH_FIELDS),
+        )
+        self.assertNotEqual(
+            content_hash(Post(date_posted=utc, caption="a"), POST_HASH_FIELDS),
+            content_hash(Post(date_posted=utc, caption="b"), POST_HASH_FIELDS),
+        )
+
+    def test_job_status_totals_rows(self):
+        job = SyncJob(
+            stats={"posts_inserted": 2, "comments_written": 3, "posts_unchanged": 4}
+        )
+
+        self.assertEqual(job_status(job)["rows"], {"changed": 5, "skipped": 4})
+
+
+@override_settings(GRAPH_MAX_REQUESTS_PER_SECOND=1000, GRAPH_BURST=1000)
+class UnchangedRowTests(TestCase):
+    def setUp(self):
+        self.data = FakeGraphData(media=12, comments=4, replies=1, users=3)
+        self.account = InstagramAccount.objects.create(
+            account_API_ID=self.data.account_id, username=self.data.username
+        )
+        self.token = f"tok-{uuid.uuid4()}"
+        server = FakeGraphServer(self.data).start()
+        self.addCleanup(server.stop)
+        settings = override_settings(GRAPH_API_BASE_URL=server.base_url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def sync_posts(self):
+        stats = {}
+        get_instagram_posts(self.token, self.data.account_id, stats=stats)
+        return stats
+
+    def test_unchanged_posts_are_not_rewritten(self):
+        first = self.sync_posts()
+        self.assertEqual(first["posts_inserted"], 12)
+        self.data.media[5]["likes"] += 7
+        # make every stored post due for an insights refresh
+        Post.objects.update(metrics_refreshed_at=timezone.now() - timedelta(days=30))
+
+        second = self.sync_posts()
+
+        # the newest post is listed again and the other 11 are refreshed;
+        # only the one whose likes changed is written
+        self.assertEqual(second.get("posts_inserted", 0), 0)
+        self.assertEqual(second.get("posts_updated", 0), 0)
+        self.assertEqual(second["posts_refreshed"], 11)
+        self.assertEqual(second["posts_unchanged"], 11)
+        post = Post.objects.get(post_API_ID=self.data.media[5]["id"])
+        self.assertEqual(post.num_likes, self.data.media[5]["likes"])
+        self.assertEqual(post.content_hash, content_hash(post, POST_HASH_FIELDS))
+
+    def test_unchanged_comments_are_not_rewritten(self):
+        self.sync_posts()
+        post = self.data.media[0]
+        stats = {}
+
+        with CaptureQueriesContext(connection) as queries:
+            get_comment_data(self.token, post["id"], self.data.account_id, stats=stats)
+
+        self.assertEqual(stats["comments_written"], 0)
+        self.assertEqual(stats["comments_unchanged"], 8)
+        self.assertEqual(stats["users_written"], 0)
+        writes = [
+            q["sql"]
+            for q in queries.captured_queries
+            if "social_tracker_comment" in q["sql"]
+            and q["sql"].startswith(("INSERT", "UPDATE"))
+        ]
+        self.assertEqual(writes, [])
+
+        post["comments"][1]["text"] = "edited"
+        stats = {}
+        get_comment_data(self.token, post["id"], self.data.account_id, stats=stats)
+
+        self.assertEqual(stats["comments_written"], 1)
+        self.assertEqual(stats["comments_unchanged"], 7)
+        self.assertEqual(
+            Comment.objects.get(id=int(post["comments"][1]["id"])).text, "edited"
+        )
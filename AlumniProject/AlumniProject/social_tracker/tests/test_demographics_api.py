@@ -1,8 +1,8 @@
 from django.test import TestCase
 from unittest.mock import patch, Mock
 from social_tracker.models import Country, City, Age, InstagramAccount
-from social_tracker.views import update_demographics
 from social_tracker.utils.get_instagram_data import (
+    get_all_demographics,
     get_country_demographics,
     get_city_demographics,
     get_age_demographics,
@@ -18,7 +18,7 @@ class DemographicsTestCase(TestCase):
         )
         self.token = "fake_token"
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_country_demographics(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -50,7 +50,7 @@ class DemographicsTestCase(TestCase):
             Country.objects.filter(name="AR", num_interactions=300).exists()
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_city_demographics(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -92,7 +92,7 @@ class DemographicsTestCase(TestCase):
             ).exists()
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_age_demographics(self, mock_get):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -124,41 +124,81 @@ class DemographicsTestCase(TestCase):
             Age.objects.filter(age_range="25-34", num_interactions=450).exists()
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_country_demographics_api_error(self, mock_get):
         mock_get.side_effect = Exception("API Error")
         result = get_country_demographics(self.token, self.account_id)
         self.assertIn("Error getting country demographics", result)
         self.assertEqual(Country.objects.count(), 0)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_city_demographics_api_error(self, mock_get):
         mock_get.side_effect = Exception("API Error")
         result = get_city_demographics(self.token, self.account_id)
         self.assertIn("Error getting city demographics", result)
         self.assertEqual(City.objects.count(), 0)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_age_demographics_api_error(self, mock_get):
         mock_get.side_effect = Exception("API Error")
         result = get_age_demographics(self.token, self.account_id)
         self.assertIn("Error getting age demographics", result)
         self.assertEqual(Age.objects.count(), 0)
 
-    @patch("social_tracker.views.get_country_demographics")
-    @patch("social_tracker.views.get_city_demographics")
-    @patch("social_tracker.views.get_age_demographics")
-    @patch("social_tracker.models.AccessToken.objects.get")
-    def test_update_demographics_called(
-        self, mock_get_access_token, mock_get_age, mock_get_city, mock_get_country
-    ):
-        mock_access_token = Mock()
-        mock_access_token.token = self.token
-        mock_access_token.account_id = self.account_id
-        mock_get_access_token.return_value = mock_access_token
-
-        update_demographics()
-
-        mock_get_country.assert_called_once_with(self.token, self.account_id)
-        mock_get_city.assert_called_once_with(self.token, self.account_id)
-        mock_get_age.assert_called_once_with(self.token, self.account_id)
+    @staticmethod
+    def _breakdown_response(url, params):
+        results = {
+            "country": [{"dimension_values": ["US"], "value": 5}],
+            "city": [{"dimension_values": ["San Diego, California"], "value": 4}],
+            "age": [{"dimension_values": ["18-24"], "value": 3}],
+        }[params["breakdown"]]
+        resp = Mock(status_code=200)
+        resp.json.return_value = {
+            "data": [{"total_value": {"breakdowns": [{"results": results}]}}]
+        }
+        return resp
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_all_demographics_replaces_every_table(self, mock_get):
+        Country.objects.create(instagram_account=self.account, name="AR")
+        City.objects.create(instagram_account=self.account, name="Old City")
+        Age.objects.create(instagram_account=self.account, age_range="65+")
+        mock_get.side_effect = self._breakdown_response
+
+        result = get_all_demographics(self.token, self.account_id)
+
+        self.assertIsNone(result)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(
+            sorted(c[1]["params"]["breakdown"] for c in mock_get.call_args_list),
+            ["age", "city", "country"],
+        )
+        self.assertEqual(list(Country.objects.values_list("name", flat=True)), ["US"])
+        self.assertEqual(
+            list(City.objects.values_list("name", flat=True)),
+            ["San Diego, California"],
+        )
+        self.assertEqual(
+            list(Age.objects.values_list("age_range", "num_interactions")),
+            [("18-24", 3)],
+        )
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_all_demographics_keeps_table_of_failed_breakdown(self, mock_get):
+        City.objects.create(instagram_account=self.account, name="Old City")
+
+        def side_effect(url, params):
+            if params["breakdown"] == "city":
+                raise Exception("API Error")
+            return self._breakdown_response(url, params)
+
+        mock_get.side_effect = side_effect
+
+        result = get_all_demographics(self.token, self.account_id)
+
+        self.assertIn("Error getting city demographics", result)
+        self.assertEqual(
+            list(City.objects.values_list("name", flat=True)), ["Old City"]
+        )
+        self.assertEqual(Country.objects.count(), 1)
+        self.assertEqual(Age.objects.count(), 1)
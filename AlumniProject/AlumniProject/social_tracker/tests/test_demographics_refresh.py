@@ -0,0 +1,85 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from social_tracker.models import AccessToken, Age, InstagramAccount
+from social_tracker.utils.demographics_refresh import (
+    refresh_demographics,
+    refresh_demographics_if_stale,
+)
+
+
+@override_settings(
+    DEMOGRAPHICS_TTL_SECONDS=3600, DEMOGRAPHICS_REFRESH_TIMEOUT_SECONDS=300
+)
+class DemographicsFreshnessTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="DemoAcct"
+        )
+        AccessToken.objects.create(token="tok", account_id="fake_account")
+        Age.objects.create(
+            instagram_account=self.account, age_range="18-24", num_interactions=7
+        )
+
+    @patch("social_tracker.utils.demographics_refresh.start_background")
+    def test_stale_data_served_and_refreshed_once(self, mock_background):
+        first = self.client.get(reverse("api-demographics")).json()
+        second = self.client.get(reverse("api-demographics")).json()
+
+        # stored rows come back straight away
+        self.assertEqual(first["data"]["ageRanges"], {"18-24": 7})
+        self.assertIsNone(first["data"]["dataAgeSeconds"])
+        self.assertTrue(first["data"]["refreshing"])
+        # the second stale reader joins the refresh already claimed
+        self.assertFalse(second["data"]["refreshing"])
+        mock_background.assert_called_once_with(
+            refresh_demographics, "tok", "fake_account"
+        )
+
+    @patch("social_tracker.utils.demographics_refresh.start_background")
+    def test_fresh_data_is_not_refreshed(self, mock_background):
+        InstagramAccount.objects.filter(pk=self.account.pk).update(
+            demographics_refreshed_at=timezone.now() - timedelta(minutes=10)
+        )
+        data = self.client.get(reverse("api-demographics")).json()["data"]
+
+        mock_background.assert_not_called()
+        self.assertFalse(data["refreshing"])
+        self.assertAlmostEqual(data["dataAgeSeconds"], 600, delta=5)
+
+    @patch("social_tracker.utils.demographics_refresh.start_background")
+    def test_abandoned_claim_can_be_taken_over(self, mock_background):
+        InstagramAccount.objects.filter(pk=self.account.pk).update(
+            demographics_refresh_started=timezone.now() - timedelta(minutes=30)
+        )
+        self.assertTrue(refresh_demographics_if_stale("tok", "fake_account"))
+        mock_background.assert_called_once()
+
+    @patch(
+        "social_tracker.utils.demographics_refresh.get_all_demographics",
+        return_value=None,
+    )
+    def test_refresh_records_time_and_releases_claim(self, mock_all):
+        InstagramAccount.objects.filter(pk=self.account.pk).update(
+            demographics_refresh_started=timezone.now()
+        )
+        refresh_demographics("tok", "fake_account")
+
+        self.account.refresh_from_db()
+        mock_all.assert_called_once_with("tok", "fake_account")
+        self.assertIsNotNone(self.account.demographics_refreshed_at)
+        self.assertIsNone(self.account.demographics_refresh_started)
+
+    @patch(
+        "social_tracker.utils.demographics_refresh.get_all_demographics",
+        return_value="Error getting age demographics: boom",
+    )
+    def test_failed_refresh_stays_stale(self, mock_all):
+        refresh_demographics("tok", "fake_account")
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.demographics_refreshed_at)
+        self.assertIsNone(self.account.demographics_refresh_started)
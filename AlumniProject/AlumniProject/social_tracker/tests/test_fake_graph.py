@@ -0,0 +1,77 @@
+import uuid
+
+from django.test import TestCase, override_settings
+
+from social_tracker.models import Comment, InstagramAccount, InstagramUser, Post
+from social_tracker.utils.fake_graph import FakeGraphData, FakeGraphServer
+from social_tracker.utils.get_instagram_data import (
+    get_instagram_posts,
+    get_instagram_stories,
+    graph_batch,
+)
+
+
+@override_settings(GRAPH_MAX_REQUESTS_PER_SECOND=1000, GRAPH_BURST=1000)
+class FakeGraphTests(TestCase):
+    def setUp(self):
+        self.data = FakeGraphData(media=25, comments=2, replies=1, stories=2, users=5)
+        self.account = InstagramAccount.objects.create(
+            account_API_ID=self.data.account_id, username=self.data.username
+        )
+        # every test gets its own rate-limit bucket
+        self.token = f"tok-{uuid.uuid4()}"
+
+    def serve(self, **options):
+        server = FakeGraphServer(self.data, **options).start()
+        self.addCleanup(server.stop)
+        settings = override_settings(GRAPH_API_BASE_URL=server.base_url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return server
+
+    def test_data_is_deterministic(self):
+        again = FakeGraphData(media=25, comments=2, replies=1, stories=2, users=5)
+        self.assertEqual(self.data.media, again.media)
+        self.assertEqual(self.data.demographics, again.demographics)
+
+    def test_post_sync_pages_through_server(self):
+        server = self.serve(max_page_size=10)
+        stats = {}
+
+        res = get_instagram_posts(self.token, self.data.account_id, stats=stats)
+
+        self.assertEqual(res, "Posts processed successfully.")
+        self.assertEqual(stats["pages_fetched"], 3)
+        self.assertEqual(Post.objects.count(), 25)
+        self.assertEqual(Comment.objects.count(), 25 * 4)
+        self.assertEqual(Comment.objects.exclude(parent_ID="").count(), 25 * 2)
+        self.assertEqual(InstagramUser.objects.count(), 5)
+        newest = Post.objects.get(post_API_ID=self.data.media[0]["id"])
+        self.assertEqual(newest.num_likes, self.data.media[0]["likes"])
+        self.assertEqual(newest.num_comments, 4)
+        self.assertEqual(server.graph.throttled, 0)
+
+    def test_batch_requests(self):
+        self.serve()
+        post = self.data.media[3]
+
+        bodies = graph_batch(
+            self.token,
+            [f"v19.0/{post['id']}?fields=caption", "v19.0/unknown/insights"],
+        )
+
+        self.assertEqual(bodies[0]["caption"], post["caption"])
+        self.assertIn("error", bodies[1])
+
+    @override_settings(GRAPH_RETRY_BACKOFF=0)
+    def test_throttled_requests_are_retried(self):
+        server = self.serve(throttle_every=2)
+
+        stories = get_instagram_stories(self.token, self.data.account_id)
+
+        self.assertEqual(len(stories), 2)
+        self.assertGreater(server.graph.throttled, 0)
+        self.assertEqual(
+            [s["num_views"] for s in stories],
+            [s["reach"] for s in self.data.stories],
+        )
@@ -0,0 +1,154 @@
+from unittest.mock import patch, Mock
+
+import requests
+from django.test import SimpleTestCase
+
+from social_tracker.utils.graph_client import (
+    GraphClient,
+    SyncStats,
+    TokenBucket,
+    parse_business_usage,
+    parse_usage,
+)
+
+
+def response(status_code, headers=None):
+    return Mock(status_code=status_code, headers=headers or {})
+
+
+@patch("social_tracker.utils.graph_client.time.sleep")
+class GraphClientTests(SimpleTestCase):
+    def setUp(self):
+        self.client = GraphClient(timeout=(1, 2), max_retries=2, backoff=0.1)
+
+    def test_applies_timeouts_and_reuses_session(self, mock_sleep):
+        with patch.object(
+            self.client.session, "request", return_value=response(200)
+        ) as mock_request:
+            self.client.get("https://graph.instagram.com/me", params={"a": 1})
+            self.client.post("https://graph.instagram.com/", data={"b": 2})
+
+        mock_request.assert_any_call(
+            "GET", "https://graph.instagram.com/me", timeout=(1, 2), params={"a": 1}
+        )
+        mock_request.assert_any_call(
+            "POST", "https://graph.instagram.com/", timeout=(1, 2), data={"b": 2}
+        )
+        mock_sleep.assert_not_called()
+
+    def test_retries_transient_errors(self, mock_sleep):
+        with patch.object(
+            self.client.session,
+            "request",
+            side_effect=[response(503), response(429), response(200)],
+        ) as mock_request:
+            resp = self.client.get("https://graph.instagram.com/me")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_request.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        for args, _ in mock_sleep.call_args_list:
+            self.assertLessEqual(args[0], 0.2)
+
+    def test_honours_retry_after(self, mock_sleep):
+        with patch.object(
+            self.client.session,
+            "request",
+            side_effect=[response(429, {"Retry-After": "7"}), response(200)],
+        ):
+            self.client.get("https://graph.instagram.com/me")
+        mock_sleep.assert_called_once_with(7)
+
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        with patch.object(
+            self.client.session, "request", return_value=response(500)
+        ) as mock_request:
+            resp = self.client.get("https://graph.instagram.com/me")
+        self.assertEqual(resp.status_code, 500)
+        self.assertEqual(mock_request.call_count, 3)
+
+    def test_does_not_retry_client_errors(self, mock_sleep):
+        with patch.object(
+            self.client.session, "request", return_value=response(400)
+        ) as mock_request:
+            resp = self.client.get("https://graph.instagram.com/me")
+        self.assertEqual(resp.status_code, 400)
+        mock_request.assert_called_once()
+
+    def test_connection_errors_are_retried_then_raised(self, mock_sleep):
+        with patch.object(
+            self.client.session,
+            "request",
+            side_effect=requests.exceptions.ConnectionError("reset"),
+        ) as mock_request:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.get("https://graph.instagram.com/me")
+        self.assertEqual(mock_request.call_count, 3)
+
+
+class RateLimitTests(SimpleTestCase):
+    def test_parse_usage_headers(self):
+        self.assertEqual(
+            parse_usage('{"call_count": 28, "total_time": 25, "total_cputime": 40}'),
+            40,
+        )
+        self.assertIsNone(parse_usage(None))
+        self.assertEqual(
+            parse_business_usage(
+                '{"123": [{"type": "instagram", "call_count": 96, "total_cputime": 10,'
+                ' "total_time": 12, "estimated_time_to_regain_access": 3}]}'
+            ),
+            (96, 3),
+        )
+        self.assertEqual(parse_business_usage("not json"), (None, 0))
+
+    @patch("social_tracker.utils.graph_client.time.sleep")
+    def test_rate_drops_as_usage_climbs(self, mock_sleep):
+        client = GraphClient(max_retries=0)
+        headers = {"X-App-Usage": '{"call_count": 50}'}
+        with patch.object(
+            client.session, "request", return_value=response(200, headers)
+        ):
+            client.get("https://graph.instagram.com/me", params={"access_token": "t"})
+        bucket = client.bucket_for("t")
+        self.assertEqual(bucket.rate, bucket.max_rate)
+
+        headers["X-App-Usage"] = '{"call_count": 90}'
+        with patch.object(
+            client.session, "request", return_value=response(200, headers)
+        ):
+            client.get("https://graph.instagram.com/me", params={"access_token": "t"})
+        self.assertLess(bucket.rate, bucket.max_rate / 2)
+        self.assertEqual(client.stats("t").utilization, 90)
+        # another token is paced independently
+        self.assertEqual(client.bucket_for("other").rate, bucket.max_rate)
+
+    @patch("social_tracker.utils.graph_client.time.sleep")
+    def test_throttle_error_code_is_retried(self, mock_sleep):
+        client = GraphClient(max_retries=2, backoff=0.1)
+        throttled = response(400)
+        throttled.json.return_value = {"error": {"code": 4, "message": "limit"}}
+        with patch.object(
+            client.session, "request", side_effect=[throttled, response(200)]
+        ) as mock_request:
+            resp = client.get(
+                "https://graph.instagram.com/1/comments?access_token=t&after=x"
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(mock_request.call_count, 2)
+        # the token was read from the paging URL
+        self.assertEqual(client.stats("t").throttled, 1)
+        self.assertEqual(client.stats("t").requests, 2)
+
+    @patch("social_tracker.utils.graph_client.time.sleep")
+    @patch("social_tracker.utils.graph_client.time.monotonic", return_value=100.0)
+    def test_bucket_paces_and_pauses(self, mock_clock, mock_sleep):
+        bucket = TokenBucket(max_rate=2, capacity=2, slowdown_at=75, stats=SyncStats())
+        # the burst goes out at once, the next request waits one interval
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+        bucket.update(100, pause_seconds=30)
+        self.assertGreaterEqual(bucket.acquire(), 30)
+        self.assertEqual(bucket.stats.waits, 2)
@@ -0,0 +1,147 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch, Mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from social_tracker.models import InstagramAccount, Post, SyncState
+from social_tracker.utils.get_instagram_data import get_instagram_posts
+from social_tracker.tests.graph_responses import insights
+
+
+def media(post_id, day, likes=5):
+    return {
+        "id": post_id,
+        "timestamp": f"2024-03-{day:02d}T12:00:00+0000",
+        "permalink": f"http://example.com/{post_id}",
+        "insights": insights(likes),
+    }
+
+
+class IncrementalSyncTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="SyncAcct"
+        )
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_first_sync_pages_and_sets_watermark(self, mock_get, mock_post):
+        mock_get.side_effect = [
+            Mock(
+                status_code=200,
+                json=lambda: {
+                    "data": [media("3", 3), media("2", 2)],
+                    "paging": {
+                        "cursors": {"after": "c1"},
+                        "next": "https://graph.instagram.com/me/media?after=c1",
+                    },
+                },
+            ),
+            Mock(
+                status_code=200,
+                json=lambda: {
+                    "data": [media("1", 1)],
+                    "paging": {"cursors": {"after": "c2"}},
+                },
+            ),
+        ]
+
+        res = get_instagram_posts("tok", "fake_account")
+
+        self.assertEqual(res, "Posts processed successfully.")
+        self.assertEqual(Post.objects.count(), 3)
+        state = SyncState.objects.get(instagram_account=self.account)
+        self.assertEqual(state.newest_post_date.day, 3)
+        # the listing's insights count as a refresh
+        self.assertFalse(Post.objects.filter(metrics_refreshed_at=None).exists())
+        # nothing older than this run to refresh
+        mock_post.assert_not_called()
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_listed_posts_are_not_refreshed_on_next_sync(self, mock_get, mock_post):
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {"data": [media("3", 3), media("2", 2), media("1", 1)]},
+        )
+        get_instagram_posts("tok", "fake_account")
+
+        stats = {}
+        get_instagram_posts("tok", "fake_account", stats=stats)
+
+        # posts 2 and 1 are below the watermark now, but were read just now
+        mock_post.assert_not_called()
+        self.assertNotIn("posts_refreshed", stats)
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_sync_stops_at_watermark_and_refreshes_older(self, mock_get, mock_post):
+        old = Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="1",
+            post_link="http://example.com/1",
+            date_posted=timezone.now() - timedelta(days=400),
+            num_likes=1,
+        )
+        watermark = Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="2",
+            post_link="http://example.com/2",
+            date_posted=timezone.make_aware(
+                timezone.datetime(2024, 3, 2, 12), timezone.get_current_timezone()
+            ),
+        )
+        SyncState.objects.create(
+            instagram_account=self.account,
+            newest_post_date=watermark.date_posted,
+        )
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {
+                "data": [media("3", 3), media("2", 2), media("1", 1)],
+                "paging": {"next": "https://graph.instagram.com/me/media?after=x"},
+            },
+        )
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: [{"code": 200, "body": json.dumps(insights(77))}],
+        )
+
+        stats = {}
+        get_instagram_posts("tok", "fake_account", stats=stats)
+
+        # the older page is never requested
+        mock_get.assert_called_once()
+        self.assertEqual(stats["posts_inserted"], 1)
+        self.assertEqual(stats["posts_updated"], 1)
+        self.assertEqual(stats["posts_refreshed"], 1)
+        sent = json.loads(mock_post.call_args[1]["data"]["batch"])
+        self.assertEqual(len(sent), 1)
+        self.assertTrue(sent[0]["relative_url"].startswith("v19.0/1/insights"))
+        old.refresh_from_db()
+        self.assertEqual(old.num_likes, 77)
+        state = SyncState.objects.get(instagram_account=self.account)
+        self.assertEqual(state.newest_post_date.day, 3)
+
+    @override_settings(INSTAGRAM_REFRESH_TIERS=[(None, 7 * 24 * 60 * 60)])
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_recent_refresh_is_not_repeated(self, mock_get, mock_post):
+        Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="1",
+            post_link="http://example.com/1",
+            date_posted=timezone.now() - timedelta(days=400),
+            metrics_refreshed_at=timezone.now() - timedelta(days=5),
+        )
+        mock_get.return_value = Mock(
+            status_code=200, json=lambda: {"data": [media("3", 3)]}
+        )
+
+        stats = {}
+        get_instagram_posts("tok", "fake_account", stats=stats)
+
+        mock_post.assert_not_called()
+        self.assertNotIn("posts_refreshed", stats)
@@ -0,0 +1,91 @@
+import time
+import uuid
+from contextlib import closing
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from social_tracker.models import Comment, InstagramAccount, Post
+from social_tracker.utils.fake_graph import FakeGraphData, FakeGraphServer
+from social_tracker.utils.get_instagram_data import (
+    get_instagram_posts,
+    iter_prefetched,
+)
+
+
+class IterPrefetchedTests(SimpleTestCase):
+    def test_yields_pages_in_order(self):
+        self.assertEqual(list(iter_prefetched(iter_pages(5))), list(range(5)))
+        self.assertEqual(list(iter_prefetched(iter_pages(5), 0)), list(range(5)))
+
+    def test_producer_stays_bounded(self):
+        produced = []
+        pages = iter_prefetched(iter_pages(50, produced), max_pages=2)
+
+        self.assertEqual(next(pages), 0)
+        time.sleep(0.2)
+        # one page handed over, two queued, one waiting to be queued
+        self.assertLessEqual(len(produced), 4)
+        pages.close()
+
+    def test_close_stops_producer(self):
+        produced = []
+        with closing(iter_prefetched(iter_pages(1000, produced), 1)) as pages:
+            next(pages)
+        count = len(produced)
+        time.sleep(0.2)
+
+        self.assertEqual(len(produced), count)
+        self.assertLess(count, 1000)
+
+    def test_producer_errors_are_reraised(self):
+        def failing():
+            yield 1
+            raise ValueError("boom")
+
+        pages = iter_prefetched(failing())
+
+        self.assertEqual(next(pages), 1)
+        with self.assertRaisesMessage(ValueError, "boom"):
+            next(pages)
+
+
+@override_settings(GRAPH_MAX_REQUESTS_PER_SECOND=1000, GRAPH_BURST=1000)
+class PipelinedSyncTests(TestCase):
+    def setUp(self):
+        self.data = FakeGraphData(media=8, comments=7, replies=1, users=5)
+        self.account = InstagramAccount.objects.create(
+            account_API_ID=self.data.account_id, username=self.data.username
+        )
+        self.token = f"tok-{uuid.uuid4()}"
+
+    def sync(self, **settings):
+        with FakeGraphServer(self.data, latency=0.002, max_page_size=3) as server:
+            with override_settings(GRAPH_API_BASE_URL=server.base_url, **settings):
+                return get_instagram_posts(self.token, self.data.account_id)
+
+    def test_prefetched_sync_matches_sequential_sync(self):
+        self.assertEqual(
+            self.sync(INSTAGRAM_PREFETCH_PAGES=0), "Posts processed successfully."
+        )
+        sequential = sorted(
+            Comment.objects.values_list("id", "post_API_ID", "parent_ID")
+        )
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        self.account.sync_state.delete()
+
+        self.assertEqual(self.sync(), "Posts processed successfully.")
+
+        self.assertEqual(Post.objects.count(), 8)
+        self.assertEqual(Comment.objects.count(), 8 * 14)
+        self.assertEqual(
+            sorted(Comment.objects.values_list("id", "post_API_ID", "parent_ID")),
+            sequential,
+        )
+
+
+def iter_pages(count, produced=None):
+    for i in range(count):
+        if produced is not None:
+            produced.append(i)
+        yield i
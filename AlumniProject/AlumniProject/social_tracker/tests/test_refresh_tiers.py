@@ -0,0 +1,139 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch, Mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from social_tracker.models import AccessToken, InstagramAccount, Post
+from social_tracker.utils.refresh_tiers import (
+    describe_tier,
+    due_counts,
+    refresh_due_filter,
+)
+from social_tracker.tests.graph_responses import insights
+
+DAY = 24 * 60 * 60
+
+
+@override_settings(
+    INSTAGRAM_REFRESH_TIERS=[(2 * DAY, 0), (30 * DAY, DAY), (None, 7 * DAY)]
+)
+class RefreshTierTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acct", username="Tiers"
+        )
+        self.now = timezone.now()
+
+    def post(self, post_id, age_days, refreshed_days_ago=None):
+        refreshed = None
+        if refreshed_days_ago is not None:
+            refreshed = self.now - timedelta(days=refreshed_days_ago)
+        return Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID=post_id,
+            post_link=f"http://example.com/{post_id}",
+            date_posted=self.now - timedelta(days=age_days),
+            metrics_refreshed_at=refreshed,
+        )
+
+    def due_ids(self):
+        return set(
+            Post.objects.filter(refresh_due_filter(self.now)).values_list(
+                "post_API_ID", flat=True
+            )
+        )
+
+    def test_each_tier_uses_its_interval(self):
+        self.post("fresh", 1, refreshed_days_ago=0)
+        self.post("month_recent", 10, refreshed_days_ago=0.5)
+        self.post("month_stale", 10, refreshed_days_ago=2)
+        self.post("old_recent", 400, refreshed_days_ago=3)
+        self.post("old_stale", 400, refreshed_days_ago=8)
+        self.post("never", 400)
+
+        self.assertEqual(self.due_ids(), {"fresh", "month_stale", "old_stale", "never"})
+
+    def test_due_counts_per_tier(self):
+        self.post("fresh", 1, refreshed_days_ago=0)
+        self.post("month_stale", 10, refreshed_days_ago=2)
+        self.post("old_recent", 400, refreshed_days_ago=3)
+
+        counts = due_counts(Post.objects.all(), self.now)
+
+        self.assertEqual(
+            counts, [(2 * DAY, 0, 1), (30 * DAY, DAY, 1), (None, 7 * DAY, 0)]
+        )
+
+    @override_settings(INSTAGRAM_REFRESH_TIERS=[(30 * DAY, DAY)])
+    def test_posts_past_the_last_tier_are_never_due(self):
+        self.post("old", 400)
+
+        self.assertEqual(self.due_ids(), set())
+
+    def test_describe_tier(self):
+        self.assertEqual(describe_tier(2 * DAY, 0), "<=2d every sync")
+        self.assertEqual(describe_tier(None, 7 * DAY), "older every 7d")
+
+
+@override_settings(
+    INSTAGRAM_REFRESH_TIERS=[(2 * DAY, 0), (None, 7 * DAY)],
+    GRAPH_MAX_REQUESTS_PER_SECOND=1000,
+    GRAPH_BURST=1000,
+)
+class RefreshInsightsCommandTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acct", username="Tiers"
+        )
+        AccessToken.objects.create(token="tok", account_id="acct")
+        now = timezone.now()
+        self.due = Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="due",
+            post_link="http://example.com/due",
+            date_posted=now - timedelta(days=400),
+            metrics_refreshed_at=now - timedelta(days=8),
+        )
+        Post.objects.create(
+            instagram_account=self.account,
+            post_API_ID="recent",
+            post_link="http://example.com/recent",
+            date_posted=now - timedelta(days=400),
+            metrics_refreshed_at=now - timedelta(days=1),
+        )
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    def test_refreshes_only_due_posts(self, mock_post):
+        mock_post.return_value = Mock(
+            status_code=200,
+            json=lambda: [{"code": 200, "body": json.dumps(insights(42))}],
+        )
+        out = StringIO()
+
+        call_command("refresh_insights", stdout=out)
+
+        sent = json.loads(mock_post.call_args[1]["data"]["batch"])
+        self.assertEqual(len(sent), 1)
+        self.assertIn("/due/insights", sent[0]["relative_url"])
+        self.due.refresh_from_db()
+        self.assertEqual(self.due.num_likes, 42)
+        self.assertGreater(
+            self.due.metrics_refreshed_at, timezone.now() - timedelta(minutes=1)
+        )
+        self.assertIn("older every 7d: 1", out.getvalue())
+        self.assertIn("posts_refreshed=1", out.getvalue())
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    def test_dry_run_makes_no_calls(self, mock_post):
+        out = StringIO()
+
+        call_command("refresh_insights", "--dry-run", stdout=out)
+
+        mock_post.assert_not_called()
+        self.assertIn(
+            "Tiers (acct): <=2d every sync: 0, older every 7d: 1", out.getvalue()
+        )
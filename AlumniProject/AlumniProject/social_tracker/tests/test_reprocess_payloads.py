@@ -0,0 +1,122 @@
+import uuid
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from social_tracker.models import (
+    Comment,
+    GraphPayload,
+    InstagramAccount,
+    InstagramStory,
+    InstagramUser,
+    Post,
+)
+from social_tracker.utils.fake_graph import FakeGraphData, FakeGraphServer
+from social_tracker.utils.get_instagram_data import (
+    get_instagram_posts,
+    get_instagram_stories,
+)
+from social_tracker.utils.payload_staging import (
+    compress_payload,
+    decompress_payload,
+    stage_payloads,
+    staged_payloads,
+)
+from social_tracker.utils.reprocess_payloads import reprocess_account
+
+
+class PayloadStagingTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acc1", username="alumni"
+        )
+
+    def test_compression_round_trip(self):
+        data = {"id": "1", "caption": "héllo " * 50, "insights": {"data": []}}
+        blob = compress_payload(data)
+
+        self.assertLess(len(blob), len(str(data)))
+        self.assertEqual(decompress_payload(blob), data)
+
+    def test_restaging_replaces_payload(self):
+        stage_payloads(self.account, "media", [("1", {"caption": "old"})])
+        stage_payloads("acc1", "media", [("1", {"caption": "new"}), ("", {})])
+
+        self.assertEqual(GraphPayload.objects.count(), 1)
+        self.assertEqual(
+            list(staged_payloads(self.account, "media")),
+            [("1", "", {"caption": "new"})],
+        )
+
+    @override_settings(STAGE_GRAPH_PAYLOADS=False)
+    def test_staging_can_be_disabled(self):
+        stage_payloads(self.account, "media", [("1", {"caption": "old"})])
+
+        self.assertFalse(GraphPayload.objects.exists())
+
+
+@override_settings(GRAPH_MAX_REQUESTS_PER_SECOND=1000, GRAPH_BURST=1000)
+class ReprocessTests(TestCase):
+    def setUp(self):
+        self.data = FakeGraphData(media=12, comments=2, replies=1, stories=2, users=4)
+        self.account = InstagramAccount.objects.create(
+            account_API_ID=self.data.account_id, username=self.data.username
+        )
+        token = f"tok-{uuid.uuid4()}"
+        with FakeGraphServer(self.data) as server:
+            with override_settings(GRAPH_API_BASE_URL=server.base_url):
+                get_instagram_posts(token, self.data.account_id)
+                get_instagram_stories(token, self.data.account_id)
+
+    def snapshot(self):
+        return (
+            list(
+                Post.objects.order_by("post_API_ID").values_list(
+                    "post_API_ID", "caption", "num_likes", "num_comments", "num_shares"
+                )
+            ),
+            list(
+                Comment.objects.order_by("id").values_list(
+                    "id", "post_API_ID", "parent_ID", "text", "user_ID", "replies"
+                )
+            ),
+            list(
+                InstagramUser.objects.order_by("id").values_list(
+                    "id", "username", "num_comments"
+                )
+            ),
+            list(
+                InstagramStory.objects.order_by("story_API_ID").values_list(
+                    "story_API_ID", "num_views", "num_profile_clicks"
+                )
+            ),
+        )
+
+    def test_rebuilds_tables_without_api_calls(self):
+        before = self.snapshot()
+        self.assertEqual(len(before[0]), 12)
+        Comment.objects.all().delete()
+        InstagramUser.objects.all().delete()
+        InstagramStory.objects.all().delete()
+        Post.objects.update(caption="", num_likes=0)
+
+        with patch("social_tracker.utils.graph_client.GraphClient.send") as send:
+            stats = reprocess_account(self.account)
+
+        send.assert_not_called()
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(stats["posts_updated"], 12)
+        self.assertEqual(stats["stories_written"], 2)
+
+    def test_only_limits_parts(self):
+        InstagramStory.objects.all().delete()
+        Post.objects.update(num_likes=0)
+        out = StringIO()
+
+        call_command("reprocess_payloads", "--only", "stories", stdout=out)
+
+        self.assertEqual(InstagramStory.objects.count(), 2)
+        self.assertFalse(Post.objects.exclude(num_likes=0).exists())
+        self.assertIn("stories_written=2", out.getvalue())
@@ -1,10 +1,12 @@
 import json
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock
 from datetime import datetime
 
 from django.test import TestCase
-from social_tracker.models import InstagramAccount
+from social_tracker.models import InstagramAccount, InstagramStory
 from social_tracker.utils.get_instagram_data import get_instagram_stories
+from social_tracker.utils.reprocess_payloads import reprocess_account
+from social_tracker.tests.graph_responses import batch_response
 
 
 # Helper function to create mock API responses
@@ -22,14 +24,19 @@ def create_mock_response(status_code=200, json_data=None, text_data=""):
     return mock_resp
 
 
+def reach(value):
+    return {"data": [{"name": "reach", "values": [{"value": value}]}]}
+
+
 class GetInstagramStoriesTests(TestCase):
     def setUp(self):
         # Create accounts the tests reference
         for acct in ("acct123", "acct456", "acct789", "acct000", "acct001", "acct002"):
             InstagramAccount.objects.create(account_API_ID=acct, username=acct)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
-    def test_get_stories_success_one_story(self, mock_get):
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_stories_success_one_story(self, mock_get, mock_post):
         """Test successfully fetching one story with insights."""
         story_id = "11111"
         timestamp_str = "2024-04-24T10:00:00+0000"
@@ -44,28 +51,26 @@ class GetInstagramStoriesTests(TestCase):
             },
         )
 
-        mock_insights_response = create_mock_response(
-            status_code=200,
-            json_data={
-                "data": [
-                    {"name": "reach", "values": [{"value": 150}]},
-                    {"name": "navigation", "values": [{"value": 20}]},
-                    {"name": "profile_visits", "values": [{"value": 5}]},
-                ]
-            },
+        mock_get.return_value = mock_stories_response
+        mock_post.return_value = batch_response(
+            [
+                {
+                    "data": [
+                        {"name": "reach", "values": [{"value": 150}]},
+                        {"name": "navigation", "values": [{"value": 20}]},
+                        {"name": "profile_visits", "values": [{"value": 5}]},
+                    ]
+                }
+            ]
         )
 
-        mock_get.side_effect = [mock_stories_response, mock_insights_response]
-
         result = get_instagram_stories("fake_valid_token", "acct123")
 
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
 
         story_data = result[0]
-        expected_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S%z").replace(
-            tzinfo=None
-        )
+        expected_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S%z")
 
         self.assertEqual(story_data["story_API_ID"], story_id)
         self.assertEqual(story_data["story_link"], permalink)
@@ -75,26 +80,26 @@ class GetInstagramStoriesTests(TestCase):
         self.assertEqual(story_data["num_swipes_up"], 20)
         self.assertEqual(story_data["num_replies"], 0)
 
-        expected_calls = [
-            call(
-                "https://graph.instagram.com/v19.0/me/stories",
-                params={
-                    "fields": "id,timestamp,permalink",
-                    "access_token": "fake_valid_token",
-                },
-            ),
-            call(
-                f"https://graph.instagram.com/v19.0/{story_id}/insights",
-                params={
-                    "metric": "reach,navigation,profile_visits",
-                    "period": "lifetime",
-                    "access_token": "fake_valid_token",
-                },
-            ),
-        ]
-        mock_get.assert_has_calls(expected_calls)
+        mock_get.assert_called_once_with(
+            "https://graph.instagram.com/v19.0/me/stories",
+            params={
+                "fields": "id,timestamp,permalink",
+                "access_token": "fake_valid_token",
+            },
+        )
+        sent = json.loads(mock_post.call_args[1]["data"]["batch"])
+        self.assertEqual(
+            [item["relative_url"] for item in sent],
+            [
+                f"v19.0/{story_id}/insights"
+                "?metric=reach,navigation,profile_visits&period=lifetime"
+            ],
+        )
+        stored = InstagramStory.objects.get(story_API_ID=story_id)
+        self.assertEqual(stored.num_views, 150)
+        self.assertIsNotNone(stored.captured_at)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_stories_no_active_stories(self, mock_get):
         """Test fetching when the API returns no active stories."""
         mock_get.return_value = create_mock_response(
@@ -107,7 +112,7 @@ class GetInstagramStoriesTests(TestCase):
         self.assertEqual(result, [])
         mock_get.assert_called_once()
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_get_stories_api_error_on_stories_fetch(self, mock_get):
         """Test fetching when the /me/stories API call fails."""
         mock_get.return_value = create_mock_response(
@@ -122,8 +127,9 @@ class GetInstagramStoriesTests(TestCase):
         self.assertIn("Invalid token", result)
         mock_get.assert_called_once()
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
-    def test_get_stories_api_error_on_insights_fetch(self, mock_get):
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_get_stories_api_error_on_insights_fetch(self, mock_get, mock_post):
         """Test fetching successfully but failing on the insights call."""
         story_id = "22222"
         timestamp_str = "2024-04-23T12:00:00+0000"
@@ -137,22 +143,18 @@ class GetInstagramStoriesTests(TestCase):
                 ]
             },
         )
-        mock_insights_response = create_mock_response(
-            status_code=403,
-            json_data={"error": {"message": "Permissions error", "code": 200}},
+        mock_get.return_value = mock_stories_response
+        mock_post.return_value = batch_response(
+            [{"error": {"message": "Permissions error", "code": 200}}], code=403
         )
 
-        mock_get.side_effect = [mock_stories_response, mock_insights_response]
-
         result = get_instagram_stories("token_without_insights_perm", "acct000")
 
         self.assertIsInstance(result, list)
         self.assertEqual(len(result), 1)
 
         story_data = result[0]
-        expected_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S%z").replace(
-            tzinfo=None
-        )
+        expected_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S%z")
 
         self.assertEqual(story_data["story_API_ID"], story_id)
         self.assertEqual(story_data["date_posted"], expected_date)
@@ -161,7 +163,9 @@ class GetInstagramStoriesTests(TestCase):
         self.assertEqual(story_data["num_swipes_up"], 0)
         self.assertEqual(story_data["num_replies"], 0)
 
-        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_once()
+        mock_post.assert_called_once()
+        self.assertIsNone(InstagramStory.objects.get(story_API_ID=story_id).captured_at)
 
     def test_get_stories_missing_token(self):
         """Test calling the function with no access token."""
@@ -172,3 +176,97 @@ class GetInstagramStoriesTests(TestCase):
         result_empty = get_instagram_stories("", "acct002")
         self.assertIsInstance(result_empty, str)
         self.assertEqual(result_empty, "Access token is missing.")
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_expired_stories_are_kept_and_active_ones_updated(
+        self, mock_get, mock_post
+    ):
+        """Stories are upserted by ID, so earlier ones survive a later sync."""
+
+        def listing(*ids):
+            return create_mock_response(
+                json_data={
+                    "data": [
+                        {
+                            "id": story_id,
+                            "timestamp": "2024-04-24T10:00:00+0000",
+                            "permalink": f"http://example.com/{story_id}",
+                        }
+                        for story_id in ids
+                    ]
+                }
+            )
+
+        mock_get.side_effect = [listing("s1", "s2"), listing("s2")]
+        mock_post.side_effect = [
+            batch_response([reach(10), reach(20)]),
+            batch_response([reach(35)]),
+        ]
+
+        get_instagram_stories("tok", "acct123")
+        get_instagram_stories("tok", "acct123")
+
+        views = dict(InstagramStory.objects.values_list("story_API_ID", "num_views"))
+        self.assertEqual(views, {"s1": 10, "s2": 35})
+        # both stories' insights went out in the first batch POST
+        sent = json.loads(mock_post.call_args_list[0][1]["data"]["batch"])
+        self.assertEqual(len(sent), 2)
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_failed_insights_keep_stored_metrics(self, mock_get, mock_post):
+        """A snapshot whose insights fail does not zero the stored numbers."""
+        account = InstagramAccount.objects.get(account_API_ID="acct123")
+        InstagramStory.objects.create(
+            instagram_account=account, story_API_ID="s1", num_views=80
+        )
+        mock_get.return_value = create_mock_response(
+            json_data={
+                "data": [
+                    {
+                        "id": "s1",
+                        "timestamp": "2024-04-24T10:00:00+0000",
+                        "permalink": "http://example.com/s1",
+                    }
+                ]
+            }
+        )
+        mock_post.return_value = batch_response(
+            [{"error": {"message": "Unavailable", "code": 2}}], code=500
+        )
+
+        get_instagram_stories("tok", "acct123")
+
+        story = InstagramStory.objects.get(story_API_ID="s1")
+        self.assertEqual(story.num_views, 80)
+        self.assertEqual(story.story_link, "http://example.com/s1")
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_failed_insights_keep_staged_payload(self, mock_get, mock_post):
+        """Reprocessing after a failed snapshot rebuilds the last good one."""
+        mock_get.return_value = create_mock_response(
+            json_data={
+                "data": [
+                    {
+                        "id": "s1",
+                        "timestamp": "2024-04-24T10:00:00+0000",
+                        "permalink": "http://example.com/s1",
+                    }
+                ]
+            }
+        )
+        mock_post.side_effect = [
+            batch_response([reach(80)]),
+            batch_response(
+                [{"error": {"message": "Unavailable", "code": 2}}], code=500
+            ),
+        ]
+
+        get_instagram_stories("tok", "acct123")
+        get_instagram_stories("tok", "acct123")
+        account = InstagramAccount.objects.get(account_API_ID="acct123")
+        reprocess_account(account, ["stories"])
+
+        self.assertEqual(InstagramStory.objects.get(story_API_ID="s1").num_views, 80)
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from social_tracker.models import AccessToken, InstagramAccount, InstagramStory
+from social_tracker.utils.fake_graph import graph_time
+from social_tracker.utils.get_instagram_data import parse_story
+from social_tracker.utils.story_capture import (
+    capture_stories,
+    next_capture_at,
+    stored_active_stories,
+)
+
+NOW = datetime(2024, 4, 25, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def story(story_id, hours_old):
+    return {"story_API_ID": story_id, "date_posted": NOW - timedelta(hours=hours_old)}
+
+
+@override_settings(
+    STORY_CAPTURE_INTERVAL_SECONDS=3600,
+    STORY_CAPTURE_FAST_INTERVAL_SECONDS=600,
+    STORY_FINAL_SNAPSHOT_SECONDS=600,
+)
+class NextCaptureTests(TestCase):
+    def test_regular_interval(self):
+        self.assertEqual(
+            next_capture_at([story("s1", 2)], False, NOW), NOW + timedelta(hours=1)
+        )
+
+    def test_new_stories_poll_sooner(self):
+        self.assertEqual(
+            next_capture_at([story("s1", 0)], True, NOW), NOW + timedelta(minutes=10)
+        )
+
+    def test_final_snapshot_before_expiry(self):
+        # expires in 30 minutes: the final snapshot is due 10 minutes before
+        self.assertEqual(
+            next_capture_at([story("s1", 23.5)], False, NOW),
+            NOW + timedelta(minutes=20),
+        )
+
+    def test_story_past_its_final_snapshot_is_ignored(self):
+        self.assertEqual(
+            next_capture_at([story("s1", 23.95)], False, NOW),
+            NOW + timedelta(hours=1),
+        )
+
+
+class CaptureStoriesTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acct", username="Stories"
+        )
+        InstagramStory.objects.create(instagram_account=self.account, story_API_ID="s1")
+        AccessToken.objects.create(token="tok", account_id="acct")
+
+    @patch("social_tracker.utils.story_capture.get_instagram_stories")
+    def test_counts_new_stories(self, mock_stories):
+        mock_stories.return_value = [story("s1", 5), story("s2", 1)]
+
+        result, new_count, next_at = capture_stories("tok", "acct", NOW)
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(new_count, 1)
+        self.assertEqual(next_at, NOW + timedelta(minutes=10))
+
+    @patch("social_tracker.utils.story_capture.get_instagram_stories")
+    def test_error_is_retried_at_regular_interval(self, mock_stories):
+        mock_stories.return_value = "API Error fetching stories (500): down"
+
+        result, new_count, next_at = capture_stories("tok", "acct", NOW)
+
+        self.assertEqual(new_count, 0)
+        self.assertEqual(next_at, NOW + timedelta(hours=1))
+
+    @patch("social_tracker.utils.story_capture.get_instagram_stories")
+    def test_command_once(self, mock_stories):
+        mock_stories.return_value = [story("s1", 5)]
+        out = StringIO()
+
+        call_command("capture_stories", "--once", stdout=out)
+
+        mock_stories.assert_called_once_with("tok", "acct")
+        self.assertIn("acct: 1 active, 0 new, next capture at", out.getvalue())
+
+    def test_stored_active_stories_skip_expired(self):
+        for story_id, hours_old in (("fresh", 1), ("expired", 27)):
+            posted = parse_story(
+                {
+                    "id": story_id,
+                    "timestamp": graph_time(NOW - timedelta(hours=hours_old)),
+                },
+                [],
+            )["date_posted"]
+            InstagramStory.objects.create(
+                instagram_account=self.account,
+                story_API_ID=story_id,
+                date_posted=posted,
+            )
+
+        active = stored_active_stories("acct", now=NOW)
+
+        self.assertEqual([s["story_API_ID"] for s in active], ["fresh"])
@@ -0,0 +1,137 @@
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from social_tracker.models import AccessToken, InstagramAccount, SyncJob
+from social_tracker.utils.sync_jobs import sync_accounts
+
+
+class AccessTokenTests(TestCase):
+    def test_tokens_are_kept_per_account(self):
+        AccessToken.objects.create(token="old", account_id="a")
+        AccessToken.objects.create(token="b1", account_id="b")
+        AccessToken.objects.create(token="new", account_id="a")
+
+        self.assertEqual(
+            sorted(AccessToken.objects.values_list("account_id", "token")),
+            [("a", "new"), ("b", "b1")],
+        )
+
+
+class SyncAccountsTests(TestCase):
+    def setUp(self):
+        for name in ("chapter_a", "chapter_b", "chapter_c"):
+            InstagramAccount.objects.create(account_API_ID=name, username=name.upper())
+            AccessToken.objects.create(token=f"tok-{name}", account_id=name)
+        # an account without a token is left out
+        InstagramAccount.objects.create(account_API_ID="no_token", username="NONE")
+
+    def test_syncs_each_account_with_its_own_token(self):
+        def fake_sync(token, account_id, stats, progress):
+            stats["posts_inserted"] = len(account_id)
+            if account_id == "chapter_b":
+                return "Error getting Instagram posts: boom"
+            return "Posts processed successfully."
+
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts", side_effect=fake_sync
+        ) as mock_sync:
+            summaries = sync_accounts(max_workers=1)
+
+        self.assertEqual(
+            sorted(c.args[:2] for c in mock_sync.call_args_list),
+            [
+                ("tok-chapter_a", "chapter_a"),
+                ("tok-chapter_b", "chapter_b"),
+                ("tok-chapter_c", "chapter_c"),
+            ],
+        )
+        self.assertEqual(
+            [(s["username"], s["status"]) for s in summaries],
+            [("CHAPTER_A", "done"), ("CHAPTER_B", "failed"), ("CHAPTER_C", "done")],
+        )
+        self.assertEqual(summaries[0]["stages"]["media"]["posts_inserted"], 9)
+        self.assertIsNotNone(summaries[0]["seconds"])
+        self.assertFalse(
+            SyncJob.objects.exclude(status__in=["done", "failed"]).exists()
+        )
+
+    def test_accounts_run_in_parallel(self):
+        running = set()
+        overlapped = threading.Event()
+
+        def fake_run_job(job):
+            running.add(job.id)
+            if len(running) > 1:
+                overlapped.set()
+            overlapped.wait(1)
+            # the test database cannot be written from another thread
+            job.status = SyncJob.DONE
+            job.finished_at = timezone.now()
+            return job
+
+        with patch("social_tracker.utils.sync_jobs.run_job", side_effect=fake_run_job):
+            summaries = sync_accounts(
+                account_ids=["chapter_a", "chapter_c"], max_workers=2
+            )
+
+        self.assertTrue(overlapped.is_set())
+        self.assertEqual(
+            [s["account_id"] for s in summaries], ["chapter_a", "chapter_c"]
+        )
+
+    def test_command_prints_summary(self):
+        out = StringIO()
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_stories", return_value=[]
+        ):
+            call_command(
+                "sync_accounts",
+                "--stories",
+                "--account",
+                "chapter_a",
+                "--workers",
+                "1",
+                stdout=out,
+            )
+
+        self.assertIn("CHAPTER_A (chapter_a): done", out.getvalue())
+        self.assertIn("Synced 1 account(s), 0 failed.", out.getvalue())
+
+
+class AccountSelectionTests(TestCase):
+    def setUp(self):
+        for name in ("chapter_a", "chapter_b"):
+            InstagramAccount.objects.create(account_API_ID=name, username=name)
+            AccessToken.objects.create(token=f"tok-{name}", account_id=name)
+        user = User.objects.create_user(username="staff", password="pass")
+        self.client.force_login(user)
+
+    def queued_account(self, query=""):
+        response = self.client.get(reverse("get-posts") + query)
+        self.assertEqual(response.status_code, 202)
+        return SyncJob.objects.get(id=response.json()["job_id"]).instagram_account_id
+
+    def test_get_posts_picks_requested_account(self):
+        self.assertEqual(self.queued_account("?account=chapter_a"), "chapter_a")
+        # without one, the most recently connected account is synced
+        self.assertEqual(self.queued_account(), "chapter_b")
+
+    def test_get_posts_without_token(self):
+        response = self.client.get(reverse("get-posts") + "?account=unknown")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_deleting_account_keeps_other_tokens(self):
+        self.client.post(reverse("delete_account", args=["chapter_a"]))
+
+        self.assertEqual(
+            list(AccessToken.objects.values_list("account_id", flat=True)),
+            ["chapter_b"],
+        )
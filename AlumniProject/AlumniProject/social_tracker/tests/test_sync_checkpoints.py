@@ -0,0 +1,204 @@
+import random
+import uuid
+from datetime import timedelta
+from functools import partial
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from social_tracker.models import (
+    Comment,
+    InstagramAccount,
+    Post,
+    SyncCheckpoint,
+    SyncState,
+)
+from social_tracker.utils.fake_graph import (
+    FakeGraphData,
+    FakeGraphServer,
+    fake_comment,
+)
+from social_tracker.utils.get_instagram_data import (
+    get_comment_data,
+    get_instagram_posts,
+    graph,
+    save_comment_batch,
+)
+from social_tracker.utils.sync_checkpoints import (
+    MEDIA_SCOPE,
+    comments_scope,
+    load_checkpoint,
+    save_checkpoint,
+)
+
+
+def listing_cursor(url, params):
+    """Returns (last path segment, "after" cursor) of a listing request."""
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(params or {})
+    return parts.path.rsplit("/", 1)[-1], query.get("after", "")
+
+
+@override_settings(GRAPH_MAX_REQUESTS_PER_SECOND=1000, GRAPH_BURST=1000)
+class SyncCheckpointTests(TestCase):
+    def setUp(self):
+        self.data = FakeGraphData(media=25, comments=12, replies=0, users=4)
+        self.account = InstagramAccount.objects.create(
+            account_API_ID=self.data.account_id, username=self.data.username
+        )
+        self.token = f"tok-{uuid.uuid4()}"
+        server = FakeGraphServer(self.data, max_page_size=10).start()
+        self.addCleanup(server.stop)
+        settings = override_settings(GRAPH_API_BASE_URL=server.base_url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def sync(self, sync, *args, fail_at=None):
+        """
+        Runs sync(*args) and returns (result, listing requests). The request
+        for the (listing, cursor) pair fail_at raises a ConnectionError, as
+        if the worker died there.
+        """
+        real_get = graph.get
+        requested = []
+
+        def get(url, params=None):
+            listing = listing_cursor(url, params)
+            requested.append(listing)
+            if listing == fail_at:
+                raise requests.exceptions.ConnectionError("worker restarted")
+            return real_get(url, params=params)
+
+        with patch("social_tracker.utils.get_instagram_data.graph.get", get):
+            return sync(*args), requested
+
+    def test_interrupted_media_sync_resumes_from_checkpoint(self):
+        result, _ = self.sync(
+            get_instagram_posts,
+            self.token,
+            self.data.account_id,
+            fail_at=("media", "20"),
+        )
+
+        self.assertIn("worker restarted", result)
+        self.assertEqual(Post.objects.count(), 20)
+        checkpoint = load_checkpoint(self.account, MEDIA_SCOPE)
+        self.assertEqual(checkpoint.cursor, "20")
+        self.assertEqual(checkpoint.last_object_id, self.data.media[19]["id"])
+        self.assertEqual(SyncCheckpoint.objects.count(), 1)
+
+        result, requested = self.sync(
+            get_instagram_posts, self.token, self.data.account_id
+        )
+
+        self.assertEqual(result, "Posts processed successfully.")
+        self.assertEqual([r for r in requested if r[0] == "media"], [("media", "20")])
+        self.assertEqual(Post.objects.count(), 25)
+        self.assertFalse(SyncCheckpoint.objects.exists())
+        newest = Post.objects.order_by("-date_posted").first().date_posted
+        self.assertEqual(SyncState.objects.get().newest_post_date, newest)
+
+    def test_interrupted_comment_sync_resumes_from_checkpoint(self):
+        post_id = self.data.media[0]["id"]
+        Post.objects.create(instagram_account=self.account, post_API_ID=post_id)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.sync(
+                get_comment_data,
+                self.token,
+                post_id,
+                self.data.account_id,
+                fail_at=("comments", "10"),
+            )
+
+        self.assertEqual(Comment.objects.count(), 10)
+        checkpoint = load_checkpoint(self.account, comments_scope(post_id))
+        self.assertEqual(checkpoint.cursor, "10")
+        self.assertIsNone(Post.objects.get().comments_synced_at)
+
+        _, requested = self.sync(
+            get_comment_data, self.token, post_id, self.data.account_id
+        )
+
+        self.assertEqual(requested, [("comments", "10")])
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertFalse(SyncCheckpoint.objects.exists())
+        self.assertIsNotNone(Post.objects.get().comments_synced_at)
+
+    def test_interrupted_comment_sync_of_synced_post_resumes(self):
+        self.sync(get_instagram_posts, self.token, self.data.account_id)
+        self.assertEqual(Comment.objects.count(), 25 * 12)
+        post = self.data.media[0]
+        rng = random.Random(1)
+        for n in range(5):
+            comment = fake_comment(9900000 + n, post, post["comments"][0]["from"], rng)
+            post["comments"].append(comment)
+            self.data.objects[comment["id"]] = comment
+
+        result, _ = self.sync(
+            get_instagram_posts,
+            self.token,
+            self.data.account_id,
+            fail_at=("comments", "10"),
+        )
+
+        self.assertIn("worker restarted", result)
+        scope = comments_scope(post["id"])
+        self.assertEqual(load_checkpoint(self.account, scope).cursor, "10")
+        # the new num_comments is already stored; the checkpoint tells the
+        # next sync where this post's incomplete comments resume
+        self.assertEqual(Post.objects.get(post_API_ID=post["id"]).num_comments, 17)
+
+        stats = {}
+        result, requested = self.sync(
+            partial(get_instagram_posts, stats=stats), self.token, self.data.account_id
+        )
+
+        self.assertEqual(result, "Posts processed successfully.")
+        self.assertIn(("comments", "10"), requested)
+        self.assertEqual(stats["comment_syncs"], 1)
+        self.assertEqual(Comment.objects.filter(post_API_ID=post["id"]).count(), 17)
+        self.assertFalse(SyncCheckpoint.objects.exists())
+
+    def test_comment_page_that_fails_to_save_is_fetched_again(self):
+        post_id = self.data.media[0]["id"]
+        Post.objects.create(instagram_account=self.account, post_API_ID=post_id)
+        real_save = save_comment_batch
+        calls = []
+
+        def save(parsed, stats=None):
+            calls.append(len(parsed))
+            if len(calls) == 2:
+                raise OperationalError("database is locked")
+            return real_save(parsed, stats)
+
+        with patch("social_tracker.utils.get_instagram_data.save_comment_batch", save):
+            self.sync(get_comment_data, self.token, post_id, self.data.account_id)
+
+        self.assertEqual(Comment.objects.count(), 10)
+        checkpoint = load_checkpoint(self.account, comments_scope(post_id))
+        self.assertEqual(checkpoint.cursor, "10")
+        self.assertIsNone(Post.objects.get().comments_synced_at)
+
+        _, requested = self.sync(
+            get_comment_data, self.token, post_id, self.data.account_id
+        )
+
+        self.assertEqual(requested, [("comments", "10")])
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertIsNotNone(Post.objects.get().comments_synced_at)
+
+    @override_settings(SYNC_CHECKPOINT_MAX_AGE_SECONDS=60)
+    def test_stale_checkpoints_are_dropped(self):
+        save_checkpoint(self.account, MEDIA_SCOPE, "20")
+        self.assertIsNotNone(load_checkpoint(self.account, MEDIA_SCOPE))
+
+        SyncCheckpoint.objects.update(updated_at=timezone.now() - timedelta(minutes=2))
+
+        self.assertIsNone(load_checkpoint(self.account, MEDIA_SCOPE))
+        self.assertFalse(SyncCheckpoint.objects.exists())
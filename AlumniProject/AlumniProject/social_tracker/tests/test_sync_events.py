@@ -0,0 +1,79 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from social_tracker.models import InstagramAccount, SyncJob
+from social_tracker.utils.sync_events import job_events
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(":"):
+            continue
+        name, data = chunk.strip().split("\n")
+        events.append((name.partition(": ")[2], json.loads(data.partition(": ")[2])))
+    return events
+
+
+class SyncEventsTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="EventsAcct"
+        )
+        self.user = User.objects.create_user(username="staff", password="pass")
+
+    async def collect(self, job, advance):
+        chunks = []
+        async for chunk in job_events(job.id, poll_interval=0, keepalive=0):
+            chunks.append(chunk)
+            await sync_to_async(advance)(len(chunks))
+        return parse_events(chunks)
+
+    async def test_streams_progress_until_done(self):
+        job = await SyncJob.objects.acreate(
+            instagram_account=self.account, status=SyncJob.RUNNING
+        )
+
+        def advance(sent):
+            if sent == 1:
+                SyncJob.objects.filter(id=job.id).update(
+                    stage="media", stats={"pages_fetched": 1, "posts_inserted": 3}
+                )
+            elif sent == 3:
+                SyncJob.objects.filter(id=job.id).update(
+                    status=SyncJob.DONE, message="Posts processed successfully."
+                )
+
+        events = await self.collect(job, advance)
+
+        names = [name for name, _ in events]
+        self.assertEqual(names, ["progress", "progress", "done"])
+        self.assertEqual(events[1][1]["stage"], "media")
+        self.assertEqual(events[1][1]["stages"]["media"]["posts_inserted"], 3)
+        self.assertEqual(events[2][1]["message"], "Posts processed successfully.")
+
+    async def test_events_endpoint_streams(self):
+        job = await SyncJob.objects.acreate(
+            instagram_account=self.account, status=SyncJob.FAILED, message="boom"
+        )
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(
+            reverse("sync-job-events", args=[job.id])
+        )
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = [chunk.decode() async for chunk in response.streaming_content]
+        [(name, status)] = parse_events(chunks)
+        self.assertEqual(name, "done")
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["message"], "boom")
+
+    async def test_unknown_job_is_404(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("sync-job-events", args=[999]))
+        self.assertEqual(response.status_code, 404)
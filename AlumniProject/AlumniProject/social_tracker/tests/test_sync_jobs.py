@@ -0,0 +1,151 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch, Mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from social_tracker.models import AccessToken, InstagramAccount, Post, SyncJob
+from social_tracker.utils.sync_jobs import claim_next_job, enqueue_sync, run_job
+
+
+def media_page():
+    return {
+        "data": [
+            {
+                "id": "1",
+                "timestamp": "2024-03-01T12:00:00+0000",
+                "permalink": "http://example.com/1",
+                "insights": {
+                    "data": [
+                        {"name": "likes", "values": [{"value": 3}]},
+                        {"name": "comments", "values": [{"value": 0}]},
+                        {"name": "saved", "values": [{"value": 0}]},
+                        {"name": "shares", "values": [{"value": 0}]},
+                    ]
+                },
+            }
+        ],
+        "paging": {"cursors": {"after": "c1"}},
+    }
+
+
+class SyncJobTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="fake_account", username="JobAcct"
+        )
+        AccessToken.objects.create(token="tok", account_id="fake_account")
+        user = User.objects.create_user(username="staff", password="pass")
+        self.client.force_login(user)
+
+    def test_get_posts_view_only_enqueues(self):
+        with patch("social_tracker.utils.sync_jobs.get_instagram_posts") as mock_sync:
+            response = self.client.get(reverse("get-posts"))
+
+        self.assertEqual(response.status_code, 202)
+        job = SyncJob.objects.get(id=response.json()["job_id"])
+        self.assertEqual(job.status, SyncJob.QUEUED)
+        self.assertEqual(job.instagram_account, self.account)
+        mock_sync.assert_not_called()
+
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_worker_runs_job_and_reports_stages(self, mock_get):
+        mock_get.return_value = Mock(status_code=200, json=media_page)
+        job, _ = enqueue_sync(self.account)
+
+        call_command("run_sync_worker", "--once", stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.DONE)
+        self.assertEqual(job.message, "Posts processed successfully.")
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(Post.objects.count(), 1)
+
+        status = self.client.get(reverse("sync-job-status", args=[job.id])).json()
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(status["stage"], "insights")
+        self.assertEqual(status["stages"]["media"]["pages_fetched"], 1)
+        self.assertEqual(status["stages"]["media"]["posts_inserted"], 1)
+        self.assertEqual(status["stages"]["comments"]["comment_syncs"], 0)
+
+    def test_progress_is_saved_while_running(self):
+        job, _ = enqueue_sync(self.account)
+        seen = []
+
+        def fake_sync(token, account_id, stats, progress):
+            stats["pages_fetched"] = 2
+            progress("comments")
+            seen.append(SyncJob.objects.get(id=job.id))
+            return "Posts processed successfully."
+
+        with patch("social_tracker.utils.sync_jobs.get_instagram_posts", fake_sync):
+            run_job(claim_next_job())
+
+        self.assertEqual(seen[0].status, SyncJob.RUNNING)
+        self.assertEqual(seen[0].stage, "comments")
+        self.assertEqual(seen[0].stats["pages_fetched"], 2)
+        self.assertEqual(seen[0].stats["rate_limit_waits"], 0)
+
+    @patch("social_tracker.utils.get_instagram_data.graph.post")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
+    def test_story_job_counts_stories(self, mock_get, mock_post):
+        mock_get.return_value = Mock(
+            status_code=200,
+            json=lambda: {
+                "data": [
+                    {
+                        "id": "s1",
+                        "timestamp": "2024-03-01T12:00:00+0000",
+                        "permalink": "http://example.com/s1",
+                    }
+                ]
+            },
+        )
+        reach = {"data": [{"name": "reach", "values": [{"value": 9}]}]}
+        mock_post.return_value = Mock(
+            status_code=200, json=lambda: [{"code": 200, "body": json.dumps(reach)}]
+        )
+        job, _ = enqueue_sync(self.account, SyncJob.STORIES)
+
+        run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.DONE)
+        self.assertEqual(job.stage, "insights")
+        self.assertEqual(job.stats["stories_fetched"], 1)
+        self.assertEqual(job.stats["story_insights_fetched"], 1)
+        stories = self.client.get(reverse("list-stories")).json()["stories"]
+        self.assertEqual([s["num_views"] for s in stories], [9])
+
+    def test_error_message_fails_job(self):
+        job, _ = enqueue_sync(self.account)
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts",
+            return_value="Error getting Instagram posts: boom",
+        ):
+            run_job(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.FAILED)
+        self.assertEqual(job.message, "Error getting Instagram posts: boom")
+
+    @override_settings(SYNC_JOB_TIMEOUT_SECONDS=60)
+    def test_claims_are_exclusive_until_abandoned(self):
+        job, _ = enqueue_sync(self.account)
+
+        self.assertEqual(claim_next_job().id, job.id)
+        self.assertIsNone(claim_next_job())
+
+        SyncJob.objects.filter(id=job.id).update(
+            started_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(claim_next_job().id, job.id)
+
+    def test_unknown_job_is_404(self):
+        response = self.client.get(reverse("sync-job-status", args=[999]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,199 @@
+import itertools
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from social_tracker.models import (
+    AccessToken,
+    InstagramAccount,
+    InstagramStory,
+    SyncJob,
+    SyncLock,
+)
+from social_tracker.utils.sync_jobs import (
+    claim_next_job,
+    enqueue_sync,
+    run_job,
+    sync_accounts,
+)
+from social_tracker.utils.sync_locks import (
+    acquire_sync_lock,
+    release_sync_lock,
+    sync_lock,
+)
+
+
+class SyncLockTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acct", username="Locked"
+        )
+
+    def test_lock_is_exclusive_per_account_and_kind(self):
+        self.assertTrue(acquire_sync_lock("acct", SyncJob.POSTS, "one"))
+        self.assertFalse(acquire_sync_lock("acct", SyncJob.POSTS, "two"))
+        # the holder may take it again, and a stories sync is not blocked
+        self.assertTrue(acquire_sync_lock("acct", SyncJob.POSTS, "one"))
+        self.assertTrue(acquire_sync_lock("acct", SyncJob.STORIES, "two"))
+
+        release_sync_lock("acct", SyncJob.POSTS, "one")
+        self.assertTrue(acquire_sync_lock("acct", SyncJob.POSTS, "two"))
+
+    @override_settings(SYNC_JOB_TIMEOUT_SECONDS=60)
+    def test_abandoned_lock_is_taken_over(self):
+        acquire_sync_lock("acct", SyncJob.POSTS, "crashed")
+        SyncLock.objects.update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+        self.assertTrue(acquire_sync_lock("acct", SyncJob.POSTS, "new"))
+        self.assertEqual(SyncLock.objects.get().holder, "new")
+
+    def test_context_manager_releases(self):
+        with sync_lock("acct", SyncJob.POSTS) as acquired:
+            self.assertTrue(acquired)
+            with sync_lock("acct", SyncJob.POSTS) as again:
+                self.assertFalse(again)
+        self.assertFalse(SyncLock.objects.exists())
+
+
+class CoalescingTests(TestCase):
+    def setUp(self):
+        self.account = InstagramAccount.objects.create(
+            account_API_ID="acct", username="Locked"
+        )
+        AccessToken.objects.create(token="tok", account_id="acct")
+        user = User.objects.create_user(username="staff", password="pass")
+        self.client.force_login(user)
+
+    def test_duplicate_requests_join_one_job(self):
+        first = self.client.get(reverse("get-posts")).json()
+        second = self.client.get(reverse("get-posts")).json()
+
+        self.assertEqual(first["job_id"], second["job_id"])
+        self.assertFalse(first["joined"])
+        self.assertTrue(second["joined"])
+        self.assertEqual(SyncJob.objects.count(), 1)
+
+    def test_running_job_is_joined_and_finished_one_is_not(self):
+        job, _ = enqueue_sync(self.account)
+        claim_next_job()
+
+        self.assertEqual(enqueue_sync(self.account), (job, False))
+        # a stories sync is a different crawl
+        self.assertTrue(enqueue_sync(self.account, SyncJob.STORIES)[1])
+
+        SyncJob.objects.filter(id=job.id).update(status=SyncJob.DONE)
+        self.assertTrue(enqueue_sync(self.account)[1])
+
+    def test_locked_account_is_not_claimed(self):
+        job, _ = enqueue_sync(self.account)
+        acquire_sync_lock("acct", SyncJob.POSTS, "refresh_insights")
+
+        self.assertIsNone(claim_next_job())
+
+        release_sync_lock("acct", SyncJob.POSTS, "refresh_insights")
+        self.assertEqual(claim_next_job().id, job.id)
+
+    def test_job_is_requeued_while_locked(self):
+        job, _ = enqueue_sync(self.account)
+        claimed = claim_next_job()
+        acquire_sync_lock("acct", SyncJob.POSTS, "other")
+
+        with patch("social_tracker.utils.sync_jobs.get_instagram_posts") as mock_sync:
+            run_job(claimed)
+
+        mock_sync.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, SyncJob.QUEUED)
+
+    def test_job_releases_lock(self):
+        enqueue_sync(self.account)
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts",
+            return_value="Posts processed successfully.",
+        ):
+            run_job(claim_next_job())
+
+        self.assertFalse(SyncLock.objects.exists())
+
+    def test_sync_accounts_waits_for_running_job(self):
+        job, _ = enqueue_sync(self.account)
+        claim_next_job()
+
+        def other_worker_finishes(seconds):
+            SyncJob.objects.filter(id=job.id).update(
+                status=SyncJob.DONE,
+                message="Posts processed successfully.",
+                finished_at=timezone.now(),
+            )
+
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts"
+        ) as mock_sync, patch(
+            "social_tracker.utils.sync_jobs.time.sleep",
+            side_effect=other_worker_finishes,
+        ):
+            summaries = sync_accounts(max_workers=1)
+
+        mock_sync.assert_not_called()
+        self.assertEqual(summaries[0]["id"], job.id)
+        self.assertEqual(summaries[0]["status"], SyncJob.DONE)
+
+    def test_sync_accounts_waits_for_held_lock(self):
+        acquire_sync_lock("acct", SyncJob.POSTS, "refresh_insights")
+
+        def holder_finishes(seconds):
+            release_sync_lock("acct", SyncJob.POSTS, "refresh_insights")
+
+        out = StringIO()
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts",
+            return_value="Posts processed successfully.",
+        ) as mock_sync, patch(
+            "social_tracker.utils.sync_jobs.time.sleep", side_effect=holder_finishes
+        ):
+            call_command("sync_accounts", stdout=out)
+
+        mock_sync.assert_called_once()
+        self.assertIn("Locked (acct): done in", out.getvalue())
+        self.assertEqual(SyncJob.objects.get().status, SyncJob.DONE)
+
+    def test_sync_accounts_reports_a_lock_that_is_never_freed(self):
+        acquire_sync_lock("acct", SyncJob.POSTS, "refresh_insights")
+
+        out = StringIO()
+        with patch(
+            "social_tracker.utils.sync_jobs.get_instagram_posts"
+        ) as mock_sync, patch("social_tracker.utils.sync_jobs.time.sleep"), patch(
+            "social_tracker.utils.sync_jobs.time.monotonic",
+            side_effect=itertools.count(0, 10**6),
+        ):
+            call_command("sync_accounts", stdout=out)
+
+        mock_sync.assert_not_called()
+        self.assertIn("Locked (acct): queued, ", out.getvalue())
+
+    def test_stories_view_joins_running_sync(self):
+        InstagramStory.objects.create(
+            instagram_account=self.account,
+            story_API_ID="s1",
+            date_posted=timezone.now() - timedelta(hours=1),
+            num_views=12,
+        )
+        acquire_sync_lock("acct", SyncJob.STORIES, "capture")
+
+        with patch("social_tracker.views.get_instagram_stories") as mock_sync, patch(
+            "social_tracker.views.wait_for_sync_lock", return_value=True
+        ):
+            response = self.client.get(reverse("get-stories"))
+
+        mock_sync.assert_not_called()
+        stories = response.json()["stories"]
+        self.assertEqual(
+            [(s["story_API_ID"], s["num_views"]) for s in stories], [("s1", 12)]
+        )
@@ -23,7 +23,7 @@ class UserModelTests(TestCase):
             date_posted=timezone.now(),
         )
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_user_created_with_comment(self, mock_get):
         self._make_post("222")
 
@@ -53,7 +53,7 @@ class UserModelTests(TestCase):
         self.assertIsNotNone(comment_obj)
         self.assertTrue(InstagramUser.objects.filter(id=user_id).exists())
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_user_not_duplicated_on_second_comment(self, mock_get):
         self._make_post("222")
 
@@ -95,7 +95,7 @@ class UserModelTests(TestCase):
         self.assertEqual(user.num_comments, 2)
         self.assertEqual(InstagramUser.objects.count(), 1)
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_user_missing_data(self, mock_get):
         self._make_post("222")
 
@@ -115,7 +115,7 @@ class UserModelTests(TestCase):
         self.assertFalse(InstagramUser.objects.exists())
         self.assertFalse(Comment.objects.exists())
 
-    @patch("social_tracker.utils.get_instagram_data.requests.get")
+    @patch("social_tracker.utils.get_instagram_data.graph.get")
     def test_api_error(self, mock_get):
         self._make_post("222")
 
@@ -0,0 +1,152 @@
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from social_tracker.utils.graph_client import graph
+
+RECORD = "record"
+REPLAY = "replay"
+
+# response headers worth keeping: the client reads the usage ones
+KEPT_HEADERS = [
+    "Content-Type",
+    "Retry-After",
+    "X-App-Usage",
+    "X-Business-Use-Case-Usage",
+]
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Raised on replay when a request has no recorded exchange left."""
+
+
+class Cassette:
+    """
+    Graph API exchanges recorded to, or replayed from, a gzip-compressed
+    JSON file.
+
+    Exchanges are keyed by method, URL and parameters with the access token
+    left out, so a cassette recorded with one token replays with any other.
+    Repeated identical requests replay their recorded responses in order.
+
+    Attributes:
+        path (str): The cassette file.
+        mode (str): RECORD or REPLAY.
+        realtime (bool): On replay, sleep for each exchange's recorded duration
+            instead of answering straight away.
+    """
+
+    def __init__(self, path, mode=REPLAY, realtime=False):
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.pending = defaultdict(deque)
+        self.played = 0
+        if mode == REPLAY:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                self.interactions = json.load(f)["interactions"]
+            for interaction in self.interactions:
+                self.pending[interaction["key"]].append(interaction)
+
+    def send(self, real_send, method, url, **kwargs):
+        """
+        Stands in for GraphClient.send: performs the exchange with real_send
+        and records it, or answers it from the cassette.
+        """
+        key = request_key(method, url, kwargs)
+        if self.mode == REPLAY:
+            return self.replay(key)
+
+        started = time.monotonic()
+        response = real_send(method, url, **kwargs)
+        interaction = {
+            "key": key,
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in KEPT_HEADERS
+                if name in response.headers
+            },
+            "body": response.text,
+            "elapsed": round(time.monotonic() - started, 4),
+        }
+        with self.lock:
+            self.interactions.append(interaction)
+        return response
+
+    def replay(self, key):
+        with self.lock:
+            queue = self.pending.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded response for {key}")
+            interaction = queue.popleft()
+            self.played += 1
+        if self.realtime:
+            time.sleep(interaction["elapsed"])
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.headers = CaseInsensitiveDict(interaction["headers"])
+        response._content = interaction["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = key.split(" ", 1)[1]
+        return response
+
+    def save(self):
+        """Writes the recorded exchanges to the cassette file."""
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump({"version": 1, "interactions": self.interactions}, f)
+
+    @property
+    def recorded_seconds(self):
+        """Total time the recorded exchanges took."""
+        return sum(i["elapsed"] for i in self.interactions)
+
+
+def request_key(method, url, kwargs):
+    """
+    Returns "<METHOD> <url>?<params>" with the parameters of the URL, the
+    query string and the form body merged, sorted, and the access token
+    removed.
+    """
+    parts = urlparse(url)
+    params = parse_qsl(parts.query)
+    for name in ("params", "data"):
+        values = kwargs.get(name) or {}
+        if isinstance(values, dict):
+            params.extend((k, str(v)) for k, v in values.items())
+    params = sorted((k, v) for k, v in params if k != "access_token")
+    # the host is left out so a cassette replays under any GRAPH_API_BASE_URL
+    path = urlunparse(("", "", parts.path, "", urlencode(params), ""))
+    return f"{method.upper()} {path}"
+
+
+@contextmanager
+def use_cassette(path, mode=REPLAY, realtime=False, client=graph):
+    """
+    Routes every exchange of the Graph client through a Cassette for the
+    duration of the block. A recording is saved when the block exits.
+    """
+    cassette = Cassette(path, mode, realtime)
+    had_own_send = "send" in vars(client)
+    real_send = client.send
+    client.send = lambda method, url, **kwargs: cassette.send(
+        real_send, method, url, **kwargs
+    )
+    try:
+        yield cassette
+    finally:
+        if had_own_send:
+            client.send = real_send
+        else:
+            del client.send
+        if mode == RECORD:
+            cassette.save()
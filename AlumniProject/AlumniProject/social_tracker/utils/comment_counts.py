@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import Count
+
+from social_tracker.models import Comment, InstagramUser
+
+
+def refresh_comment_counts(user_ids=None):
+    """
+    Recomputes InstagramUser.num_comments from the stored Comment rows with one
+    grouped COUNT and writes the users whose counter changed with one
+    bulk_update.
+
+    Args:
+        user_ids (iterable, optional): Only refresh these users. Every user is
+            refreshed when this is None.
+
+    Returns:
+        int: The number of users whose counter was changed.
+    """
+    users = InstagramUser.objects.all()
+    comments = Comment.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+        users = users.filter(id__in=user_ids)
+        comments = comments.filter(user_ID__in=user_ids)
+
+    with transaction.atomic():
+        counts = dict(
+            comments.values("user_ID")
+            .annotate(total=Count("id"))
+            .values_list("user_ID", "total")
+        )
+        changed = []
+        for user in users.only("id", "num_comments"):
+            total = counts.get(user.id, 0)
+            if user.num_comments != total:
+                user.num_comments = total
+                changed.append(user)
+        InstagramUser.objects.bulk_update(changed, ["num_comments"], batch_size=500)
+    return len(changed)
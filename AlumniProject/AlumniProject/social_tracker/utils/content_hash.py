@@ -0,0 +1,67 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+# The fields each sync writes, by their attribute names. A row whose hash of
+# these values matches the stored content_hash is not written again.
+POST_HASH_FIELDS = [
+    "instagram_account_id",
+    "date_posted",
+    "post_link",
+    "num_likes",
+    "num_comments",
+    "num_shares",
+    "num_saves",
+    "caption",
+]
+COMMENT_HASH_FIELDS = [
+    "instagram_account_id",
+    "post_API_ID_id",
+    "date_posted",
+    "num_likes",
+    "replies",
+    "text",
+    "username",
+    "user_ID_id",
+]
+USER_HASH_FIELDS = ["instagram_account_id", "username"]
+
+
+def content_hash(obj, fields):
+    """Returns a 16 hex digit BLAKE2b digest of the given fields of obj."""
+    values = json.dumps(
+        [hashable_value(getattr(obj, field)) for field in fields],
+        default=str,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(values.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def hashable_value(value):
+    """Normalizes aware datetimes to UTC, whichever zone they were built in."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def split_unchanged(model, objs, key, fields, force=False):
+    """
+    Sets content_hash on every unsaved instance in objs and compares it with
+    the stored rows, matched on the key field, with one query.
+
+    Returns (changed, existing, unchanged_count): the instances that are new
+    or differ from their stored row, the keys of those already stored, and
+    how many match their stored row and can be skipped. With force, every
+    instance counts as changed.
+    """
+    for obj in objs:
+        obj.content_hash = content_hash(obj, fields)
+    stored = dict(
+        model.objects.filter(
+            **{f"{key}__in": [getattr(o, key) for o in objs]}
+        ).values_list(key, "content_hash")
+    )
+    changed = [
+        o for o in objs if force or stored.get(getattr(o, key)) != o.content_hash
+    ]
+    return changed, set(stored), len(objs) - len(changed)
@@ -9,6 +9,10 @@ from social_tracker.models import (
     Country,
     City,
     Age,
+    SyncState,
+    SyncCheckpoint,
+    SyncLock,
+    GraphPayload,
 )
 
 
@@ -31,5 +35,10 @@ def delete_account_data(account_api_id):
     Country.objects.filter(instagram_account=account).delete()
     City.objects.filter(instagram_account=account).delete()
     Age.objects.filter(instagram_account=account).delete()
+    # forget the sync high-water mark so a re-sync fetches everything again
+    SyncState.objects.filter(instagram_account=account).delete()
+    SyncCheckpoint.objects.filter(instagram_account=account).delete()
+    SyncLock.objects.filter(instagram_account=account).delete()
+    GraphPayload.objects.filter(instagram_account=account).delete()
 
     return f"All data for account '{account_api_id}' has been deleted."
@@ -0,0 +1,83 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from social_tracker.models import InstagramAccount
+from social_tracker.utils.get_instagram_data import get_all_demographics
+
+
+def demographics_age(account_id):
+    """
+    Returns how many seconds ago the demographics of the account were last
+    refreshed, or None if they never were.
+    """
+    refreshed_at = (
+        InstagramAccount.objects.filter(account_API_ID=account_id)
+        .values_list("demographics_refreshed_at", flat=True)
+        .first()
+    )
+    if refreshed_at is None:
+        return None
+    return int((timezone.now() - refreshed_at).total_seconds())
+
+
+def refresh_demographics_if_stale(access_token, account_id):
+    """
+    Starts a background refresh of the account's demographics when they are
+    older than DEMOGRAPHICS_TTL_SECONDS.
+
+    The refresh is claimed with one conditional UPDATE, so when several stale
+    readers arrive at once only the first one starts a refresh. A claim older
+    than DEMOGRAPHICS_REFRESH_TIMEOUT_SECONDS counts as abandoned.
+
+    Returns True if this call started a refresh.
+    """
+    now = timezone.now()
+    ttl = getattr(settings, "DEMOGRAPHICS_TTL_SECONDS", 6 * 60 * 60)
+    timeout = getattr(settings, "DEMOGRAPHICS_REFRESH_TIMEOUT_SECONDS", 5 * 60)
+
+    claimed = (
+        InstagramAccount.objects.filter(account_API_ID=account_id)
+        .filter(
+            Q(demographics_refreshed_at__isnull=True)
+            | Q(demographics_refreshed_at__lt=now - timedelta(seconds=ttl))
+        )
+        .filter(
+            Q(demographics_refresh_started__isnull=True)
+            | Q(demographics_refresh_started__lt=now - timedelta(seconds=timeout))
+        )
+        .update(demographics_refresh_started=now)
+    )
+    if not claimed:
+        return False
+    start_background(refresh_demographics, access_token, account_id)
+    return True
+
+
+def refresh_demographics(access_token, account_id):
+    """
+    Refreshes the account's demographics and releases the refresh claim.
+    The refresh time is only recorded when every breakdown succeeded.
+    """
+    fields = {"demographics_refresh_started": None}
+    try:
+        if get_all_demographics(access_token, account_id) is None:
+            fields["demographics_refreshed_at"] = timezone.now()
+    finally:
+        InstagramAccount.objects.filter(account_API_ID=account_id).update(**fields)
+
+
+def start_background(func, *args):
+    """Runs func(*args) on a daemon thread with its own database connection."""
+
+    def run():
+        try:
+            func(*args)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, daemon=True).start()
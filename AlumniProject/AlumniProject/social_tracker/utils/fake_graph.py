@@ -0,0 +1,383 @@
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# "v19.0/me/media" and "me/media" are the same endpoint
+VERSION_PREFIX = re.compile(r"^v\d+\.\d+/")
+
+# where the generated timelines start, newest first
+NEWEST_POST = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+AGE_RANGES = ["13-17", "18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+COUNTRIES = ["US", "CA", "GB", "DE", "IN", "BR", "MX", "FR"]
+CITIES = ["Chicago, Illinois", "Toronto, Ontario", "London, England", "Berlin"]
+
+
+class FakeGraphData:
+    """
+    Deterministic data set of one fake Instagram account.
+
+    The same arguments always produce the same media, comments, users,
+    stories and demographics, so sync runs can be compared with each other.
+
+    Attributes:
+        account_id (str): The Graph ID of the account.
+        username (str): Its username.
+        media (list): Media dicts, newest first, each with its "comments".
+        stories (list): Story dicts.
+    """
+
+    def __init__(
+        self,
+        media=100,
+        comments=5,
+        replies=1,
+        stories=5,
+        users=50,
+        seed=1,
+        account_id="17841400000000001",
+        username="fake_account",
+    ):
+        rng = random.Random(seed)
+        self.account_id = account_id
+        self.username = username
+        self.media = []
+        self.stories = []
+        self.objects = {}
+
+        user_pool = [
+            {"id": str(5000000 + u), "username": f"fake_user_{u}"}
+            for u in range(max(users, 1))
+        ]
+        next_comment_id = 9000000
+        for m in range(media):
+            post = {
+                "id": str(18000000000 + m),
+                "timestamp": graph_time(NEWEST_POST - timedelta(hours=6 * m)),
+                "permalink": f"https://www.instagram.com/p/fake{m}/",
+                "media_url": f"https://scontent.example.com/fake{m}.jpg",
+                "caption": f"Fake post {m} #alumni",
+                "likes": rng.randint(0, 500),
+                "saved": rng.randint(0, 40),
+                "shares": rng.randint(0, 40),
+                "comments": [],
+            }
+            for _ in range(comments):
+                next_comment_id += 1
+                comment = fake_comment(
+                    next_comment_id, post, rng.choice(user_pool), rng
+                )
+                for _ in range(replies):
+                    next_comment_id += 1
+                    reply = fake_comment(
+                        next_comment_id, post, rng.choice(user_pool), rng
+                    )
+                    reply["parent_id"] = comment["id"]
+                    comment["replies"].append(reply)
+                    self.objects[reply["id"]] = reply
+                post["comments"].append(comment)
+                self.objects[comment["id"]] = comment
+            self.media.append(post)
+            self.objects[post["id"]] = post
+
+        for s in range(stories):
+            story = {
+                "id": str(17900000000 + s),
+                "timestamp": graph_time(NEWEST_POST - timedelta(hours=s)),
+                "permalink": f"https://www.instagram.com/stories/fake/{s}/",
+                "reach": rng.randint(0, 1000),
+                "navigation": rng.randint(0, 100),
+                "profile_visits": rng.randint(0, 50),
+                "is_story": True,
+            }
+            self.stories.append(story)
+            self.objects[story["id"]] = story
+
+        self.demographics = {
+            "age": [(label, rng.randint(0, 300)) for label in AGE_RANGES],
+            "country": [(label, rng.randint(0, 300)) for label in COUNTRIES],
+            "city": [(label, rng.randint(0, 300)) for label in CITIES],
+        }
+
+    def comment_count(self, post):
+        """Comments and replies of a post, as its comments insight reports them."""
+        return sum(1 + len(c["replies"]) for c in post["comments"])
+
+
+def graph_time(dt):
+    """Formats a datetime the way the Graph API does."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+def fake_comment(comment_id, post, user, rng):
+    return {
+        "id": str(comment_id),
+        "from": dict(user),
+        "username": user["username"],
+        "like_count": rng.randint(0, 20),
+        "text": f"Fake comment {comment_id}",
+        "timestamp": post["timestamp"],
+        "media_id": post["id"],
+        "replies": [],
+    }
+
+
+class FakeGraph:
+    """
+    Answers Graph API requests from a FakeGraphData, without any HTTP.
+
+    Supports the endpoints ingestion uses: /me, /me/media, /me/stories,
+    /<media>/comments, /<id>/insights, single objects and batch POSTs to /,
+    with cursor pagination capped at max_page_size per page.
+
+    Every throttle_every-th request is answered with a 429, and each HTTP
+    exchange can be slowed down by latency seconds.
+    """
+
+    def __init__(self, data, latency=0, throttle_every=0, max_page_size=100, usage=10):
+        self.data = data
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.max_page_size = max_page_size
+        self.usage = usage
+        self.base_url = ""
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.batch_items = 0
+
+    def handle(self, method, path, query, form):
+        """
+        Handles one HTTP request. Returns (status, headers, body) where body
+        is already JSON-encoded.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+        headers = {"X-App-Usage": json.dumps({"call_count": self.usage})}
+        if throttle:
+            return (
+                429,
+                headers,
+                json.dumps(error(4, "Application request limit reached")),
+            )
+
+        if method == "POST" and path.strip("/") == "" and "batch" in form:
+            return 200, headers, json.dumps(self.batch(form))
+        status, body = self.route(path, {**query, **form})
+        return status, headers, json.dumps(body)
+
+    def batch(self, form):
+        """Runs every request of a batch POST and returns the batch response."""
+        try:
+            items = json.loads(form["batch"])
+        except ValueError:
+            return error(100, "Invalid batch parameter")
+        with self.lock:
+            self.batch_items += len(items)
+        results = []
+        for item in items:
+            relative = urlparse(item.get("relative_url", ""))
+            query = {k: v[0] for k, v in parse_qs(relative.query).items()}
+            query.setdefault("access_token", form.get("access_token", ""))
+            status, body = self.route(relative.path, query)
+            results.append({"code": status, "headers": [], "body": json.dumps(body)})
+        return results
+
+    def route(self, path, params):
+        """Returns (status, body) of one GET request."""
+        if not params.get("access_token"):
+            return 400, error(190, "An access token is required.")
+        path = VERSION_PREFIX.sub("", path.strip("/"))
+        parts = path.split("/")
+        data = self.data
+
+        if path == "me":
+            return 200, {"id": data.account_id, "username": data.username}
+        if path == "me/media":
+            items = [self.media_fields(m, params.get("fields", "")) for m in data.media]
+            return 200, self.page(items, path, params, 25)
+        if path == "me/stories":
+            items = [
+                {k: s[k] for k in ("id", "timestamp", "permalink")}
+                for s in data.stories
+            ]
+            return 200, {"data": items}
+
+        obj = data.objects.get(parts[0])
+        if len(parts) == 2 and parts[1] == "insights":
+            if parts[0] == data.account_id:
+                return self.demographics(params)
+            if obj is None:
+                return 404, error(100, f"Object {parts[0]} does not exist.")
+            return 200, {"data": self.insights(obj, params.get("metric", ""))}
+        if len(parts) == 2 and parts[1] == "comments" and obj and "comments" in obj:
+            with_replies = "replies" in params.get("fields", "")
+            items = [self.comment_fields(c, with_replies) for c in obj["comments"]]
+            return 200, self.page(items, path, params, 25)
+        if len(parts) == 1 and obj is not None:
+            return 200, self.object_fields(obj, params.get("fields", ""))
+        return 404, error(100, f"Unsupported get request: {path}")
+
+    def page(self, items, path, params, default_limit):
+        """Cuts one cursor page out of items, like the Graph API does."""
+        limit = min(int(params.get("limit") or default_limit), self.max_page_size)
+        start = int(params.get("after") or 0)
+        end = start + limit
+        body = {
+            "data": items[start:end],
+            "paging": {"cursors": {"before": str(start), "after": str(end)}},
+        }
+        if end < len(items):
+            query = {k: v for k, v in params.items() if k != "after"}
+            query["after"] = str(end)
+            body["paging"]["next"] = f"{self.base_url}/{path}?{urlencode(query)}"
+        return body
+
+    def media_fields(self, post, fields):
+        item = {
+            k: post[k]
+            for k in ("id", "media_url", "timestamp", "permalink", "caption")
+            if k in fields or k == "id"
+        }
+        if "insights" in fields:
+            metrics = "likes,comments,saved,shares"
+            item["insights"] = {"data": self.insights(post, metrics)}
+        return item
+
+    def insights(self, obj, metrics):
+        values = dict(obj)
+        if "comments" in obj:
+            values["comments"] = self.data.comment_count(obj)
+        return [
+            {
+                "name": name,
+                "period": "lifetime",
+                "values": [{"value": values.get(name, 0)}],
+                "id": f"{obj['id']}/insights/{name}/lifetime",
+            }
+            for name in metrics.split(",")
+            if name
+        ]
+
+    def demographics(self, params):
+        rows = self.data.demographics.get(params.get("breakdown", ""))
+        if rows is None:
+            return 400, error(100, "Invalid breakdown.")
+        results = [{"dimension_values": [label], "value": v} for label, v in rows]
+        breakdown = {"dimension_keys": [params["breakdown"]], "results": results}
+        return 200, {
+            "data": [
+                {
+                    "name": "engaged_audience_demographics",
+                    "period": "lifetime",
+                    "total_value": {"breakdowns": [breakdown]},
+                }
+            ]
+        }
+
+    def comment_fields(self, comment, with_replies):
+        item = {k: v for k, v in comment.items() if k not in ("media_id", "replies")}
+        if with_replies and comment["replies"]:
+            item["replies"] = {
+                "data": [self.comment_fields(r, False) for r in comment["replies"]]
+            }
+        return item
+
+    def object_fields(self, obj, fields):
+        if "comments" in obj:
+            return {"id": obj["id"], "caption": obj["caption"]}
+        if obj.get("is_story"):
+            return {k: obj[k] for k in ("id", "timestamp", "permalink")}
+        item = self.comment_fields(obj, False)
+        item["replies"] = {"data": [{"id": r["id"]} for r in obj["replies"]]}
+        return item
+
+
+def error(code, message):
+    return {"error": {"message": message, "type": "OAuthException", "code": code}}
+
+
+class FakeGraphServer:
+    """
+    Serves a FakeGraph over HTTP on localhost, in a background thread.
+
+    Usage:
+        with FakeGraphServer(FakeGraphData(media=500)) as server:
+            with override_settings(GRAPH_API_BASE_URL=server.base_url):
+                get_instagram_posts(...)
+
+    Attributes:
+        graph (FakeGraph): The request handler, which also counts requests.
+        base_url (str): The URL to use as GRAPH_API_BASE_URL.
+    """
+
+    def __init__(self, data=None, host="127.0.0.1", port=0, **options):
+        self.graph = FakeGraph(data or FakeGraphData(), **options)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.graph))
+        self.httpd.daemon_threads = True
+        host, port = self.httpd.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+        self.graph.base_url = self.base_url
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def make_handler(graph):
+    """Builds the BaseHTTPRequestHandler class that forwards to graph."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; without this every
+        # keep-alive exchange waits out the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.answer("GET", {})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length).decode()
+            form = {k: v[0] for k, v in parse_qs(raw).items()}
+            self.answer("POST", form)
+
+        def answer(self, method, form):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            status, headers, body = graph.handle(method, url.path, query, form)
+            payload = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
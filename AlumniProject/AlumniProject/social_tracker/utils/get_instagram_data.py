@@ -1,7 +1,14 @@
 import json
-from datetime import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone as dt_timezone
 
 import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
@@ -14,14 +21,300 @@ from social_tracker.models import (
     InstagramStory,
     InstagramUser,
     Post,
+    SyncState,
 )
+from social_tracker.utils.comment_counts import refresh_comment_counts
+from social_tracker.utils.content_hash import (
+    COMMENT_HASH_FIELDS,
+    POST_HASH_FIELDS,
+    USER_HASH_FIELDS,
+    content_hash,
+    split_unchanged,
+)
+from social_tracker.utils.graph_client import graph, graph_url
+from social_tracker.utils.payload_staging import stage_payloads
+from social_tracker.utils.refresh_tiers import refresh_due_filter
+from social_tracker.utils.sync_checkpoints import (
+    MEDIA_SCOPE,
+    clear_checkpoint,
+    comments_scope,
+    interrupted_comment_syncs,
+    load_checkpoint,
+    save_checkpoint,
+)
+
+# Caption and insights are expanded into the media listing so a whole page of
+# posts arrives in one response.
+MEDIA_FIELDS = (
+    "id,media_url,timestamp,permalink,caption,"
+    "insights.metric(likes,comments,saved,shares).period(lifetime)"
+)
+
+
+# The Graph API serves at most 100 media per listing page.
+MEDIA_PAGE_LIMIT = 100
+METRIC_FIELDS = ["num_likes", "num_comments", "num_shares", "num_saves"]
+POST_UPDATE_FIELDS = [
+    "instagram_account",
+    "date_posted",
+    "post_link",
+    "num_likes",
+    "num_comments",
+    "num_shares",
+    "num_saves",
+    "caption",
+    "content_hash",
+    "metrics_refreshed_at",
+]
+
+STORY_FIELDS = ["instagram_account", "date_posted", "story_link"]
+STORY_METRIC_FIELDS = [
+    "num_views",
+    "num_profile_clicks",
+    "num_replies",
+    "num_swipes_up",
+]
+
+COMMENT_UPDATE_FIELDS = [
+    "instagram_account",
+    "post_API_ID",
+    "date_posted",
+    "num_likes",
+    "replies",
+    "text",
+    "username",
+    "user_ID",
+    "content_hash",
+]
+
+# Demographic breakdown -> (model, field holding the breakdown label)
+DEMOGRAPHIC_BREAKDOWNS = {
+    "country": (Country, "name"),
+    "city": (City, "name"),
+    "age": (Age, "age_range"),
+}
+
+# The Graph batch API accepts at most 50 requests per POST.
+GRAPH_BATCH_SIZE = 50
+
+COMMENT_FIELDS = "id,from,like_count,text,timestamp,replies,username,parent_id"
+# Used when listing a post's comments so the listing carries everything we
+# store, replies included.
+COMMENT_LIST_FIELDS = (
+    "id,from,like_count,text,timestamp,parent_id,"
+    "replies{id,from,like_count,text,timestamp,parent_id}"
+)
+
+
+def run_concurrently(func, items, max_workers=None):
+    """
+    Calls func on every item using a thread pool with at most max_workers
+    requests in flight, and returns the results in the same order as items.
+    Runs everything inline when max_workers is 1 or there is only one item.
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = getattr(settings, "INSTAGRAM_MAX_WORKERS", 8)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def iter_prefetched(pages, max_pages=None):
+    """
+    Runs the pages generator in a background thread and yields what it
+    yields, so the next pages are being fetched while the caller writes the
+    current one. At most max_pages (defaults to
+    settings.INSTAGRAM_PREFETCH_PAGES) wait in the queue between the two, so
+    memory stays bounded however long the listing is. An exception raised
+    by the generator is re-raised here.
+
+    The generator must only talk to the API: database writes stay on the
+    calling thread. Close this generator, e.g. with contextlib.closing, to
+    stop the fetching early.
+    """
+    if max_pages is None:
+        max_pages = getattr(settings, "INSTAGRAM_PREFETCH_PAGES", 2)
+    if max_pages < 1:
+        yield from pages
+        return
+
+    handoff = queue.Queue(maxsize=max_pages)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for page in pages:
+                if not put((page, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((done, e))
+        finally:
+            pages.close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            page, error = handoff.get()
+            if page is done:
+                if error is not None:
+                    raise error
+                return
+            yield page
+    finally:
+        stop.set()
+        producer.join()
+
+
+def graph_batch(access_token, relative_urls, max_workers=None, client=graph):
+    """
+    Sends GET requests for relative_urls through the Graph batch API, packing
+    up to GRAPH_BATCH_SIZE of them into each POST. Batches are sent
+    concurrently with at most max_workers in flight, through client.
+
+    Returns one parsed body per URL, in the same order. An item that failed
+    comes back as {"error": {"message": ...}}, the same shape as a normal
+    Graph error response, so callers can skip it and carry on.
+    """
+    relative_urls = list(relative_urls)
+    chunks = []
+    for start in range(0, len(relative_urls), GRAPH_BATCH_SIZE):
+        end = start + GRAPH_BATCH_SIZE
+        chunks.append(relative_urls[start:end])
+
+    def send(chunk):
+        batch = [{"method": "GET", "relative_url": url} for url in chunk]
+        try:
+            response = client.post(
+                graph_url(),
+                data={"access_token": access_token, "batch": json.dumps(batch)},
+            )
+            response.raise_for_status()
+            items = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            return [{"error": {"message": str(e)}} for _ in chunk]
+        return split_batch_response(items, len(chunk))
 
+    results = run_concurrently(send, chunks, max_workers)
+    return [body for chunk_bodies in results for body in chunk_bodies]
 
-def get_instagram_posts(access_token, account_id, num_posts=100):
+
+def split_batch_response(items, expected):
+    """
+    Turns the list returned by a batch POST into one parsed body per request.
+    Missing (null) items and non-2xx items become error bodies.
+    """
+    if not isinstance(items, list):
+        items = []
+    bodies = []
+    for item in items[:expected]:
+        if not item:
+            bodies.append({"error": {"message": "No response in batch."}})
+            continue
+        try:
+            body = json.loads(item.get("body") or "{}")
+        except ValueError:
+            body = {}
+        code = item.get("code", 200)
+        if code >= 400 and "error" not in body:
+            body = {"error": {"message": f"Batch item failed with status {code}."}}
+        bodies.append(body)
+    while len(bodies) < expected:
+        bodies.append({"error": {"message": "No response in batch."}})
+    return bodies
+
+
+def upsert_posts(posts, force=False):
+    """
+    Writes a page of unsaved Post instances with one INSERT ... ON CONFLICT
+    statement inside one transaction, updating rows whose post_API_ID
+    already exists. Posts whose content_hash matches the stored row are not
+    written at all, unless force is set; only their metrics_refreshed_at is
+    moved on, since their insights were just read.
+    Returns (inserted_count, updated_count, unchanged_count).
+    """
+    posts = list(posts)
+    if not posts:
+        return 0, 0, 0
+    with transaction.atomic():
+        changed, existing, unchanged = split_unchanged(
+            Post, posts, "post_API_ID", POST_HASH_FIELDS, force
+        )
+        if changed:
+            Post.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["post_API_ID"],
+                update_fields=POST_UPDATE_FIELDS,
+            )
+        if unchanged:
+            changed_ids = {p.post_API_ID for p in changed}
+            Post.objects.filter(
+                post_API_ID__in=[
+                    p.post_API_ID for p in posts if p.post_API_ID not in changed_ids
+                ]
+            ).update(metrics_refreshed_at=timezone.now())
+    updated = sum(1 for p in changed if p.post_API_ID in existing)
+    return len(changed) - updated, updated, unchanged
+
+
+def get_instagram_posts(
+    access_token,
+    account_id,
+    num_posts=100,
+    max_workers=None,
+    stats=None,
+    progress=None,
+    client=graph,
+):
     """
     Gets recent Instagram posts for the given account and saves or updates them,
     always linking each Post to its InstagramAccount, avoiding duplicate inserts,
     and using timezone-aware datetimes.
+
+    Captions and insights are requested in the media listing itself through
+    field expansion. Posts whose nested insights come back empty are looked up
+    through graph_batch, with at most max_workers batches in flight (defaults
+    to settings.INSTAGRAM_MAX_WORKERS). Each page of posts is then written
+    with upsert_posts on the calling thread.
+
+    Syncs are incremental: media are only fetched down to the newest post
+    stored in the account's SyncState. Posts older than that only get their
+    metrics refreshed, when refresh_due_posts finds them due.
+
+    Comments are only re-fetched for posts picked by select_comment_syncs.
+
+    After each page of posts and their comments is written, the paging cursor
+    is saved as the account's "media" SyncCheckpoint. A sync that dies half
+    way is resumed from there by the next call, and the checkpoint is cleared
+    once the listing has been read to the end.
+
+    If a stats dict is given, the pages_fetched, posts_inserted,
+    posts_updated, posts_unchanged, posts_refreshed, comment_syncs,
+    comment_syncs_skipped, comment_syncs_failed, comments_written,
+    comments_unchanged, users_written and users_unchanged counts are added to
+    it. The *_unchanged counts are rows skipped because their content_hash had
+    not changed. When a comment sync fails the posts are still saved, but the
+    result says how many comment syncs failed.
+
+    If a progress callable is given it is called with the stage the sync is
+    entering ("media", "insights" or "comments") and again after each page,
+    so a caller can publish the stats while the sync runs.
+
+    Every request goes through client, the shared graph client by default.
     """
     if not access_token:
         return "Access token is missing."
@@ -30,89 +323,404 @@ def get_instagram_posts(access_token, account_id, num_posts=100):
     except InstagramAccount.DoesNotExist:
         return f"Account with id {account_id} does not exist."
 
-    url = "https://graph.instagram.com/me/media"
+    state, _ = SyncState.objects.get_or_create(instagram_account=account)
+    watermark = state.newest_post_date
+    checkpoint = load_checkpoint(account, MEDIA_SCOPE)
+
+    pages = iter_prefetched(
+        fetch_media_pages(
+            access_token,
+            num_posts,
+            watermark,
+            max_workers,
+            after=checkpoint and checkpoint.cursor,
+            client=client,
+        )
+    )
+
+    if stats is None:
+        stats = {}
+    failed_before = stats.get("comment_syncs_failed", 0)
+    user_ids = set()
+    try:
+        seen = set()
+        newest = watermark
+        if checkpoint and checkpoint.newest_date:
+            # the pages written before the interruption held the newest posts
+            if newest is None or checkpoint.newest_date > newest:
+                newest = checkpoint.newest_date
+        first_page = checkpoint is None
+        with closing(pages):
+            for data, items, pending, reached_watermark in pages:
+                add_stat(stats, "pages_fetched", 1)
+                report_progress(progress, "media")
+
+                if first_page and not data.get("data"):
+                    return "No posts found."
+                first_page = False
+
+                stage_media_page(account, items, pending)
+
+                rows = {}
+                for item in pending:
+                    seen.add(item[0])
+                    post = build_post(account, *item)
+                    if post is not None:
+                        rows[post.post_API_ID] = post
+                        if newest is None or post.date_posted > newest:
+                            newest = post.date_posted
+
+                previous = stored_comment_state(rows)
+                inserted, updated, unchanged = upsert_posts(rows.values())
+                add_stat(stats, "posts_inserted", inserted)
+                add_stat(stats, "posts_updated", updated)
+                add_stat(stats, "posts_unchanged", unchanged)
+
+                report_progress(progress, "media")
+
+                for post in select_comment_syncs(rows.values(), previous, stats):
+                    report_progress(progress, "comments")
+                    user_ids |= get_comment_data(
+                        access_token,
+                        post.post_API_ID,
+                        account_id,
+                        False,
+                        stats,
+                        client=client,
+                    )
+
+                paging = data.get("paging", {})
+                cursor = paging.get("cursors", {}).get("after", "")
+                if paging.get("next") and cursor and pending:
+                    save_checkpoint(
+                        account,
+                        MEDIA_SCOPE,
+                        cursor,
+                        pending[-1][0],
+                        newest,
+                    )
+
+        clear_checkpoint(account, MEDIA_SCOPE)
+        state.newest_post_date = newest
+        state.save(update_fields=["newest_post_date"])
+
+        user_ids |= refresh_due_posts(
+            access_token, account, seen, max_workers, stats, progress, client
+        )
+
+        failed = stats.get("comment_syncs_failed", 0) - failed_before
+        if failed:
+            return f"Posts processed, but {failed} comment sync(s) failed."
+        return "Posts processed successfully."
+
+    except requests.exceptions.RequestException as e:
+        return f"Error getting Instagram posts: {e}"
+    finally:
+        # one grouped recount for everyone who commented during this sync
+        refresh_comment_counts(user_ids)
+
+
+def fetch_media_pages(
+    access_token, num_posts, watermark=None, max_workers=None, after=None, client=graph
+):
+    """
+    Pages through the media listing, newest first, starting after the paging
+    cursor after if one is given, and yields
+    (data, items, pending, reached_watermark) for each page: the response,
+    its items cut to num_posts, and their parse_media_page entries with
+    missing insights and captions already looked up. Stops after num_posts
+    posts or at the page that reaches watermark.
+
+    Only talks to the API, so get_instagram_posts runs it through
+    iter_prefetched while it writes the previous page.
+    """
+    url = graph_url("me/media")
     params = {
-        "fields": "id,media_url,timestamp,permalink",
+        "fields": MEDIA_FIELDS,
         "access_token": access_token,
-        "limit": num_posts,
+        "limit": min(num_posts, MEDIA_PAGE_LIMIT),
     }
-
-    try:
-        response = requests.get(url, params=params)
+    if after:
+        params["after"] = after
+    fetched = 0
+    while url and fetched < num_posts:
+        response = client.get(url, params=params)
         response.raise_for_status()
         data = response.json()
 
-        if not data.get("data"):
-            return "No posts found."
+        items = data.get("data", [])[: num_posts - fetched]
+        pending, reached_watermark = parse_media_page(items, watermark)
+        fill_missing_details(access_token, pending, max_workers, client)
+        fetched += len(pending)
+        yield data, items, pending, reached_watermark
 
-        for post_info in data["data"][:num_posts]:
-            raw_ts = post_info.get("timestamp")
-            if not raw_ts:
-                continue
+        if reached_watermark:
+            return
+        url = data.get("paging", {}).get("next")
+        params = {}
 
-            # parse timestamp and make it timezone-aware
-            naive_dt = datetime.strptime(raw_ts, "%Y-%m-%dT%H:%M:%S%z").replace(
-                tzinfo=None
-            )
-            date_posted = timezone.make_aware(naive_dt, timezone.get_current_timezone())
 
-            permalink = post_info.get("permalink", "")
-            api_id = str(post_info.get("id", ""))
-            if not api_id:
-                continue
+def stored_comment_state(api_ids):
+    """
+    Returns {post_API_ID: (num_comments, comments_synced_at)} for the posts
+    among api_ids that are already stored, read before they get overwritten.
+    """
+    rows = Post.objects.filter(post_API_ID__in=list(api_ids)).values_list(
+        "post_API_ID", "num_comments", "comments_synced_at"
+    )
+    return {api_id: (count, synced_at) for api_id, count, synced_at in rows}
 
-            # fetch insights
-            insights_url = f"https://graph.instagram.com/v19.0/{api_id}/insights"
-            insights_params = {
-                "metric": "likes,comments,saved,shares",
-                "period": "lifetime",
-                "access_token": access_token,
-            }
-            insights_data = (
-                requests.get(insights_url, params=insights_params)
-                .json()
-                .get("data", [])
-            )
 
-            # fetch caption
-            caption = ""
-            try:
-                cap_url = f"https://graph.instagram.com/v19.0/{api_id}"
-                cap_resp = requests.get(
-                    cap_url, params={"access_token": access_token, "fields": "caption"}
-                )
-                caption = cap_resp.json().get("caption") or ""
-            except Exception:
-                pass
+def select_comment_syncs(posts, previous, stats=None):
+    """
+    Picks the posts whose comments need fetching. A post with comments is
+    synced when it is new, when its fresh num_comments differs from the stored
+    one, when we hold no comment rows for it yet, when its comments were never
+    fully synced, when an interrupted comment sync left a checkpoint to resume
+    from, or when the last sync is older than INSTAGRAM_COMMENT_STALE_SECONDS.
+    Everything else is skipped.
+    """
+    posts = [p for p in posts if p.num_comments > 0]
+    held = dict(
+        Comment.objects.filter(post_API_ID__in=[p.post_API_ID for p in posts])
+        .values("post_API_ID")
+        .annotate(total=Count("id"))
+        .values_list("post_API_ID", "total")
+    )
+    interrupted = interrupted_comment_syncs([p.post_API_ID for p in posts])
+    stale_after = getattr(settings, "INSTAGRAM_COMMENT_STALE_SECONDS", 24 * 60 * 60)
+    now = timezone.now()
+
+    selected = []
+    for post in posts:
+        count, synced_at = previous.get(post.post_API_ID, (None, None))
+        if (
+            count != post.num_comments
+            or not held.get(post.post_API_ID)
+            or synced_at is None
+            or post.post_API_ID in interrupted
+            or (now - synced_at).total_seconds() >= stale_after
+        ):
+            selected.append(post)
+    add_stat(stats, "comment_syncs", len(selected))
+    add_stat(stats, "comment_syncs_skipped", len(posts) - len(selected))
+    return selected
+
+
+def parse_media_page(items, watermark=None):
+    """
+    Parses one page of the media listing into
+    [api_id, date_posted, permalink, insights_data, caption] lists.
+    Stops at the first post older than watermark, since the listing is
+    newest first. Returns (pending, reached_watermark).
+    """
+    pending = []
+    for post_info in items:
+        raw_ts = post_info.get("timestamp")
+        if not raw_ts:
+            continue
+
+        # parse timestamp and make it timezone-aware
+        naive_dt = datetime.strptime(raw_ts, "%Y-%m-%dT%H:%M:%S%z").replace(tzinfo=None)
+        date_posted = timezone.make_aware(naive_dt, timezone.get_current_timezone())
+        if watermark and date_posted < watermark:
+            return pending, True
+
+        permalink = post_info.get("permalink", "")
+        api_id = str(post_info.get("id", ""))
+        if not api_id:
+            continue
+
+        # insights and caption usually arrive nested in the listing
+        insights_data = post_info.get("insights", {}).get("data", [])
+        caption = post_info.get("caption") or ""
+        pending.append([api_id, date_posted, permalink, insights_data, caption])
+    return pending, False
+
+
+def fill_missing_details(access_token, pending, max_workers=None, client=graph):
+    """
+    Looks up insights and caption through the batch API, only for the
+    entries of pending whose nested insights came back empty.
+    """
+    missing = [item for item in pending if not item[3]]
+    relative_urls = []
+    for item in missing:
+        relative_urls.append(insights_relative_url(item[0]))
+        relative_urls.append(f"v19.0/{item[0]}?fields=caption")
+    bodies = graph_batch(access_token, relative_urls, max_workers, client)
+    for i, item in enumerate(missing):
+        item[3] = bodies[2 * i].get("data", [])
+        item[4] = bodies[2 * i + 1].get("caption") or ""
+
+
+def build_post(account, api_id, date_posted, permalink, insights_data, caption):
+    """
+    Builds an unsaved Post from one parse_media_page entry, or returns None
+    when its insights are missing. metrics_refreshed_at is set to now, since
+    the entry carries freshly read insights.
+    """
+    if not insights_data:
+        return None
+    return Post(
+        instagram_account=account,
+        post_API_ID=api_id,
+        date_posted=date_posted,
+        post_link=permalink,
+        caption=caption,
+        metrics_refreshed_at=timezone.now(),
+        **post_metrics(insights_data),
+    )
+
+
+def stage_media_page(account, items, pending):
+    """
+    Stages the raw media of one listing page ("media", with the captions
+    looked up by fill_missing_details) and their insights ("insights").
+    """
+    details = {item[0]: item for item in pending}
+    media = []
+    for raw in items:
+        api_id = str(raw.get("id", ""))
+        data = {k: v for k, v in raw.items() if k != "insights"}
+        if api_id in details:
+            data["caption"] = details[api_id][4]
+        media.append((api_id, data))
+    stage_payloads(account, "media", media)
+    stage_payloads(
+        account,
+        "insights",
+        [(item[0], {"data": item[3]}) for item in pending if item[3]],
+    )
+
+
+def insights_relative_url(api_id):
+    """Returns the relative URL of a post's lifetime insights for graph_batch."""
+    return f"v19.0/{api_id}/insights?metric=likes,comments,saved,shares&period=lifetime"
+
+
+def post_metrics(insights_data):
+    """
+    Maps a post insights response (likes, comments, saved, shares, in the
+    order requested) onto Post field values.
+    """
+    return {
+        "num_likes": insights_data[0]["values"][0]["value"],
+        "num_comments": insights_data[1]["values"][0]["value"],
+        "num_saves": insights_data[2]["values"][0]["value"],
+        "num_shares": insights_data[3]["values"][0]["value"],
+    }
 
-            if insights_data:
-                num_likes = insights_data[0]["values"][0]["value"]
-                num_comments = insights_data[1]["values"][0]["value"]
-                num_saved = insights_data[2]["values"][0]["value"]
-                num_shares = insights_data[3]["values"][0]["value"]
-
-                # update_or_create to avoid unique constraint errors
-                post_obj, created = Post.objects.update_or_create(
-                    post_API_ID=api_id,
-                    defaults={
-                        "instagram_account": account,
-                        "date_posted": date_posted,
-                        "post_link": permalink,
-                        "num_likes": num_likes,
-                        "num_comments": num_comments,
-                        "num_shares": num_shares,
-                        "num_saves": num_saved,
-                        "caption": caption,
-                    },
-                )
 
-                if num_comments > 0:
-                    get_comment_data(access_token, api_id, account_id)
+def refresh_due_posts(
+    access_token,
+    account,
+    exclude=(),
+    max_workers=None,
+    stats=None,
+    progress=None,
+    client=graph,
+):
+    """
+    Refreshes the insights of the account's posts that are due under
+    INSTAGRAM_REFRESH_TIERS, leaving out the post_API_IDs in exclude, then
+    re-syncs the comments of the ones select_comment_syncs picks.
 
-        return "Posts processed successfully."
+    Returns the ids of the users whose comments were written, for the caller
+    to refresh their counters. The posts_refreshed count and the counts of
+    refresh_post_metrics and get_comment_data are added to stats.
+    """
+    report_progress(progress, "insights")
+    due = list(
+        Post.objects.filter(instagram_account=account)
+        .filter(refresh_due_filter())
+        .exclude(post_API_ID__in=list(exclude))
+    )
+    if not due:
+        return set()
+
+    previous = {p.post_API_ID: (p.num_comments, p.comments_synced_at) for p in due}
+    refreshed = refresh_post_metrics(access_token, due, max_workers, stats, client)
+    add_stat(stats, "posts_refreshed", len(refreshed))
+    report_progress(progress, "insights")
+
+    user_ids = set()
+    for post in select_comment_syncs(refreshed, previous, stats):
+        report_progress(progress, "comments")
+        user_ids |= get_comment_data(
+            access_token,
+            post.post_API_ID,
+            account.account_API_ID,
+            False,
+            stats,
+            client=client,
+        )
+    return user_ids
 
-    except requests.exceptions.RequestException as e:
-        return f"Error getting Instagram posts: {e}"
+
+def refresh_post_metrics(
+    access_token, posts, max_workers=None, stats=None, client=graph
+):
+    """
+    Lightweight refresh for already stored posts: re-reads only their insights
+    through the batch API (no caption or comment calls) and writes the new
+    numbers with one bulk_update. Posts whose content_hash is unchanged are
+    left out of the update and added to the posts_unchanged count of stats;
+    only their metrics_refreshed_at is moved on.
+    Returns the list of posts whose insights were read.
+    """
+    posts = list(posts)
+    bodies = graph_batch(
+        access_token,
+        [insights_relative_url(p.post_API_ID) for p in posts],
+        max_workers,
+        client,
+    )
+    refreshed = []
+    changed = []
+    staged = {}
+    now = timezone.now()
+    for post, body in zip(posts, bodies):
+        insights_data = body.get("data", [])
+        if not insights_data:
+            continue
+        for field, value in post_metrics(insights_data).items():
+            setattr(post, field, value)
+        post.metrics_refreshed_at = now
+        refreshed.append(post)
+        digest = content_hash(post, POST_HASH_FIELDS)
+        if digest != post.content_hash:
+            post.content_hash = digest
+            changed.append(post)
+        staged.setdefault(post.instagram_account_id, []).append(
+            (post.post_API_ID, {"data": insights_data})
+        )
+    for account_pk, payloads in staged.items():
+        stage_payloads(account_pk, "insights", payloads)
+    Post.objects.bulk_update(
+        changed,
+        METRIC_FIELDS + ["content_hash", "metrics_refreshed_at"],
+        batch_size=500,
+    )
+    changed_pks = {p.pk for p in changed}
+    unchanged = [p.pk for p in refreshed if p.pk not in changed_pks]
+    while unchanged:
+        chunk, unchanged = unchanged[:500], unchanged[500:]
+        Post.objects.filter(pk__in=chunk).update(metrics_refreshed_at=now)
+    add_stat(stats, "posts_unchanged", len(refreshed) - len(changed))
+    return refreshed
+
+
+def add_stat(stats, key, count):
+    """Adds count to stats[key] when the caller asked for stats."""
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + count
+
+
+def report_progress(progress, stage):
+    """Tells the caller's progress callable which stage the sync is in."""
+    if progress is not None:
+        progress(stage)
 
 
 def get_country_demographics(access_token, account_id):
@@ -120,39 +728,7 @@ def get_country_demographics(access_token, account_id):
     Fetches engagement breakdown by country for the given account
     and saves Country rows linked to that InstagramAccount.
     """
-    try:
-        account = InstagramAccount.objects.get(account_API_ID=account_id)
-    except InstagramAccount.DoesNotExist:
-        return f"Account with id {account_id} does not exist."
-
-    url = f"https://graph.instagram.com/v22.0/{account_id}/insights"
-    params = {
-        "metric": "engaged_audience_demographics",
-        "metric_type": "total_value",
-        "access_token": access_token,
-        "period": "lifetime",
-        "timeframe": "this_month",
-        "breakdown": "country",
-    }
-
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        breakdowns = data["data"][0].get("total_value", {}).get("breakdowns", [])
-        countries = breakdowns[0].get("results", []) if breakdowns else []
-
-        if countries:
-            Country.objects.filter(instagram_account=account).delete()
-            for c in countries:
-                Country.objects.create(
-                    instagram_account=account,
-                    name=c["dimension_values"][0],
-                    num_interactions=c["value"],
-                )
-    except Exception as e:
-        return f"Error getting country demographics: {e}"
+    return get_all_demographics(access_token, account_id, ["country"])
 
 
 def get_city_demographics(access_token, account_id):
@@ -160,39 +736,7 @@ def get_city_demographics(access_token, account_id):
     Fetches engagement breakdown by city for the given account
     and saves City rows linked to that InstagramAccount.
     """
-    try:
-        account = InstagramAccount.objects.get(account_API_ID=account_id)
-    except InstagramAccount.DoesNotExist:
-        return f"Account with id {account_id} does not exist."
-
-    url = f"https://graph.instagram.com/v22.0/{account_id}/insights"
-    params = {
-        "metric": "engaged_audience_demographics",
-        "metric_type": "total_value",
-        "access_token": access_token,
-        "period": "lifetime",
-        "timeframe": "this_month",
-        "breakdown": "city",
-    }
-
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        breakdowns = data["data"][0].get("total_value", {}).get("breakdowns", [])
-        cities = breakdowns[0].get("results", []) if breakdowns else []
-
-        if cities:
-            City.objects.filter(instagram_account=account).delete()
-            for c in cities:
-                City.objects.create(
-                    instagram_account=account,
-                    name=c["dimension_values"][0],
-                    num_interactions=c["value"],
-                )
-    except Exception as e:
-        return f"Error getting city demographics: {e}"
+    return get_all_demographics(access_token, account_id, ["city"])
 
 
 def get_age_demographics(access_token, account_id):
@@ -200,92 +744,225 @@ def get_age_demographics(access_token, account_id):
     Fetches engagement breakdown by age group for the given account
     and saves Age rows linked to that InstagramAccount.
     """
+    return get_all_demographics(access_token, account_id, ["age"])
+
+
+def get_all_demographics(access_token, account_id, breakdowns=None, max_workers=None):
+    """
+    Fetches the engagement breakdowns of the given account (country, city
+    and age by default) concurrently, then replaces each table's rows for
+    that account with one bulk_create, all inside one transaction so readers
+    never see a table emptied between the delete and the inserts.
+
+    A breakdown that fails or comes back empty leaves its table untouched.
+    Returns None on success, or the error messages of the failed breakdowns.
+    """
     try:
         account = InstagramAccount.objects.get(account_API_ID=account_id)
     except InstagramAccount.DoesNotExist:
         return f"Account with id {account_id} does not exist."
 
-    url = f"https://graph.instagram.com/v22.0/{account_id}/insights"
+    breakdowns = list(breakdowns or DEMOGRAPHIC_BREAKDOWNS)
+    results = run_concurrently(
+        lambda breakdown: fetch_demographic_breakdown(
+            access_token, account_id, breakdown
+        ),
+        breakdowns,
+        max_workers,
+    )
+
+    errors = []
+    with transaction.atomic():
+        for breakdown, (rows, error) in zip(breakdowns, results):
+            if error:
+                errors.append(f"Error getting {breakdown} demographics: {error}")
+                continue
+            if not rows:
+                continue
+            model, label_field = DEMOGRAPHIC_BREAKDOWNS[breakdown]
+            model.objects.filter(instagram_account=account).delete()
+            model.objects.bulk_create(
+                [
+                    model(
+                        instagram_account=account,
+                        num_interactions=value,
+                        **{label_field: label},
+                    )
+                    for label, value in rows
+                ]
+            )
+    return "; ".join(errors) or None
+
+
+def fetch_demographic_breakdown(access_token, account_id, breakdown):
+    """
+    Fetches one engaged_audience_demographics breakdown. Returns
+    ([(label, num_interactions), ...], None), or ([], error) if the request
+    or its parsing failed. Only talks to the API, so it is safe to call from
+    worker threads.
+    """
+    url = graph_url(f"v22.0/{account_id}/insights")
     params = {
         "metric": "engaged_audience_demographics",
         "metric_type": "total_value",
         "access_token": access_token,
         "period": "lifetime",
         "timeframe": "this_month",
-        "breakdown": "age",
+        "breakdown": breakdown,
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = graph.get(url, params=params)
         response.raise_for_status()
         data = response.json()
 
         breakdowns = data["data"][0].get("total_value", {}).get("breakdowns", [])
-        ages = breakdowns[0].get("results", []) if breakdowns else []
-
-        if ages:
-            Age.objects.filter(instagram_account=account).delete()
-            for a in ages:
-                Age.objects.create(
-                    instagram_account=account,
-                    age_range=a["dimension_values"][0],
-                    num_interactions=a["value"],
-                )
+        results = breakdowns[0].get("results", []) if breakdowns else []
+        return [(r["dimension_values"][0], r["value"]) for r in results], None
     except Exception as e:
-        return f"Error getting age demographics: {e}"
+        return [], e
 
 
-def get_comment_data(access_token, post_id, account_id):
+def get_comment_data(
+    access_token, post_id, account_id, refresh_counts=True, stats=None, client=graph
+):
     """
     Fetches all comments for a post and saves them,
     always linking Comment and InstagramUser to the given account.
+
+    The listing asks for every field we store, including nested replies, so
+    rows are built straight from the paged results: one request per 50
+    comments. The Post is looked up once and each page is written with
+    save_comment_batch.
+
+    Returns the ids of the users whose comments were written. Their
+    num_comments counters are recomputed at the end unless refresh_counts is
+    False, in which case the caller is expected to do it once for the sync.
+    If a stats dict is given, the number of comments written is added to its
+    comments_written count, and a sync that did not read every page is
+    counted in comment_syncs_failed.
+
+    The post's comments_synced_at is cleared while its comments are fetched
+    and only set again once every page was read, so select_comment_syncs
+    picks a post whose comment sync failed again on the next sync.
+
+    Like the media listing, the comment listing is checkpointed after every
+    page, so a sync cut off by an error or rate limit resumes after the last
+    page it wrote.
     """
+    user_ids = set()
     try:
         account = InstagramAccount.objects.get(account_API_ID=account_id)
     except InstagramAccount.DoesNotExist:
         print(f"Account with id {account_id} does not exist.")
-        return
+        return user_ids
+
+    post = Post.objects.filter(instagram_account=account, post_API_ID=post_id).first()
+    if post is None:
+        print(f"Post {post_id} does not exist for account {account_id}.")
+        return user_ids
 
-    all_comment_ids = []
-    url = f"https://graph.instagram.com/{post_id}/comments"
+    url = graph_url(f"{post_id}/comments")
     params = {
         "access_token": access_token,
-        "fields": "id",
+        "fields": COMMENT_LIST_FIELDS,
         "limit": 50,
     }
+    scope = comments_scope(post_id)
+    checkpoint = load_checkpoint(account, scope)
+    if checkpoint:
+        params["after"] = checkpoint.cursor
+
+    # the post's fresh num_comments is already stored, so until every page
+    # is read it must not look synced, or a failed sync would be skipped
+    Post.objects.filter(pk=post.pk).update(comments_synced_at=None)
+    completed = False
+    try:
+        completed = _page_comments(url, params, account, post, user_ids, stats, client)
+        if completed:
+            clear_checkpoint(account, scope)
+            Post.objects.filter(pk=post.pk).update(comments_synced_at=timezone.now())
+    finally:
+        if not completed:
+            add_stat(stats, "comment_syncs_failed", 1)
+        if refresh_counts:
+            refresh_comment_counts(user_ids)
+    return user_ids
+
+
+def _page_comments(url, params, account, post, user_ids, stats=None, client=graph):
+    """
+    Pages through a comment listing and writes each page, adding the ids of
+    the users written to user_ids, and checkpoints the listing after each
+    page that has a next one. Returns True once every page was read and
+    written; a page that fails to save ends the paging before it is
+    checkpointed, so the next sync fetches it again.
+    """
+    with closing(iter_prefetched(fetch_comment_pages(url, params, client))) as pages:
+        for resp in pages:
+            if "error" in resp:
+                print(f"Error fetching comments: {resp['error'].get('message')}")
+                return False
+
+            items = resp.get("data", [])
+            stage_payloads(
+                account,
+                "comment",
+                [(c.get("id"), c) for c in items],
+                parent_id=post.post_API_ID,
+            )
+            parsed = parse_comment_page(items, account, post)
+            try:
+                user_ids |= save_comment_batch(parsed, stats)
+            except Exception as e:
+                # stop before the checkpoint moves past the unsaved page
+                print(f"Error saving comments for post {post.post_API_ID}: {e}")
+                return False
+
+            paging = resp.get("paging", {})
+            cursor = paging.get("cursors", {}).get("after")
+            if paging.get("next") and cursor:
+                last_id = items[-1].get("id", "") if items else ""
+                save_checkpoint(
+                    account, comments_scope(post.post_API_ID), cursor, last_id
+                )
+    return True
 
-    # paginate to collect all comment IDs
-    while True:
-        resp = requests.get(url, params=params).json()
-        if "error" in resp:
-            print(f"Error fetching comments: {resp['error'].get('message')}")
-            return
-
-        for c in resp.get("data", []):
-            cid = c.get("id")
-            if cid:
-                all_comment_ids.append(cid)
 
+def fetch_comment_pages(url, params, client=graph):
+    """
+    Yields each page of a comment listing as parsed JSON, stopping after
+    the last page or after a page carrying an error. Only talks to the API.
+    """
+    while True:
+        resp = client.get(url, params=params).json()
+        yield resp
         nxt = resp.get("paging", {}).get("next")
-        if not nxt:
-            break
+        if "error" in resp or not nxt:
+            return
         url = nxt
         params = {}
 
-    comment_map = {}
-    for cid in all_comment_ids:
-        obj, replies = get_comments_helper(access_token, cid, post_id, account)
-        if obj:
-            comment_map[obj.id] = (obj, replies)
 
-    # assign parent_ID for replies
-    for cid, (comment, replies) in comment_map.items():
-        for rid in replies:
-            if rid in comment_map:
-                reply_obj, _ = comment_map[rid]
-                if not reply_obj.parent_ID:
-                    reply_obj.parent_ID = cid
-                    reply_obj.save()
+def parse_comment_page(items, account, post):
+    """
+    Parses one page of a post's comment listing, replies included, into the
+    (InstagramUser, Comment) pairs save_comment_batch writes. Comments that
+    have to be skipped are left out.
+    """
+    parsed = []
+    for c in items:
+        cid = c.get("id")
+        if not cid:
+            continue
+        parsed.append(parse_comment(c, cid, account, post))
+
+        # replies arrive nested under their parent comment
+        for r in c.get("replies", {}).get("data", []):
+            rid = r.get("id")
+            if rid:
+                parsed.append(parse_comment(r, rid, account, post, cid))
+    return [p for p in parsed if p]
 
 
 def get_comments_helper(access_token, comment_id, post_id, account):
@@ -295,71 +972,221 @@ def get_comments_helper(access_token, comment_id, post_id, account):
     Returns (Comment instance, list_of_reply_ids).
     """
     try:
-        url = f"https://graph.instagram.com/{comment_id}"
+        url = graph_url(comment_id)
         params = {
-            "fields": "id,from,like_count,text,timestamp,replies,username,parent_id",
+            "fields": COMMENT_FIELDS,
             "access_token": access_token,
         }
-        data = requests.get(url, params=params).json()
+        data = graph.get(url, params=params).json()
+    except Exception as e:
+        print(f"Error processing comment {comment_id}: {e}")
+        return None, []
+    return save_comment(data, comment_id, post_id, account)
+
+
+def save_comment(data, comment_id, post_id, account):
+    """
+    Saves one comment API response and its user,
+    always linking both to the given InstagramAccount.
+    Returns (Comment instance, list_of_reply_ids), or (None, []) if skipped.
+    """
+    try:
+        post = Post.objects.get(instagram_account=account, post_API_ID=post_id)
+        if "error" not in data:
+            stage_payloads(
+                account, "comment_lookup", [(comment_id, data)], parent_id=post_id
+            )
+        parsed = parse_comment(data, comment_id, account, post)
+        if not parsed:
+            return None, []
+        refresh_comment_counts(save_comment_batch([parsed]))
+        return parsed[1], parsed[1].replies
+    except Exception as e:
+        print(f"Error processing comment {comment_id}: {e}")
+        return None, []
+
+
+def parse_comment(data, comment_id, account, post, parent_id=""):
+    """
+    Turns one comment API response into unsaved (InstagramUser, Comment)
+    instances linked to the given account and post. parent_id is used when
+    the response does not carry its own. Returns None if the comment has to
+    be skipped.
+    """
+    try:
         if "error" in data:
             print(f"Skipping comment {comment_id}: {data['error'].get('message')}")
-            return None, []
+            return None
 
         user_data = data.get("from", {})
         uid = user_data.get("id")
         uname = user_data.get("username")
         if not uid or not uname:
             print(f"Skipping comment {comment_id} for missing user info")
-            return None, []
+            return None
 
-        timestamp = data.get("timestamp")
-        text = data.get("text", "")
-        likes = data.get("like_count", 0)
         replies = [
             r.get("id") for r in data.get("replies", {}).get("data", []) if r.get("id")
         ]
-        parent_id = data.get("parent_id") or ""
-
-        # save or update user
-        user_obj, created = InstagramUser.objects.get_or_create(
-            id=uid, defaults={"instagram_account": account}
-        )
-        user_obj.instagram_account = account
-        user_obj.username = uname
-        user_obj.save()
-
-        # save or update comment
-        comment_obj, created = Comment.objects.get_or_create(id=comment_id)
-        comment_obj.instagram_account = account
-        # ensure we get the right Post for this account
-        comment_obj.post_API_ID = Post.objects.get(
-            instagram_account=account, post_API_ID=post_id
+        user_obj = InstagramUser(id=int(uid), instagram_account=account, username=uname)
+        comment_obj = Comment(
+            id=int(comment_id),
+            instagram_account=account,
+            post_API_ID=post,
+            date_posted=parse_datetime(data.get("timestamp") or ""),
+            num_likes=data.get("like_count", 0),
+            replies=replies,
+            text=data.get("text", ""),
+            username=uname,
+            user_ID=user_obj,
+            parent_ID=data.get("parent_id") or parent_id or "",
         )
-        comment_obj.date_posted = parse_datetime(timestamp)
-        comment_obj.num_likes = likes
-        comment_obj.replies = replies
-        comment_obj.text = text
-        comment_obj.username = uname
-        comment_obj.user_ID = user_obj
-        if not comment_obj.parent_ID:
-            comment_obj.parent_ID = parent_id
-        comment_obj.save()
-
-        if created:
-            user_obj.num_comments += 1
-            user_obj.save()
-
-        return comment_obj, replies
+        return user_obj, comment_obj
 
     except Exception as e:
         print(f"Error processing comment {comment_id}: {e}")
-        return None, []
+        return None
 
 
-def get_instagram_stories(access_token, account_id):
+def save_comment_batch(parsed, stats=None, force=False):
     """
-    Fetches active Instagram stories for the given account,
-    saves them to the database with the correct foreign key.
+    Writes a batch of (InstagramUser, Comment) pairs from parse_comment in
+    one transaction: one bulk upsert for the users, one for the comments,
+    and one bulk_update for replies whose stored parent_ID was still empty.
+    Users and comments whose content_hash matches the stored row are not
+    written, unless force is set.
+    Returns the ids of the users in the batch, so their num_comments
+    counters can be refreshed afterwards.
+
+    If a stats dict is given, the comments_written, comments_unchanged,
+    users_written and users_unchanged counts are added to it.
+    """
+    if not parsed:
+        return set()
+    users = {user.id: user for user, _ in parsed}
+    comments = {comment.id: comment for _, comment in parsed}
+
+    with transaction.atomic():
+        existing = dict(
+            Comment.objects.filter(id__in=comments).values_list("id", "parent_ID")
+        )
+        changed_users, _, users_unchanged = split_unchanged(
+            InstagramUser, list(users.values()), "id", USER_HASH_FIELDS, force
+        )
+        changed_comments, _, comments_unchanged = split_unchanged(
+            Comment, list(comments.values()), "id", COMMENT_HASH_FIELDS, force
+        )
+        if changed_users:
+            InstagramUser.objects.bulk_create(
+                changed_users,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=["instagram_account", "username", "content_hash"],
+            )
+        if changed_comments:
+            # parent_ID is left out so an existing parent is never overwritten
+            Comment.objects.bulk_create(
+                changed_comments,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=COMMENT_UPDATE_FIELDS,
+            )
+
+        orphans = []
+        for cid, parent_id in existing.items():
+            if not parent_id and comments[cid].parent_ID:
+                orphans.append(Comment(id=cid, parent_ID=comments[cid].parent_ID))
+        if orphans:
+            Comment.objects.bulk_update(orphans, ["parent_ID"])
+
+    add_stat(stats, "comments_written", len(changed_comments))
+    add_stat(stats, "comments_unchanged", comments_unchanged)
+    add_stat(stats, "users_written", len(changed_users))
+    add_stat(stats, "users_unchanged", users_unchanged)
+    return set(users)
+
+
+def parse_story(story, insights):
+    """
+    Turns one story of the stories listing and its insights response into
+    the dict of InstagramStory field values get_instagram_stories returns.
+    date_posted is an aware UTC datetime.
+    """
+    # parse timestamp
+    date_posted = None
+    ts = story.get("timestamp")
+    if ts:
+        try:
+            date_posted = datetime.strptime(ts, "%Y-%m-%dT%H:%M:%S%z").astimezone(
+                dt_timezone.utc
+            )
+        except ValueError:
+            pass
+
+    # default metrics
+    metrics = {"num_views": 0, "num_profile_clicks": 0, "num_swipes_up": 0}
+    for m in insights:
+        name = m.get("name")
+        val = m.get("values", [{}])[0].get("value", 0)
+        if name == "reach":
+            metrics["num_views"] = val
+        elif name == "profile_visits":
+            metrics["num_profile_clicks"] = val
+        elif name == "navigation":
+            metrics["num_swipes_up"] = val
+
+    return {
+        "story_API_ID": story.get("id"),
+        "date_posted": date_posted,
+        "story_link": story.get("permalink", ""),
+        "num_views": metrics["num_views"],
+        "num_profile_clicks": metrics["num_profile_clicks"],
+        "num_replies": 0,
+        "num_swipes_up": metrics["num_swipes_up"],
+    }
+
+
+def story_insights_relative_url(api_id):
+    """Returns the relative URL of a story's lifetime insights for graph_batch."""
+    return f"v19.0/{api_id}/insights?metric=reach,navigation,profile_visits&period=lifetime"
+
+
+def upsert_stories(account, stories, with_metrics=True, captured_at=None):
+    """
+    Writes parsed story dicts (see parse_story) with bulk upserts on
+    story_API_ID, so stories stay stored after they expire. Without
+    with_metrics, stored metrics are left as they are and only new stories
+    are inserted with theirs. captured_at, when given, is saved as the time
+    of the stories' latest insights snapshot.
+    """
+    update_fields = list(STORY_FIELDS)
+    if with_metrics:
+        update_fields += STORY_METRIC_FIELDS
+    if captured_at:
+        update_fields.append("captured_at")
+    InstagramStory.objects.bulk_create(
+        [
+            InstagramStory(instagram_account=account, captured_at=captured_at, **story)
+            for story in stories
+        ],
+        update_conflicts=True,
+        unique_fields=["story_API_ID"],
+        update_fields=update_fields,
+        batch_size=500,
+    )
+
+
+def get_instagram_stories(access_token, account_id, stats=None, progress=None):
+    """
+    Fetches active Instagram stories for the given account and upserts them
+    by story_API_ID, so stories of earlier syncs are kept once they expire.
+    The insights of every active story are read with batch requests; a
+    story whose insights could not be read keeps its stored metrics and its
+    last staged payload.
+
+    If a stats dict is given, the stories_fetched and story_insights_fetched
+    counts are added to it. A progress callable is told when the sync moves
+    to the "stories" and "insights" stages, as in get_instagram_posts.
     """
     if not access_token:
         return "Access token is missing."
@@ -368,90 +1195,43 @@ def get_instagram_stories(access_token, account_id):
     except InstagramAccount.DoesNotExist:
         return f"Account with id {account_id} does not exist."
 
-    stories_url = "https://graph.instagram.com/v19.0/me/stories"
+    stories_url = graph_url("v19.0/me/stories")
     stories_params = {"fields": "id,timestamp,permalink", "access_token": access_token}
 
     try:
-        response = requests.get(stories_url, params=stories_params)
+        report_progress(progress, "stories")
+        response = graph.get(stories_url, params=stories_params)
         data = response.json()
 
         if response.status_code != 200:
             error_msg = data.get("error", {}).get("message", "Unknown API error")
             return f"API Error fetching stories ({response.status_code}): {error_msg}"
 
+        stories = [story for story in data.get("data") or [] if story.get("id")]
         active_stories = []
-        if "data" in data and data["data"]:
-            for story in data["data"]:
-                story_id = story.get("id")
-                if not story_id:
-                    continue
-
-                # parse timestamp
-                date_posted = None
-                ts = story.get("timestamp")
-                if ts:
-                    try:
-                        date_posted = datetime.strptime(
-                            ts, "%Y-%m-%dT%H:%M:%S%z"
-                        ).replace(tzinfo=None)
-                    except ValueError:
-                        pass
-
-                # default metrics
-                metrics = {"num_views": 0, "num_profile_clicks": 0, "num_swipes_up": 0}
-
-                # fetch insights
-                try:
-                    insights_url = (
-                        f"https://graph.instagram.com/v19.0/{story_id}/insights"
-                    )
-                    insights_params = {
-                        "metric": "reach,navigation,profile_visits",
-                        "period": "lifetime",
-                        "access_token": access_token,
-                    }
-                    resp_ins = (
-                        requests.get(insights_url, params=insights_params)
-                        .json()
-                        .get("data", [])
-                    )
-                    for m in resp_ins:
-                        name = m.get("name")
-                        val = m.get("values", [{}])[0].get("value", 0)
-                        if name == "reach":
-                            metrics["num_views"] = val
-                        elif name == "profile_visits":
-                            metrics["num_profile_clicks"] = val
-                        elif name == "navigation":
-                            metrics["num_swipes_up"] = val
-                except Exception:
-                    pass
-
-                active_stories.append(
-                    {
-                        "story_API_ID": story_id,
-                        "date_posted": date_posted,
-                        "story_link": story.get("permalink", ""),
-                        "num_views": metrics["num_views"],
-                        "num_profile_clicks": metrics["num_profile_clicks"],
-                        "num_replies": 0,
-                        "num_swipes_up": metrics["num_swipes_up"],
-                    }
-                )
-
-            # delete old stories for this account and save new ones
-            InstagramStory.objects.filter(instagram_account=account).delete()
-            for s in active_stories:
-                InstagramStory.objects.create(
-                    instagram_account=account,
-                    date_posted=s["date_posted"],
-                    story_link=s["story_link"],
-                    num_views=s["num_views"],
-                    num_profile_clicks=s["num_profile_clicks"],
-                    num_replies=s["num_replies"],
-                    num_swipes_up=s["num_swipes_up"],
-                    story_API_ID=s["story_API_ID"],
-                )
+        if stories:
+            add_stat(stats, "stories_fetched", len(stories))
+            report_progress(progress, "insights")
+            bodies = graph_batch(
+                access_token, [story_insights_relative_url(s["id"]) for s in stories]
+            )
+            captured, uncaptured, staged = [], [], []
+            for story, body in zip(stories, bodies):
+                resp_ins = body.get("data", [])
+                parsed = parse_story(story, resp_ins)
+                if "error" in body:
+                    uncaptured.append(parsed)
+                else:
+                    add_stat(stats, "story_insights_fetched", 1)
+                    captured.append(parsed)
+                    # only a captured snapshot may replace the staged payload
+                    staged.append((story["id"], {**story, "insights": resp_ins}))
+                active_stories.append(parsed)
+            stage_payloads(account, "story", staged)
+
+            with transaction.atomic():
+                upsert_stories(account, captured, captured_at=timezone.now())
+                upsert_stories(account, uncaptured, with_metrics=False)
 
         return active_stories
 
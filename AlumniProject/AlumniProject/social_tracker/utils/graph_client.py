@@ -0,0 +1,332 @@
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: throttling and transient server errors.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Graph error codes that mean "slow down" even though the status is 4xx.
+THROTTLE_ERROR_CODES = {4, 17, 32, 613}
+
+
+class SyncStats:
+    """
+    Live rate-limit view of one access token, fed by the X-App-Usage and
+    X-Business-Use-Case-Usage headers of every response.
+
+    Attributes:
+        app_usage (int): Highest percentage reported in X-App-Usage.
+        business_usage (int): Highest percentage reported in X-Business-Use-Case-Usage.
+        regain_seconds (int): Seconds until access is regained, if Instagram reported a block.
+        requests (int): Requests sent with this token.
+        waits (int): How many requests had to wait for the rate limiter.
+        waited_seconds (float): Total time spent waiting for the rate limiter.
+        throttled (int): Responses that reported throttling.
+    """
+
+    def __init__(self):
+        self.app_usage = 0
+        self.business_usage = 0
+        self.regain_seconds = 0
+        self.requests = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0
+
+    @property
+    def utilization(self):
+        """Current utilization in percent, the highest of the reported usages."""
+        return max(self.app_usage, self.business_usage)
+
+    def as_dict(self):
+        return {
+            "utilization": self.utilization,
+            "app_usage": self.app_usage,
+            "business_usage": self.business_usage,
+            "regain_seconds": self.regain_seconds,
+            "requests": self.requests,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3),
+            "throttled": self.throttled,
+        }
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket pacing the requests of one access token.
+
+    The refill rate drops as the reported utilization passes the slow-down
+    threshold, so requests are spread out before Instagram starts rejecting
+    them, and the bucket can be paused outright while access is blocked.
+    """
+
+    def __init__(self, max_rate, capacity, slowdown_at, stats):
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.capacity = capacity
+        self.slowdown_at = slowdown_at
+        self.stats = stats
+        self.lock = threading.Lock()
+        # theoretical arrival time of the next request (GCRA form of a bucket)
+        self.next_at = 0.0
+        self.paused_until = 0.0
+
+    def acquire(self):
+        """Waits until a request may be sent. Returns the seconds waited."""
+        with self.lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            burst = (self.capacity - 1) * interval
+            next_at = max(self.next_at, now)
+            send_at = max(now, next_at - burst, self.paused_until)
+            self.next_at = max(next_at, send_at) + interval
+            wait = send_at - now
+            self.stats.requests += 1
+            if wait > 0:
+                self.stats.waits += 1
+                self.stats.waited_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def update(self, utilization, pause_seconds=0):
+        """Re-tunes the refill rate from the latest utilization (percent)."""
+        with self.lock:
+            if utilization <= self.slowdown_at:
+                self.rate = self.max_rate
+            else:
+                headroom = max(100 - utilization, 1) / (100 - self.slowdown_at)
+                self.rate = max(self.max_rate * headroom, 0.05)
+            if pause_seconds:
+                self.paused_until = max(
+                    self.paused_until, time.monotonic() + pause_seconds
+                )
+
+
+class GraphClient:
+    """
+    Shared client for every Instagram Graph API call.
+
+    Keeps one keep-alive connection pool, applies connect and read timeouts
+    to every request, and retries throttled (429) and transient 5xx responses
+    and connection errors with exponential backoff and jitter.
+
+    Requests are paced per access token by a TokenBucket that follows the
+    X-App-Usage and X-Business-Use-Case-Usage headers, slowing down as usage
+    climbs instead of waiting to be throttled. stats(access_token) returns
+    the token's SyncStats.
+
+    Attributes:
+        session (requests.Session): The pooled session all requests go through.
+        timeout (tuple): (connect, read) timeouts in seconds.
+        max_retries (int): How many times a failed request is retried.
+        backoff (float): Base delay in seconds, doubled on every retry.
+        max_rate (float): Requests per second allowed per access token, or None
+            for GRAPH_MAX_REQUESTS_PER_SECOND.
+        burst (int): Burst size of each token's bucket, or None for GRAPH_BURST.
+    """
+
+    def __init__(
+        self,
+        timeout=None,
+        max_retries=None,
+        backoff=None,
+        pool_size=None,
+        max_rate=None,
+        burst=None,
+    ):
+        self.timeout = timeout or (
+            getattr(settings, "GRAPH_CONNECT_TIMEOUT", 5),
+            getattr(settings, "GRAPH_READ_TIMEOUT", 30),
+        )
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else getattr(settings, "GRAPH_MAX_RETRIES", 3)
+        )
+        self.backoff = (
+            backoff
+            if backoff is not None
+            else getattr(settings, "GRAPH_RETRY_BACKOFF", 0.5)
+        )
+        # read when a token's bucket is created, so settings overrides apply
+        self.max_rate = max_rate
+        self.burst = burst
+        pool_size = pool_size or getattr(settings, "INSTAGRAM_MAX_WORKERS", 8)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+
+    def get(self, url, params=None):
+        """Sends a GET request and returns the final requests.Response."""
+        return self.request("GET", url, params=params)
+
+    def post(self, url, data=None):
+        """Sends a POST request and returns the final requests.Response."""
+        return self.request("POST", url, data=data)
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request, retrying transient failures. Returns the last
+        response once it succeeds or the retries run out; re-raises the
+        connection error if the last attempt could not connect at all.
+        """
+        bucket = self.bucket_for(self.token_of(url, kwargs))
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                response = self.send(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.retry_delay(attempt)
+            else:
+                throttled = self.observe(bucket, response)
+                if (
+                    response.status_code not in RETRY_STATUSES and not throttled
+                ) or attempt >= self.max_retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+                elif bucket.stats.regain_seconds:
+                    # the bucket is already paused until access comes back
+                    delay = 0
+                else:
+                    delay = self.retry_delay(attempt)
+            if delay:
+                time.sleep(delay)
+            attempt += 1
+
+    def send(self, method, url, **kwargs):
+        """Performs a single HTTP exchange over the pooled session."""
+        return self.session.request(method, url, timeout=self.timeout, **kwargs)
+
+    def retry_delay(self, attempt):
+        """Exponential backoff with full jitter for the given retry attempt."""
+        return random.uniform(0, self.backoff * (2**attempt))
+
+    def stats(self, access_token):
+        """Returns the SyncStats of the given access token."""
+        return self.bucket_for(access_token).stats
+
+    def bucket_for(self, access_token):
+        """Returns the TokenBucket of an access token, creating it on first use."""
+        with self.buckets_lock:
+            bucket = self.buckets.get(access_token)
+            if bucket is None:
+                bucket = TokenBucket(
+                    max_rate=self.max_rate
+                    or getattr(settings, "GRAPH_MAX_REQUESTS_PER_SECOND", 20),
+                    capacity=self.burst or getattr(settings, "GRAPH_BURST", 20),
+                    slowdown_at=getattr(settings, "GRAPH_USAGE_SLOWDOWN", 75),
+                    stats=SyncStats(),
+                )
+                self.buckets[access_token] = bucket
+            return bucket
+
+    @staticmethod
+    def token_of(url, kwargs):
+        """Finds the access token of a request in its params, body or URL."""
+        for key in ("params", "data"):
+            values = kwargs.get(key) or {}
+            if isinstance(values, dict) and values.get("access_token"):
+                return values["access_token"]
+        # paging "next" URLs carry the token in their query string
+        return parse_qs(urlparse(url).query).get("access_token", [""])[0]
+
+    def observe(self, bucket, response):
+        """
+        Reads the usage headers of a response into the bucket's SyncStats and
+        re-tunes its rate. Returns True when the response reports throttling.
+        """
+        stats = bucket.stats
+        headers = response.headers
+        app_usage = parse_usage(headers.get("X-App-Usage"))
+        business_usage, regain_minutes = parse_business_usage(
+            headers.get("X-Business-Use-Case-Usage")
+        )
+        if app_usage is not None:
+            stats.app_usage = app_usage
+        if business_usage is not None:
+            stats.business_usage = business_usage
+        stats.regain_seconds = regain_minutes * 60
+
+        throttled = response.status_code == 429
+        if response.status_code >= 400 and not throttled:
+            try:
+                code = response.json().get("error", {}).get("code")
+            except ValueError:
+                code = None
+            throttled = code in THROTTLE_ERROR_CODES
+
+        pause = stats.regain_seconds
+        if throttled:
+            stats.throttled += 1
+            if not pause and stats.utilization >= 100:
+                pause = getattr(settings, "GRAPH_THROTTLE_PAUSE", 60)
+        bucket.update(stats.utilization, pause)
+        return throttled
+
+
+def parse_usage(raw):
+    """
+    Parses an X-App-Usage header, e.g. {"call_count": 28, "total_time": 25,
+    "total_cputime": 25}, into its highest percentage, or None if absent.
+    """
+    if not raw:
+        return None
+    try:
+        usage = json.loads(raw)
+        return max(int(v) for v in usage.values() if isinstance(v, (int, float)))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def parse_business_usage(raw):
+    """
+    Parses an X-Business-Use-Case-Usage header, which maps business ids to
+    lists of usage entries. Returns (highest percentage or None, highest
+    estimated_time_to_regain_access in minutes).
+    """
+    if not raw:
+        return None, 0
+    try:
+        usage = json.loads(raw)
+    except (ValueError, TypeError):
+        return None, 0
+    percent, regain = None, 0
+    for entries in usage.values() if isinstance(usage, dict) else []:
+        for entry in entries if isinstance(entries, list) else []:
+            for key in ("call_count", "total_cputime", "total_time"):
+                value = entry.get(key)
+                if isinstance(value, (int, float)):
+                    percent = max(percent or 0, int(value))
+            regain = max(regain, int(entry.get("estimated_time_to_regain_access") or 0))
+    return percent, regain
+
+
+def graph_url(path=""):
+    """
+    Returns the absolute URL of a Graph API path under GRAPH_API_BASE_URL,
+    so ingestion can be pointed at another server, e.g. the fake one in
+    social_tracker.utils.fake_graph.
+    """
+    base = getattr(settings, "GRAPH_API_BASE_URL", "https://graph.instagram.com")
+    return f"{base.rstrip('/')}/{str(path).lstrip('/')}"
+
+
+# The one client shared by every ingestion path.
+graph = GraphClient()
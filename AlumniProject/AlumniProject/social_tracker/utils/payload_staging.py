@@ -0,0 +1,60 @@
+import json
+import zlib
+
+from django.conf import settings
+
+from social_tracker.models import GraphPayload
+
+
+def compress_payload(data):
+    """Encodes a parsed Graph payload as zlib-compressed JSON."""
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def decompress_payload(blob):
+    """Decodes a payload stored by compress_payload."""
+    return json.loads(zlib.decompress(bytes(blob)).decode("utf-8"))
+
+
+def stage_payloads(account, endpoint, payloads, parent_id=""):
+    """
+    Stores raw Graph payloads, given as (object_id, data) pairs, with one
+    bulk upsert. account may be an InstagramAccount or its primary key.
+    A payload already staged for the same endpoint and object is replaced.
+    Does nothing when STAGE_GRAPH_PAYLOADS is off.
+    """
+    if not getattr(settings, "STAGE_GRAPH_PAYLOADS", True):
+        return
+    rows = {
+        str(object_id): GraphPayload(
+            instagram_account_id=getattr(account, "pk", account),
+            endpoint=endpoint,
+            object_id=str(object_id),
+            parent_id=str(parent_id),
+            payload=compress_payload(data),
+        )
+        for object_id, data in payloads
+        if object_id
+    }
+    if not rows:
+        return
+    GraphPayload.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=["endpoint", "object_id"],
+        update_fields=["instagram_account", "parent_id", "payload", "fetched_at"],
+    )
+
+
+def staged_payloads(account, endpoint):
+    """
+    Yields (object_id, parent_id, data) for every payload of the account
+    staged under endpoint, reading the table in chunks.
+    """
+    rows = (
+        GraphPayload.objects.filter(instagram_account=account, endpoint=endpoint)
+        .order_by("id")
+        .values_list("object_id", "parent_id", "payload")
+    )
+    for object_id, parent_id, blob in rows.iterator(chunk_size=500):
+        yield object_id, parent_id, decompress_payload(blob)
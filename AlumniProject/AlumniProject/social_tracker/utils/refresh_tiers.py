@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+DEFAULT_REFRESH_TIERS = [
+    (48 * 60 * 60, 0),
+    (30 * 24 * 60 * 60, 24 * 60 * 60),
+    (None, 7 * 24 * 60 * 60),
+]
+
+
+def refresh_tiers():
+    """
+    Returns the (max_age, interval) tiers of INSTAGRAM_REFRESH_TIERS, youngest
+    first. max_age None covers posts of any age.
+    """
+    tiers = getattr(settings, "INSTAGRAM_REFRESH_TIERS", DEFAULT_REFRESH_TIERS)
+    return sorted(tiers, key=lambda tier: float("inf") if tier[0] is None else tier[0])
+
+
+def tier_filters(now=None):
+    """
+    Returns [(max_age, interval, Q)] where each Q matches the posts of that
+    tier whose insights are due: never refreshed, or last refreshed at least
+    interval seconds ago. Posts older than every max_age are never due.
+    """
+    now = now or timezone.now()
+    filters = []
+    younger_tier = None
+    for max_age, interval in refresh_tiers():
+        tier = Q()
+        if younger_tier is not None:
+            tier &= Q(date_posted__lt=now - timedelta(seconds=younger_tier))
+        if max_age is not None:
+            tier &= Q(date_posted__gte=now - timedelta(seconds=max_age))
+        if interval:
+            tier &= Q(metrics_refreshed_at__isnull=True) | Q(
+                metrics_refreshed_at__lte=now - timedelta(seconds=interval)
+            )
+        filters.append((max_age, interval, tier))
+        if max_age is None:
+            break
+        younger_tier = max_age
+    return filters
+
+
+def refresh_due_filter(now=None):
+    """Returns a Q matching every post whose insights are due for a refresh."""
+    due = Q(pk__in=[])
+    for _, _, tier in tier_filters(now):
+        due |= tier
+    return due
+
+
+def due_counts(posts, now=None):
+    """
+    Returns [(max_age, interval, count)] with the number of posts of the
+    queryset that are due in each tier.
+    """
+    return [
+        (max_age, interval, posts.filter(tier).count())
+        for max_age, interval, tier in tier_filters(now)
+    ]
+
+
+def describe_tier(max_age, interval):
+    """Returns a short label such as "<=48h every sync" or "older every 7d"."""
+    age = "older" if max_age is None else f"<={format_seconds(max_age)}"
+    every = "every sync" if not interval else f"every {format_seconds(interval)}"
+    return f"{age} {every}"
+
+
+def format_seconds(seconds):
+    for unit, size in (("d", 24 * 60 * 60), ("h", 60 * 60), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
@@ -0,0 +1,116 @@
+from django.db import transaction
+
+from social_tracker.models import Post
+from social_tracker.utils.comment_counts import refresh_comment_counts
+from social_tracker.utils.get_instagram_data import (
+    add_stat,
+    build_post,
+    parse_comment,
+    parse_comment_page,
+    parse_media_page,
+    parse_story,
+    save_comment_batch,
+    upsert_posts,
+    upsert_stories,
+)
+from social_tracker.utils.payload_staging import staged_payloads
+
+REPROCESS_PARTS = ["posts", "comments", "stories"]
+
+# rows written per bulk statement while reprocessing
+REPROCESS_CHUNK = 500
+
+
+def reprocess_account(account, parts=None):
+    """
+    Rebuilds the Post, Comment, InstagramUser and InstagramStory rows of an
+    account from its staged GraphPayload rows, with the current parsing code
+    and no API calls. parts limits the work to some of "posts", "comments"
+    and "stories". Every row is written, whether or not its content_hash
+    changed, so rows edited outside of a sync are rebuilt too.
+
+    Returns a dict of counts: posts_inserted, posts_updated,
+    comments_written and stories_written.
+    """
+    parts = parts or REPROCESS_PARTS
+    stats = {}
+    with transaction.atomic():
+        if "posts" in parts:
+            reprocess_posts(account, stats)
+        if "comments" in parts:
+            reprocess_comments(account, stats)
+        if "stories" in parts:
+            reprocess_stories(account, stats)
+    return stats
+
+
+def reprocess_posts(account, stats):
+    """Re-parses staged media and their latest staged insights into Posts."""
+    insights = {
+        api_id: data.get("data", [])
+        for api_id, _, data in staged_payloads(account, "insights")
+    }
+    items = []
+    for api_id, _, data in staged_payloads(account, "media"):
+        items.append({**data, "insights": {"data": insights.get(api_id, [])}})
+        if len(items) >= REPROCESS_CHUNK:
+            write_posts(account, items, stats)
+            items = []
+    write_posts(account, items, stats)
+
+
+def write_posts(account, items, stats):
+    pending, _ = parse_media_page(items)
+    posts = [build_post(account, *item) for item in pending]
+    inserted, updated, _ = upsert_posts((p for p in posts if p is not None), True)
+    add_stat(stats, "posts_inserted", inserted)
+    add_stat(stats, "posts_updated", updated)
+
+
+def reprocess_comments(account, stats):
+    """
+    Re-parses staged comments into Comments and InstagramUsers. Single
+    comment lookups go first so the fuller comment listings win.
+    """
+    posts = {p.post_API_ID: p for p in Post.objects.filter(instagram_account=account)}
+    user_ids = set()
+    parsed = []
+
+    def flush():
+        user_ids.update(save_comment_batch(parsed, force=True))
+        add_stat(stats, "comments_written", len(parsed))
+        parsed.clear()
+
+    for comment_id, post_id, data in staged_payloads(account, "comment_lookup"):
+        if post_id in posts:
+            pair = parse_comment(data, comment_id, account, posts[post_id])
+            if pair:
+                parsed.append(pair)
+        if len(parsed) >= REPROCESS_CHUNK:
+            flush()
+    flush()
+
+    for _, post_id, data in staged_payloads(account, "comment"):
+        if post_id in posts:
+            parsed.extend(parse_comment_page([data], account, posts[post_id]))
+        if len(parsed) >= REPROCESS_CHUNK:
+            flush()
+    flush()
+
+    refresh_comment_counts(user_ids)
+
+
+def reprocess_stories(account, stats):
+    """
+    Re-parses staged stories and their insights into InstagramStories.
+    A payload staged without insights leaves the stored metrics alone.
+    """
+    captured, uncaptured = [], []
+    for _, _, data in staged_payloads(account, "story"):
+        if data.get("insights"):
+            captured.append(parse_story(data, data["insights"]))
+        else:
+            uncaptured.append(parse_story(data, []))
+    upsert_stories(account, captured)
+    upsert_stories(account, uncaptured, with_metrics=False)
+    add_stat(stats, "stories_written", len(captured) + len(uncaptured))
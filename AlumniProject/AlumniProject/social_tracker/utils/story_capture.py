@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from social_tracker.models import InstagramStory, SyncJob
+from social_tracker.utils.get_instagram_data import (
+    STORY_METRIC_FIELDS,
+    get_instagram_stories,
+)
+from social_tracker.utils.sync_locks import sync_lock
+
+# how long a story stays visible after it is posted
+STORY_LIFETIME = timedelta(hours=24)
+
+ALREADY_SYNCING = "A stories sync of this account is already running."
+
+
+def story_expires_at(date_posted):
+    """Returns when a story posted at date_posted expires."""
+    return date_posted + STORY_LIFETIME
+
+
+def next_capture_at(stories, new_found, now=None):
+    """
+    Returns when an account's stories should be polled next, given the story
+    dicts its last poll returned. Polls come every
+    STORY_CAPTURE_INTERVAL_SECONDS, or every
+    STORY_CAPTURE_FAST_INTERVAL_SECONDS after a poll that found new stories,
+    and are brought forward to STORY_FINAL_SNAPSHOT_SECONDS before the next
+    story expires so its final numbers are captured.
+    """
+    now = now or timezone.now()
+    if new_found:
+        interval = getattr(settings, "STORY_CAPTURE_FAST_INTERVAL_SECONDS", 10 * 60)
+    else:
+        interval = getattr(settings, "STORY_CAPTURE_INTERVAL_SECONDS", 60 * 60)
+    next_at = now + timedelta(seconds=interval)
+    margin = timedelta(
+        seconds=getattr(settings, "STORY_FINAL_SNAPSHOT_SECONDS", 10 * 60)
+    )
+    for story in stories:
+        if not story.get("date_posted"):
+            continue
+        final_at = story_expires_at(story["date_posted"]) - margin
+        if now < final_at < next_at:
+            next_at = final_at
+    return next_at
+
+
+def capture_stories(access_token, account_id, now=None):
+    """
+    Polls an account's active stories once with get_instagram_stories, which
+    stores a snapshot of their insights.
+
+    Returns (result, new_count, next_at): the result of get_instagram_stories
+    (a list of story dicts, or an error message), how many of the stories
+    were not stored before, and when to poll the account next. The poll is
+    skipped when a stories sync of the account is already running.
+    """
+    with sync_lock(account_id, SyncJob.STORIES) as acquired:
+        if not acquired:
+            return ALREADY_SYNCING, 0, next_capture_at([], False, now)
+        return poll_stories(access_token, account_id, now)
+
+
+def poll_stories(access_token, account_id, now=None):
+    """Does the work of capture_stories once the account's lock is held."""
+    known = set(
+        InstagramStory.objects.filter(instagram_account_id=account_id).values_list(
+            "story_API_ID", flat=True
+        )
+    )
+    result = get_instagram_stories(access_token, account_id)
+    if isinstance(result, str):
+        return result, 0, next_capture_at([], False, now)
+    new_count = sum(1 for story in result if story["story_API_ID"] not in known)
+    return result, new_count, next_capture_at(result, new_count > 0, now)
+
+
+def stored_active_stories(account_id, now=None):
+    """
+    Returns the account's stored stories that have not expired yet, as the
+    story dicts get_instagram_stories returns, newest first.
+    """
+    now = now or timezone.now()
+    fields = ["story_API_ID", "date_posted", "story_link"] + STORY_METRIC_FIELDS
+    return list(
+        InstagramStory.objects.filter(
+            instagram_account_id=account_id,
+            date_posted__gt=now - STORY_LIFETIME,
+        )
+        .order_by("-date_posted")
+        .values(*fields)
+    )
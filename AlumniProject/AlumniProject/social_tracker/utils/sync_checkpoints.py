@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from social_tracker.models import SyncCheckpoint
+
+MEDIA_SCOPE = "media"
+
+
+def comments_scope(post_id):
+    """Returns the checkpoint scope of a post's comment listing."""
+    return f"comments:{post_id}"
+
+
+def interrupted_comment_syncs(post_ids):
+    """
+    Returns the post_API_IDs among post_ids whose comment listing has a
+    checkpoint that load_checkpoint would still resume from.
+    """
+    scopes = {comments_scope(post_id): post_id for post_id in post_ids}
+    max_age = getattr(settings, "SYNC_CHECKPOINT_MAX_AGE_SECONDS", 24 * 60 * 60)
+    live = SyncCheckpoint.objects.filter(
+        scope__in=list(scopes),
+        updated_at__gte=timezone.now() - timedelta(seconds=max_age),
+    )
+    return {scopes[scope] for scope in live.values_list("scope", flat=True)}
+
+
+def load_checkpoint(account, scope):
+    """
+    Returns the SyncCheckpoint an interrupted sync left for scope, or None.
+    Checkpoints older than SYNC_CHECKPOINT_MAX_AGE_SECONDS are deleted
+    instead, since Graph paging cursors do not stay valid for ever.
+    """
+    checkpoint = SyncCheckpoint.objects.filter(
+        instagram_account=account, scope=scope
+    ).first()
+    if checkpoint is None:
+        return None
+    max_age = getattr(settings, "SYNC_CHECKPOINT_MAX_AGE_SECONDS", 24 * 60 * 60)
+    if timezone.now() - checkpoint.updated_at > timedelta(seconds=max_age):
+        checkpoint.delete()
+        return None
+    return checkpoint
+
+
+def save_checkpoint(account, scope, cursor, last_object_id="", newest_date=None):
+    """Records that every page of scope up to cursor has been written."""
+    SyncCheckpoint.objects.update_or_create(
+        instagram_account=account,
+        scope=scope,
+        defaults={
+            "cursor": cursor,
+            "last_object_id": last_object_id,
+            "newest_date": newest_date,
+        },
+    )
+
+
+def clear_checkpoint(account, scope):
+    """Forgets the checkpoint of scope once its listing was read to the end."""
+    SyncCheckpoint.objects.filter(instagram_account=account, scope=scope).delete()
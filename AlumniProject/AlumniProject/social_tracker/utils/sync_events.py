@@ -0,0 +1,53 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from social_tracker.models import SyncJob
+from social_tracker.utils.sync_jobs import job_status
+
+FINISHED = {SyncJob.DONE, SyncJob.FAILED}
+
+
+def format_event(event, data):
+    """Formats one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def job_events(job_id, poll_interval=None, keepalive=None):
+    """
+    Yields Server-Sent Events for a SyncJob until it finishes.
+
+    The job row is read every SYNC_EVENTS_POLL_SECONDS. A "progress" event
+    with job_status(job) is sent whenever it changed, and a "done" event once
+    the job is done or failed. While nothing changes a comment line is sent
+    every SYNC_EVENTS_KEEPALIVE_SECONDS so proxies keep the stream open.
+    """
+    if poll_interval is None:
+        poll_interval = getattr(settings, "SYNC_EVENTS_POLL_SECONDS", 0.5)
+    if keepalive is None:
+        keepalive = getattr(settings, "SYNC_EVENTS_KEEPALIVE_SECONDS", 15)
+
+    last = None
+    last_sent = time.monotonic()
+    while True:
+        job = await SyncJob.objects.filter(id=job_id).afirst()
+        if job is None:
+            yield format_event("error", {"message": "Sync job not found."})
+            return
+
+        status = job_status(job)
+        if job.status in FINISHED:
+            yield format_event("done", status)
+            return
+        if status != last:
+            yield format_event("progress", status)
+            last = status
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= keepalive:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        await asyncio.sleep(poll_interval)
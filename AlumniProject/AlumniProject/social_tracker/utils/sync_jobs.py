@@ -0,0 +1,317 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from social_tracker.models import AccessToken, InstagramAccount, SyncJob
+from social_tracker.utils.get_instagram_data import (
+    get_instagram_posts,
+    get_instagram_stories,
+)
+from social_tracker.utils.graph_client import graph
+from social_tracker.utils.sync_locks import (
+    acquire_sync_lock,
+    live_locks,
+    release_sync_lock,
+    sync_locked,
+    touch_sync_lock,
+)
+
+# the stats a sync reports, grouped by the stage that produces them
+STAGE_STATS = {
+    "media": ["pages_fetched", "posts_inserted", "posts_updated", "posts_unchanged"],
+    "stories": ["stories_fetched"],
+    "insights": ["posts_refreshed", "story_insights_fetched"],
+    "comments": [
+        "comment_syncs",
+        "comment_syncs_skipped",
+        "comment_syncs_failed",
+        "comments_written",
+        "comments_unchanged",
+        "users_written",
+        "users_unchanged",
+    ],
+}
+
+# the stats counting rows written, and rows skipped because they had not changed
+CHANGED_ROW_STATS = [
+    "posts_inserted",
+    "posts_updated",
+    "comments_written",
+    "users_written",
+]
+SKIPPED_ROW_STATS = ["posts_unchanged", "comments_unchanged", "users_unchanged"]
+
+# messages of get_instagram_posts that mean the sync went through
+SUCCESS_MESSAGES = {"Posts processed successfully.", "No posts found."}
+
+
+def enqueue_sync(account, kind=SyncJob.POSTS):
+    """
+    Queues a sync of the given InstagramAccount. When a sync of the same kind
+    is already queued or running for the account, no new job is created and
+    that job is returned instead, so duplicate requests share one crawl and
+    its result.
+
+    Returns (job, created), like get_or_create.
+    """
+    with transaction.atomic():
+        # serialises concurrent requests for the account on databases with
+        # row locks; on SQLite the IMMEDIATE transaction already does
+        InstagramAccount.objects.select_for_update().filter(pk=account.pk).first()
+        job = active_jobs().filter(instagram_account=account, kind=kind).first()
+        if job is not None:
+            return job, False
+        return SyncJob.objects.create(instagram_account=account, kind=kind), True
+
+
+def active_jobs(now=None):
+    """
+    Returns the SyncJobs that are queued, or running and not yet abandoned
+    (see claim_next_job), oldest first.
+    """
+    now = now or timezone.now()
+    timeout = getattr(settings, "SYNC_JOB_TIMEOUT_SECONDS", 60 * 60)
+    return SyncJob.objects.filter(
+        Q(status=SyncJob.QUEUED)
+        | Q(status=SyncJob.RUNNING, started_at__gte=now - timedelta(seconds=timeout))
+    ).order_by("created_at", "id")
+
+
+def claim_next_job():
+    """
+    Claims the oldest queued SyncJob for this worker and returns it, or None
+    when the queue is empty.
+
+    Jobs are claimed with a conditional UPDATE, so two workers never run the
+    same job. A job still running after SYNC_JOB_TIMEOUT_SECONDS is treated as
+    abandoned by a dead worker and may be claimed again. Jobs of an account
+    whose sync of the same kind holds a live SyncLock are left for later.
+    """
+    locked = live_locks().filter(
+        instagram_account=OuterRef("instagram_account"), scope=OuterRef("kind")
+    )
+    candidates = SyncJob.objects.filter(claimable_filter()).exclude(Exists(locked))
+    for job_id in candidates.values_list("id", flat=True):
+        job = claim_job(job_id)
+        if job is not None:
+            return job
+    return None
+
+
+def claimable_filter(now=None):
+    """Matches queued jobs and running jobs that have been abandoned."""
+    now = now or timezone.now()
+    timeout = getattr(settings, "SYNC_JOB_TIMEOUT_SECONDS", 60 * 60)
+    return Q(status=SyncJob.QUEUED) | Q(
+        status=SyncJob.RUNNING, started_at__lt=now - timedelta(seconds=timeout)
+    )
+
+
+def claim_job(job_id):
+    """Claims one SyncJob if it is still claimable. Returns it, or None."""
+    now = timezone.now()
+    claimed = SyncJob.objects.filter(claimable_filter(now), id=job_id).update(
+        status=SyncJob.RUNNING, stage="", started_at=now
+    )
+    if claimed:
+        return SyncJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Runs a claimed SyncJob through get_instagram_posts or
+    get_instagram_stories, saving its stage and stats as the sync goes, and
+    records how it finished.
+
+    The stats also carry rate_limit_waits, how often this sync had to wait
+    for the token's rate limiter.
+    """
+    account = job.instagram_account
+    access_token = AccessToken.objects.filter(account_id=account.account_API_ID).first()
+    if access_token is None:
+        finish_job(job, SyncJob.FAILED, "Access token is missing.")
+        return job
+
+    holder = f"job:{job.id}"
+    if not acquire_sync_lock(account.pk, job.kind, holder):
+        # another sync of this account is running; leave the job for later
+        SyncJob.objects.filter(id=job.id).update(
+            status=SyncJob.QUEUED, stage="", started_at=None
+        )
+        job.status = SyncJob.QUEUED
+        return job
+    try:
+        return run_locked_job(job, access_token, holder)
+    finally:
+        release_sync_lock(account.pk, job.kind, holder)
+
+
+def run_locked_job(job, access_token, holder):
+    """Runs a job whose account's SyncLock is held by holder."""
+    account = job.instagram_account
+    token_stats = graph.stats(access_token.token)
+    waits_before = token_stats.waits
+    stats = {}
+
+    def progress(stage):
+        stats["rate_limit_waits"] = token_stats.waits - waits_before
+        SyncJob.objects.filter(id=job.id).update(stage=stage, stats=dict(stats))
+        touch_sync_lock(account.pk, job.kind, holder)
+
+    sync = get_instagram_stories if job.kind == SyncJob.STORIES else get_instagram_posts
+    try:
+        result = sync(
+            access_token.token,
+            account.account_API_ID,
+            stats=stats,
+            progress=progress,
+        )
+    except Exception as e:
+        print(f"Sync job {job.id} failed: {e}")
+        job.stats = stats
+        finish_job(job, SyncJob.FAILED, f"Error getting Instagram {job.kind}: {e}")
+        return job
+
+    stats["rate_limit_waits"] = token_stats.waits - waits_before
+    stats["usage"] = token_stats.as_dict()
+    job.stats = stats
+    if isinstance(result, list):
+        finish_job(job, SyncJob.DONE, f"{len(result)} active story(ies) saved.")
+    elif result in SUCCESS_MESSAGES:
+        finish_job(job, SyncJob.DONE, result)
+    else:
+        finish_job(job, SyncJob.FAILED, result)
+    return job
+
+
+def finish_job(job, status, message):
+    """Saves the final status, message and stats of a job."""
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "message", "stats", "finished_at"])
+
+
+def job_status(job):
+    """
+    Returns a JSON-serialisable summary of a SyncJob, with its stats grouped
+    per stage and the rows it changed and skipped as unchanged.
+    """
+    stages = {
+        stage: {key: job.stats.get(key, 0) for key in keys}
+        for stage, keys in STAGE_STATS.items()
+    }
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "stages": stages,
+        "message": job.message,
+        "rows": {
+            "changed": sum(job.stats.get(key, 0) for key in CHANGED_ROW_STATS),
+            "skipped": sum(job.stats.get(key, 0) for key in SKIPPED_ROW_STATS),
+        },
+        "rate_limit_waits": job.stats.get("rate_limit_waits", 0),
+        "usage": job.stats.get("usage"),
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def sync_accounts(kind=SyncJob.POSTS, account_ids=None, max_workers=None):
+    """
+    Syncs every account that has a stored access token, or only those in
+    account_ids, with at most max_workers (defaults to
+    settings.SYNC_ACCOUNT_WORKERS) syncs running at once. Requests are paced
+    per access token, so accounts do not eat into each other's rate limits.
+
+    Each sync is recorded as a SyncJob through enqueue_sync and claimed
+    straight away, so the run_sync_worker command leaves it alone and its
+    progress can be followed at /api/sync-jobs/<id>/ like a queued one. An
+    account whose sync was already queued is run here. One whose sync is
+    already running elsewhere, or whose SyncLock another holder has, is
+    waited for with wait_for_job, and that sync's result is reported.
+
+    Returns one account_summary per account, ordered by account ID.
+    """
+    tokens = AccessToken.objects.all()
+    if account_ids:
+        tokens = tokens.filter(account_id__in=account_ids)
+    accounts = InstagramAccount.objects.filter(
+        account_API_ID__in=tokens.values("account_id")
+    ).order_by("account_API_ID")
+
+    jobs = [enqueue_sync(account, kind)[0] for account in accounts]
+    claimed = [job for job in map(claim_job, (job.id for job in jobs)) if job]
+
+    if max_workers is None:
+        max_workers = getattr(settings, "SYNC_ACCOUNT_WORKERS", 4)
+    if max_workers <= 1 or len(claimed) <= 1:
+        for job in claimed:
+            run_job(job)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(claimed))) as pool:
+            list(pool.map(run_job_in_thread, claimed))
+
+    ran = {job.id: job for job in claimed if job.status != SyncJob.QUEUED}
+    return [account_summary(ran.get(job.id) or wait_for_job(job)) for job in jobs]
+
+
+def wait_for_job(job, timeout=None):
+    """
+    Waits for a SyncJob to finish, polling every SYNC_WORKER_POLL_SECONDS for
+    at most timeout seconds (defaults to SYNC_JOB_TIMEOUT_SECONDS). A job
+    that is still queued once its account's SyncLock is free is claimed and
+    run here, so the wait does not depend on a worker being up. Returns the
+    job as last read.
+    """
+    poll = getattr(settings, "SYNC_WORKER_POLL_SECONDS", 2)
+    if timeout is None:
+        timeout = getattr(settings, "SYNC_JOB_TIMEOUT_SECONDS", 60 * 60)
+    deadline = time.monotonic() + timeout
+    job.refresh_from_db()
+    while job.status in (SyncJob.QUEUED, SyncJob.RUNNING):
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(poll)
+        job.refresh_from_db()
+        if job.status == SyncJob.QUEUED and not sync_locked(
+            job.instagram_account_id, job.kind
+        ):
+            claimed = claim_job(job.id)
+            if claimed is not None:
+                job = run_job(claimed)
+    return job
+
+
+def run_job_in_thread(job):
+    """Runs a job on a pool thread, closing the thread's database connections."""
+    try:
+        return run_job(job)
+    finally:
+        connections.close_all()
+
+
+def account_summary(job):
+    """
+    Returns the job_status of a finished sync with the account_id and
+    username of its account and the seconds it took.
+    """
+    account = job.instagram_account
+    seconds = None
+    if job.started_at and job.finished_at:
+        seconds = (job.finished_at - job.started_at).total_seconds()
+    return {
+        "account_id": account.account_API_ID,
+        "username": account.username,
+        "seconds": seconds,
+        **job_status(job),
+    }
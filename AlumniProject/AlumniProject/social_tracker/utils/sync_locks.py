@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from social_tracker.models import InstagramAccount, SyncLock
+
+
+def lock_timeout():
+    """Seconds without a heartbeat after which a lock counts as abandoned."""
+    return getattr(settings, "SYNC_JOB_TIMEOUT_SECONDS", 60 * 60)
+
+
+def live_locks():
+    """Returns the SyncLocks whose holder has reported in recently."""
+    stale = timezone.now() - timedelta(seconds=lock_timeout())
+    return SyncLock.objects.filter(heartbeat_at__gte=stale)
+
+
+def new_holder():
+    """Returns a holder name unique to this process, thread and call."""
+    return f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_sync_lock(account_id, scope, holder):
+    """
+    Takes the lock on syncs of scope for an account. Returns True if holder
+    now holds it, False if someone else does. A lock left behind by a
+    crashed holder is taken over once it is older than SYNC_JOB_TIMEOUT_SECONDS.
+    """
+    locks = SyncLock.objects.filter(instagram_account_id=account_id, scope=scope)
+    stale = timezone.now() - timedelta(seconds=lock_timeout())
+    locks.filter(heartbeat_at__lt=stale).delete()
+    try:
+        with transaction.atomic():
+            SyncLock.objects.create(
+                instagram_account_id=account_id,
+                scope=scope,
+                holder=holder,
+                heartbeat_at=timezone.now(),
+            )
+    except IntegrityError:
+        return locks.filter(holder=holder).exists()
+    return True
+
+
+def touch_sync_lock(account_id, scope, holder):
+    """Moves the heartbeat of a held lock on, so it is not taken over."""
+    SyncLock.objects.filter(
+        instagram_account_id=account_id, scope=scope, holder=holder
+    ).update(heartbeat_at=timezone.now())
+
+
+def release_sync_lock(account_id, scope, holder):
+    """Releases a lock held by holder."""
+    SyncLock.objects.filter(
+        instagram_account_id=account_id, scope=scope, holder=holder
+    ).delete()
+
+
+def sync_locked(account_id, scope):
+    """Returns whether a live lock is held on syncs of scope for an account."""
+    return live_locks().filter(instagram_account_id=account_id, scope=scope).exists()
+
+
+def wait_for_sync_lock(account_id, scope, timeout):
+    """
+    Waits up to timeout seconds for the lock on syncs of scope for an account
+    to be released. Returns True if it is free, False if it is still held.
+    """
+    poll = getattr(settings, "SYNC_WORKER_POLL_SECONDS", 2)
+    deadline = time.monotonic() + timeout
+    while sync_locked(account_id, scope):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
+    return True
+
+
+@contextmanager
+def sync_lock(account_id, scope, holder=None):
+    """
+    Holds the lock on syncs of scope for an account for the duration of the
+    block. Yields whether it was acquired; the block should not sync when it
+    was not. An account that is not stored yet is not locked.
+    """
+    if not InstagramAccount.objects.filter(pk=account_id).exists():
+        # nothing can be syncing an account that is not stored yet
+        yield True
+        return
+    holder = holder or new_holder()
+    acquired = acquire_sync_lock(account_id, scope, holder)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_sync_lock(account_id, scope, holder)
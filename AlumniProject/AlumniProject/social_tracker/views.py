@@ -1,6 +1,7 @@
 import json
 from datetime import datetime
 
+from django.conf import settings
 from django.db import models
 from django.core.serializers.json import DjangoJSONEncoder
 import requests
@@ -8,7 +9,7 @@ from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_GET, require_POST
@@ -23,16 +24,22 @@ from .models import (
     InstagramStory,
     InstagramUser,
     Post,
+    SyncJob,
 )
 from .utils.country_code_resolver import load_country_dict, get_country_name
 from .utils.delete_account_data import delete_account_data
+from .utils.demographics_refresh import (
+    demographics_age,
+    refresh_demographics_if_stale,
+)
+from .utils.graph_client import graph, graph_url
 from .utils.get_instagram_data import (
-    get_age_demographics,
-    get_city_demographics,
-    get_country_demographics,
-    get_instagram_posts,
     get_instagram_stories,
 )
+from .utils.sync_events import job_events
+from .utils.sync_jobs import enqueue_sync, job_status
+from .utils.story_capture import stored_active_stories
+from .utils.sync_locks import sync_lock, wait_for_sync_lock
 from google.oauth2 import id_token
 from google.auth.transport import requests as grequests
 import os
@@ -205,10 +212,9 @@ def save_access_token(request):
 
     # Fetch user ID and username via /me endpoint
     try:
-        resp = requests.get(
-            "https://graph.instagram.com/me",
+        resp = graph.get(
+            graph_url("me"),
             params={"fields": "id,username", "access_token": token_value},
-            timeout=5,
         )
         resp.raise_for_status()
         user_data = resp.json()
@@ -301,32 +307,103 @@ def add_user(request):
 @login_required
 def get_posts_view(request):
     """
-    Fetches Instagram posts using the stored access token
-    and the associated account ID, calls the Instagram API,
-    and returns the result as JSON.
+    Queues a sync of the Instagram posts of the account picked by
+    selected_access_token and returns the job ID straight away. The sync
+    itself is run by the run_sync_worker command; its progress can be polled
+    at /api/sync-jobs/<job_id>/ or streamed from /api/sync-jobs/<job_id>/events/.
     """
-    access_token = AccessToken.objects.get()
-    result = get_instagram_posts(access_token.token, access_token.account_id)
-    return JsonResponse({"message": result})
+    return queue_sync(request, SyncJob.POSTS)
 
 
-def update_demographics():
+@login_required
+def sync_stories_view(request):
+    """
+    Queues a sync of the active Instagram stories of the account picked by
+    selected_access_token and returns the job ID, like get_posts_view.
     """
-    Calls all the helper functions that collect demographic info
-    from Instagram and puts them into the database. This can
-    be used by the frontend to call the functions
+    return queue_sync(request, SyncJob.STORIES)
 
-    Parameters:
-    - None
 
-    Returns:
-    - None
+def selected_access_token(request):
+    """
+    Returns the stored AccessToken of the account named by the request's
+    "account" query parameter, or of the most recently connected account
+    when there is none. Returns None if no such token is stored.
     """
-    access_token = AccessToken.objects.get()
-    get_country_demographics(access_token.token, access_token.account_id)
-    get_city_demographics(access_token.token, access_token.account_id)
-    get_age_demographics(access_token.token, access_token.account_id)
-    return
+    tokens = AccessToken.objects.order_by("-id")
+    account_id = request.GET.get("account")
+    if account_id:
+        tokens = tokens.filter(account_id=account_id)
+    return tokens.first()
+
+
+def queue_sync(request, kind):
+    """
+    Queues a SyncJob of the given kind for the selected_access_token's
+    account. A request made while such a sync is already queued or running
+    gets that sync's job ID back, with "joined" set, and no new job is queued.
+    """
+    access_token = selected_access_token(request)
+    if access_token is None:
+        return JsonResponse(
+            {"message": "No access token found. Please add an access token first."},
+            status=404,
+        )
+    try:
+        account = InstagramAccount.objects.get(account_API_ID=access_token.account_id)
+    except InstagramAccount.DoesNotExist:
+        return JsonResponse(
+            {"message": f"Account with id {access_token.account_id} does not exist."},
+            status=404,
+        )
+    job, created = enqueue_sync(account, kind)
+    message = "Sync queued." if created else "Joined the sync already in progress."
+    return JsonResponse(
+        {
+            "message": message,
+            "job_id": job.id,
+            "status": job.status,
+            "joined": not created,
+        },
+        status=202,
+    )
+
+
+@login_required
+@require_GET
+def sync_job_status(request, job_id):
+    """
+    Returns the status of a queued sync as JSON: whether it is queued,
+    running, done or failed, the stage it is in, the counts reported so far
+    for each stage (media, stories, insights, comments) and its final message.
+    """
+    try:
+        job = SyncJob.objects.get(id=job_id)
+    except SyncJob.DoesNotExist:
+        return JsonResponse({"message": "Sync job not found."}, status=404)
+    return JsonResponse(job_status(job))
+
+
+@login_required
+@require_GET
+async def sync_job_events(request, job_id):
+    """
+    Streams the progress of a sync as Server-Sent Events over one long-lived
+    connection: a "progress" event whenever the stage or counts change and a
+    final "done" event, each carrying the same JSON as sync_job_status.
+
+    This is an async view, so under asgi.py the open stream does not hold a
+    worker thread while it waits.
+    """
+    if not await SyncJob.objects.filter(id=job_id).aexists():
+        return JsonResponse({"message": "Sync job not found."}, status=404)
+    response = StreamingHttpResponse(
+        job_events(job_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 def demographics_view(request):
@@ -336,17 +413,30 @@ def demographics_view(request):
     This view fetches data from the Age, Country, and City models, aggregating
     the number of interactions based on different demographic categories.
 
+    Stored rows are served straight away. When they are older than
+    DEMOGRAPHICS_TTL_SECONDS a single background refresh is started, and the
+    next request picks up the new data.
+
     Returns:
         JsonResponse: A JSON response containing:
             - 'ageRanges': A dictionary mapping age ranges to interaction counts.
             - 'topCountries': A list of dictionaries with country names and interaction counts.
             - 'topCities': A list of dictionaries with city names and interaction counts.
+            - 'dataAgeSeconds': How old the stored data is, or None if it was never refreshed.
+            - 'refreshing': Whether this request started a background refresh.
             - 'success': A boolean indicating the request was successful.
 
     Args:
         request (HttpRequest): The HTTP request object.
     """
-    update_demographics()
+    access_token = selected_access_token(request)
+    data_age = None
+    refreshing = False
+    if access_token:
+        data_age = demographics_age(access_token.account_id)
+        refreshing = refresh_demographics_if_stale(
+            access_token.token, access_token.account_id
+        )
     age_data = Age.objects.all().values("age_range", "num_interactions")
     country_data = (
         Country.objects.all()
@@ -372,6 +462,8 @@ def demographics_view(request):
             {"city": item["name"], "count": item["num_interactions"]}
             for item in city_data
         ],
+        "dataAgeSeconds": data_age,
+        "refreshing": refreshing,
     }
     return JsonResponse({"success": True, "data": response_data})
 
@@ -707,12 +799,14 @@ def get_stories_view(request):
     """
     Handles a GET request to fetch live Instagram stories and return them as JSON.
 
-    Fetches stories using the stored access token and account ID, converts timestamps,
-    and returns the data or an error message.
+    Fetches stories using the access token and account ID picked by
+    selected_access_token, converts timestamps, and returns the data or an
+    error message. While another stories sync of the account is running, the
+    request waits for it (up to SYNC_LOCK_WAIT_SECONDS) and returns the
+    stories it stored instead of fetching them again.
     """
-    try:
-        access_token = AccessToken.objects.get()
-    except AccessToken.DoesNotExist:
+    access_token = selected_access_token(request)
+    if access_token is None:
         return JsonResponse(
             {
                 "success": False,
@@ -722,8 +816,16 @@ def get_stories_view(request):
         )
 
     try:
-        # Pass both token and account_id to the helper
-        result = get_instagram_stories(access_token.token, access_token.account_id)
+        account_id = access_token.account_id
+        with sync_lock(account_id, SyncJob.STORIES) as acquired:
+            if acquired:
+                # Pass both token and account_id to the helper
+                result = get_instagram_stories(access_token.token, account_id)
+        if not acquired:
+            # join the stories sync already running and serve what it stores
+            wait = getattr(settings, "SYNC_LOCK_WAIT_SECONDS", 30)
+            wait_for_sync_lock(account_id, SyncJob.STORIES, wait)
+            result = stored_active_stories(account_id)
 
         if isinstance(result, list):
             # Convert datetime objects to ISO strings for JSON serialization
@@ -753,6 +855,26 @@ def get_stories_view(request):
         )
 
 
+@login_required
+def list_stored_stories(request):
+    """
+    Returns the stories stored by the last story sync as JSON, newest first,
+    in the same shape as get_stories_view.
+    """
+    stories = InstagramStory.objects.order_by("-date_posted").values(
+        "story_API_ID",
+        "date_posted",
+        "story_link",
+        "num_views",
+        "num_profile_clicks",
+        "num_replies",
+        "num_swipes_up",
+    )
+    return JsonResponse(
+        {"success": True, "stories": list(stories)}, encoder=DjangoJSONEncoder
+    )
+
+
 @require_POST
 @login_required
 def delete_account_view(request, account_api_id):
@@ -763,10 +885,8 @@ def delete_account_view(request, account_api_id):
         # 2) Delete the account itself so it vanishes from your list
         InstagramAccount.objects.filter(account_API_ID=account_api_id).delete()
 
-        # 3) If there are no more connected accounts, clear out the current token
-        if not InstagramAccount.objects.exists():
-            # Remove the lone AccessToken if it exists
-            AccessToken.objects.all().delete()
+        # 3) Forget the account's access token
+        AccessToken.objects.filter(account_id=account_api_id).delete()
 
         messages.success(request, "Account and its data have been removed.")
     except ValueError as e: